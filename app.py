@@ -15,6 +15,7 @@ one_click_transcription_page = st.Page(f"{PAGE_DIR}one_click_transcription.py",
 transcription_page = st.Page(f"{PAGE_DIR}transcription.py", title="音频转录", icon=':material/speech_to_text:')
 fix_typo_page = st.Page(f"{PAGE_DIR}fix_typo.py", title="修正文本", icon=':material/edit_note:')
 summary_page = st.Page(f"{PAGE_DIR}summary.py", title="文本归纳", icon=":material/summarize:")
+transcript_qa_page = st.Page(f"{PAGE_DIR}transcript_qa.py", title="转录问答", icon=":material/manage_search:")
 setting_page = st.Page(f"{PAGE_DIR}setting.py", title="设置", icon=":material/settings:")
 prompt_manager_page = st.Page(f"{PAGE_DIR}prompts_manager.py", title="提示词管理", icon=":material/library_books:")
 
@@ -22,7 +23,7 @@ prompt_manager_page = st.Page(f"{PAGE_DIR}prompts_manager.py", title="提示词
 pg = st.navigation({
     "首页": [home_page],
     "一键转录": [one_click_transcription_page],
-    "分步处理": [transcription_page, fix_typo_page, summary_page],
+    "分步处理": [transcription_page, fix_typo_page, summary_page, transcript_qa_page],
     "设置": [setting_page, prompt_manager_page]
 })
 
@@ -1,6 +1,297 @@
-def main():
-    print("Hello from summaaudio!")
+import argparse
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器。"""
+    parser = argparse.ArgumentParser(
+        prog="summaaudio", description="SummaAudio 命令行工具"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="批量转录目录中的音频文件 (无需界面)"
+    )
+    batch_parser.add_argument("input_dir", help="音频文件所在目录")
+    batch_parser.add_argument(
+        "-w", "--workers", type=int, default=1, help="工作进程数, 每个进程各自加载一次模型"
+    )
+    batch_parser.add_argument(
+        "-r", "--recursive", action="store_true", help="递归处理子目录"
+    )
+    batch_parser.add_argument(
+        "--overwrite", action="store_true", help="重新转录已有输出结果的文件"
+    )
+    batch_parser.add_argument(
+        "--batch-size-s",
+        type=float,
+        help="启用跨文件片段批处理: 每次识别调用的音频总秒数上限 (适合大量短音频, 不区分说话人)",
+    )
+    batch_parser.add_argument(
+        "--files-per-group", type=int, default=16, help="批处理模式下每个任务包含的文件数"
+    )
+    batch_parser.add_argument(
+        "--profile", help="识别速度档位 (如 fast / balanced / accurate), 指定后忽略单独的模型参数"
+    )
+    batch_parser.add_argument("--model", help="主模型ID (默认使用配置中的第一个)")
+    batch_parser.add_argument("--model-revision", help="主模型版本")
+    batch_parser.add_argument("--vad-model", help="VAD模型ID")
+    batch_parser.add_argument("--vad-model-revision", help="VAD模型版本")
+    batch_parser.add_argument("--punc-model", help="标点模型ID")
+    batch_parser.add_argument("--punc-model-revision", help="标点模型版本")
+    batch_parser.add_argument("--spk-model", help="说话人模型ID")
+    batch_parser.add_argument("--spk-model-revision", help="说话人模型版本")
+
+    bench_parser = subparsers.add_parser(
+        "bench-batching", help="比较逐文件识别与跨文件片段批处理的吞吐量"
+    )
+    bench_parser.add_argument("input_dir", help="音频文件所在目录")
+    bench_parser.add_argument("--batch-size-s", type=float, default=300, help="批次音频秒数上限")
+    bench_parser.add_argument("--limit", type=int, default=20, help="参与测试的最大文件数")
+    bench_parser.add_argument("--profile", help="识别速度档位, 默认使用配置中的第一个模型组合")
+
+    bench_prefix_parser = subparsers.add_parser(
+        "bench-prefix", help="比较模板拼接与系统消息 (前缀复用) 两种方式的每块预填充耗时"
+    )
+    bench_prefix_parser.add_argument("text_file", help="用于测试的转录文本文件 (UTF-8)")
+    bench_prefix_parser.add_argument(
+        "--section", default="fix_typo_prompt", help="prompts.json中的提示词类别"
+    )
+    bench_prefix_parser.add_argument("--prompt-title", help="提示词标题, 默认使用该类别的第一个")
+    bench_prefix_parser.add_argument("--chunk-chars", type=int, help="每块最大字符数, 默认使用后端配置")
+
+    bench_fix_parser = subparsers.add_parser(
+        "bench-fix", help="比较全文改写与修改列表两种修正方式的输出token数与耗时"
+    )
+    bench_fix_parser.add_argument("text_file", help="待修正的转录文本文件 (UTF-8)")
+    bench_fix_parser.add_argument("--prompt-title", help="修正提示词标题, 默认使用第一个")
+    bench_fix_parser.add_argument("--chunk-chars", type=int, help="每块最大字符数, 默认使用后端配置")
+    return parser
+
+
+def run_batch_command(args: argparse.Namespace) -> int:
+    """
+    执行批量转录子命令并打印吞吐量统计。
+
+    :param args: argparse.Namespace, 解析后的命令行参数.
+    :return: int, 进程退出码.
+    """
+    from scripts.batch_transcription import (
+        get_default_model_selection,
+        run_batch_transcription,
+    )
+
+    input_dir = os.path.abspath(args.input_dir)
+    if not os.path.isdir(input_dir):
+        print(f"输入目录不存在: {input_dir}")
+        return 2
+
+    # Config paths are relative to the project root
+    os.chdir(PROJECT_ROOT)
+
+    if args.profile:
+        from scripts.modelscope_scripts import (
+            get_modelscope_profiles,
+            get_profile_model_selection,
+        )
+
+        profile = next(
+            (p for p in get_modelscope_profiles() if p.get("name") == args.profile), None
+        )
+        if profile is None:
+            print(f"未找到识别档位: {args.profile}")
+            return 2
+        selection = list(get_profile_model_selection(profile))
+        overrides = []
+    else:
+        selection = list(get_default_model_selection())
+        overrides = [
+            args.model, args.model_revision,
+            args.vad_model, args.vad_model_revision,
+            args.punc_model, args.punc_model_revision,
+            args.spk_model, args.spk_model_revision,
+        ]
+    for index, override in enumerate(overrides):
+        if override is not None:
+            selection[index] = override or None  # Empty string disables a sub-model
+
+    def print_progress(result: dict):
+        status = "完成" if result["ok"] else f"失败 ({result['error']})"
+        print(f"[{status}] {result['path']} ({result['elapsed_seconds']:.1f}s)")
+
+    summary = run_batch_transcription(
+        input_dir,
+        tuple(selection),
+        workers=args.workers,
+        recursive=args.recursive,
+        overwrite=args.overwrite,
+        progress_callback=print_progress,
+        batch_size_s=args.batch_size_s,
+        files_per_group=args.files_per_group,
+    )
+
+    print("-" * 40)
+    print(f"找到文件: {summary['found']}  跳过: {summary['skipped']}")
+    print(f"成功: {summary['succeeded']}  失败: {summary['failed']}")
+    print(
+        f"总耗时: {summary['wall_seconds']:.1f}s  音频总时长: {summary['audio_seconds']:.1f}s"
+    )
+    print(f"吞吐量: {summary['files_per_hour']:.1f} 文件/小时")
+    print(f"实时率 (RTF): {summary['real_time_factor']:.3f}")
+    return 1 if summary["failed"] else 0
+
+
+def run_bench_batching_command(args: argparse.Namespace) -> int:
+    """
+    执行片段批处理吞吐量对比子命令。
+
+    :param args: argparse.Namespace, 解析后的命令行参数.
+    :return: int, 进程退出码.
+    """
+    from scripts.batch_transcription import find_audio_files, get_default_model_selection
+    from scripts.modelscope_scripts import get_modelscope_profiles, get_profile_model_selection
+    from scripts.segment_batching import benchmark_segment_batching
+
+    input_dir = os.path.abspath(args.input_dir)
+    if not os.path.isdir(input_dir):
+        print(f"输入目录不存在: {input_dir}")
+        return 2
+    os.chdir(PROJECT_ROOT)
+
+    if args.profile:
+        profile = next(
+            (p for p in get_modelscope_profiles() if p.get("name") == args.profile), None
+        )
+        if profile is None:
+            print(f"未找到识别档位: {args.profile}")
+            return 2
+        selection = get_profile_model_selection(profile)
+    else:
+        selection = get_default_model_selection()
+
+    audio_files = find_audio_files(input_dir)[: args.limit]
+    if not audio_files:
+        print("目录中没有音频文件。")
+        return 2
+
+    report = benchmark_segment_batching(audio_files, selection, args.batch_size_s)
+    for label, key in (("逐文件", "unbatched"), ("批处理", "batched")):
+        stats = report[key]
+        print(
+            f"{label}: 调用 {stats['pipeline_calls']} 次, 耗时 {stats['wall_seconds']:.2f}s, "
+            f"吞吐 {stats['audio_seconds_per_second']:.2f} 音频秒/秒"
+        )
+    return 0
+
+
+def _load_prompt_template(section: str, title: str | None) -> str | None:
+    from scripts.utils import get_prompts_details
+
+    prompts = get_prompts_details(section)
+    prompt = next((p for p in prompts if title is None or p.get("title") == title), None)
+    return prompt.get("content") if prompt else None
+
+
+def run_bench_prefix_command(args: argparse.Namespace) -> int:
+    """
+    执行前缀复用预填充耗时对比子命令 (使用当前配置的LLM后端)。
+
+    :param args: argparse.Namespace, 解析后的命令行参数.
+    :return: int, 进程退出码.
+    """
+    from scripts.llm_benchmark import benchmark_prefix_reuse
+    from scripts.token_budget import expected_rewrite_tokens, expected_summary_tokens
+
+    text_path = os.path.abspath(args.text_file)
+    if not os.path.isfile(text_path):
+        print(f"文本文件不存在: {text_path}")
+        return 2
+    os.chdir(PROJECT_ROOT)
+
+    template = _load_prompt_template(args.section, args.prompt_title)
+    if not template:
+        print(f"未找到提示词: {args.section} / {args.prompt_title or '(第一个)'}")
+        return 2
+    with open(text_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if not text.strip():
+        print(f"文本文件为空: {text_path}")
+        return 2
+
+    output_estimator = (
+        expected_rewrite_tokens if args.section == "fix_typo_prompt" else expected_summary_tokens
+    )
+    report = benchmark_prefix_reuse(template, text, args.chunk_chars, output_estimator)
+    print(
+        f"后端: {report['llm_mode']}  分块数: {report['chunks']}  模板token数: {report['template_tokens']}"
+        + (f"  num_ctx: {report['num_ctx']}" if report["num_ctx"] else "")
+    )
+    for label, key in (("模板拼接", "concatenated"), ("系统消息", "system_prefix")):
+        stats = report[key]
+        cached = f", 缓存token {stats['cached_tokens']}" if stats["cached_tokens"] is not None else ""
+        print(
+            f"{label}: 平均预填充 {stats['mean_prefill_seconds']:.3f}s/块, "
+            f"合计 {stats['total_prefill_seconds']:.2f}s, "
+            f"平均计算提示token {stats['mean_prompt_tokens_evaluated']:.0f}{cached}"
+        )
+    return 0
+
+
+def run_bench_fix_command(args: argparse.Namespace) -> int:
+    """
+    执行修正方式对比子命令 (使用当前配置的LLM后端, 不使用输出缓存)。
+
+    :param args: argparse.Namespace, 解析后的命令行参数.
+    :return: int, 进程退出码.
+    """
+    from scripts.llm_benchmark import benchmark_fix_modes
+    from scripts.llm_router import LLMRequestError
+
+    text_path = os.path.abspath(args.text_file)
+    if not os.path.isfile(text_path):
+        print(f"文本文件不存在: {text_path}")
+        return 2
+    os.chdir(PROJECT_ROOT)
+
+    template = _load_prompt_template("fix_typo_prompt", args.prompt_title)
+    if not template:
+        print(f"未找到修正提示词: {args.prompt_title or '(第一个)'}")
+        return 2
+    with open(text_path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    try:
+        report = benchmark_fix_modes(template, text, args.chunk_chars)
+    except LLMRequestError as e:
+        print(f"修正失败: {e}")
+        return 1
+    for label, key in (("全文改写", "rewrite"), ("修改列表", "edits")):
+        stats = report[key]
+        print(
+            f"{label}: 输出 {stats['output_tokens']} tokens, 耗时 {stats['wall_seconds']:.2f}s, "
+            f"{stats['chunks']} 块 (改写回退 {stats['fallback_chunks']} 块)"
+        )
+    print(f"两种结果的相似度: {report['output_similarity']:.3f}")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "batch":
+        return run_batch_command(args)
+    if args.command == "bench-batching":
+        return run_bench_batching_command(args)
+    if args.command == "bench-prefix":
+        return run_bench_prefix_command(args)
+    if args.command == "bench-fix":
+        return run_bench_fix_command(args)
+    parser.print_help()
+    return 2
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -5,9 +5,10 @@ import os
 # Ensure the project root is in sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from scripts.utils import get_prompts_details, copy_text_to_clipboard, load_config_section, extract_and_clean_think_tags
-from scripts.ollama_scripts import generate_ollama_completion
-from scripts.openai_scripts import generate_openai_completion, get_openai_model_names # Stays openai_scripts
+from scripts.utils import get_prompts_details, copy_text_to_clipboard
+from scripts.text_fixing import FIX_MODE_EDITS, FIX_MODE_REWRITE, FIX_MODES, clear_fix_memo, fix_text_chunked
+
+FIX_MODE_LABELS = {FIX_MODE_REWRITE: "全文改写", FIX_MODE_EDITS: "修改列表 (更快)"}
 
 
 st.subheader("修正文本")
@@ -72,6 +73,26 @@ with st.container(border=True):
 
 with st.container():
     fix_button = st.button("开始修正", type="primary")
+    use_llm_cache = st.checkbox(
+        "复用缓存的模型输出", value=True, key="ft_use_llm_cache",
+        help="相同文本、模板和模型参数的请求直接返回缓存结果；修改部分文本后再次修正时，"
+        "只有内容变化的块会重新生成。取消勾选以强制重新生成。"
+    )
+    fix_mode = st.radio(
+        "修正方式:",
+        FIX_MODES,
+        format_func=lambda mode: FIX_MODE_LABELS[mode],
+        horizontal=True,
+        key="ft_fix_mode",
+        help="修改列表模式下模型只输出需要修改的片段并在本地替换，输出量与修改量而非文本长度成正比；"
+        "某块的修改无法定位时自动改用全文改写。",
+    )
+    st.button(
+        "清除分块修正记忆",
+        on_click=clear_fix_memo,
+        key="ft_clear_fix_memo",
+        help="清除本进程中记忆的各块修正结果，下次修正时所有块都重新生成。",
+    )
     
     st.markdown("---")
     st.write("#### 修正结果")
@@ -88,38 +109,34 @@ with st.container():
             st.session_state['ft_cleaned_text'] = "" 
             st.session_state['ft_thoughts'] = ""
 
+            live_placeholder = st.empty()
             with st.spinner('修正中，请稍候...'):
-                final_prompt_for_llm = edited_prompt_content + "\n" + text_to_fix
-                
-                full_raw_response = ""
-                response_stream = None
-
                 try:
-                    system_config = load_config_section("SYSTEM")
-                    llm_mode = system_config.get('llm_mode', 'Ollama') # 'Ollama' or 'OpenAI'
-
-                    if llm_mode == 'Ollama':
-                        response_stream = generate_ollama_completion(final_prompt_for_llm)
-                    elif llm_mode == 'OpenAI': # This refers to using an OpenAI-compatible API
-                        openai_config = load_config_section("OPENAI") # Reads [OPENAI] from config.ini
-                        openai_model_name = openai_config.get('model') # Gets default model from [OPENAI]
-                        if not openai_model_name:
-                            st.error("默认在线模型未在config.ini中配置。请先在 设置 > 在线模型 页面配置。")
-                            st.stop()
-                        # get_openai_model_names() fetches from openai.json
-                        available_online_models = get_openai_model_names() 
-                        if openai_model_name not in available_online_models:
-                             st.warning(f"配置的默认在线模型 '{openai_model_name}' 未在 'config/openai.json' 中找到或定义。请检查设置。")
-                             # Potentially stop or allow proceeding if user confirms
-                        response_stream = generate_openai_completion(final_prompt_for_llm, openai_model_name)
-                    else:
-                        st.error(f"不支持的LLM模式: {llm_mode}")
-                        st.stop()
-                    
-                    for chunk in response_stream:
-                        full_raw_response += chunk
-                    
-                    cleaned_text, thoughts = extract_and_clean_think_tags(full_raw_response)
+                    # Long texts are split on speaker turns and fixed concurrently;
+                    # answer tokens are rendered as they stream in
+                    cleaned_text, thoughts, chunk_stats = fix_text_chunked(
+                        text_to_fix, edited_prompt_content, use_cache=use_llm_cache,
+                        live_callback=live_placeholder.markdown, fix_mode=fix_mode,
+                    )
+                    live_placeholder.empty()
+                    first_visible = [item['first_visible_seconds'] for item in chunk_stats if item['first_visible_seconds'] is not None]
+                    if first_visible:
+                        st.caption(f"首个可见字延迟: {min(first_visible):.1f}s")
+                    fallback_chunks = sum(1 for item in chunk_stats if item['mode'] == "edits_fallback")
+                    reused_chunks = sum(1 for item in chunk_stats if item['reused'])
+                    st.caption(
+                        f"复用上次结果 {reused_chunks} 块，重新生成 {len(chunk_stats) - reused_chunks} 块"
+                    )
+                    st.caption(
+                        f"模型输出 {sum(item['output_tokens'] for item in chunk_stats)} tokens，"
+                        f"耗时 {max(item['seconds'] for item in chunk_stats):.1f}s"
+                        + (f"，{fallback_chunks} 块改用全文改写" if fallback_chunks else "")
+                    )
+                    if len(chunk_stats) > 1:
+                        st.caption(
+                            f"共 {len(chunk_stats)} 块，各块耗时: "
+                            + ", ".join(f"#{item['index'] + 1} {item['seconds']:.1f}s" for item in chunk_stats)
+                        )
                     
                     st.session_state['ft_cleaned_text'] = cleaned_text
                     st.session_state['ft_thoughts'] = thoughts
@@ -129,7 +146,6 @@ with st.container():
                     st.error(f"配置错误: {ve}")
                 except Exception as e:
                     st.error(f"修正过程中发生错误: {e}")
-                    st.session_state['ft_cleaned_text'] = full_raw_response 
                     st.session_state['ft_thoughts'] = f"错误发生，未能解析思考过程: {e}"
     
     if st.session_state.get('ft_cleaned_text'):
@@ -1,5 +1,7 @@
 import sys
 import os
+import time
+import threading
 import streamlit as st
 
 # Ensure the project root is in sys.path
@@ -12,19 +14,35 @@ from scripts.modelscope_scripts import (
     organize_recognition_results,
     save_transcription_results,
     display_modelscope_model_selector,
+    display_modelscope_profile_selector,
+    resolve_modelscope_profile,
+    get_profile_model_selection,
+    record_profile_rtf,
+    CUSTOM_PROFILE,
+    run_modelscope_recognition_streaming,
+    merge_recognition_windows,
 )
+from scripts.parallel_recognition import (
+    run_modelscope_recognition_parallel,
+    run_modelscope_recognition_channel_split,
+)
+from scripts.audio_io import get_audio_duration
+from scripts.result_cache import get_result_cache_counters
 from scripts.utils import (
     get_prompts_details,
     copy_text_to_clipboard,
-    load_config_section,
     setup_logger,
-    extract_and_clean_think_tags,
 )
-from scripts.openai_scripts import generate_openai_completion, get_openai_model_names # Stays openai_scripts
-from scripts.ollama_scripts import generate_ollama_completion
+from scripts.summarization import summarize_text
+from scripts.llm_scripts import LLM_MODE_OLLAMA, get_llm_chunk_settings, get_llm_mode
+from scripts.llm_router import get_endpoint_pool
+from scripts.ollama_scripts import warm_up_ollama_model
+from scripts.text_fixing import FIX_MODE_REWRITE, FIX_MODES, fix_text_chunked
+from scripts.token_budget import expected_rewrite_tokens, expected_summary_tokens, plan_chunk_ctx
 
 logger = setup_logger("OneClickTranscriptionPage")
 CACHE_DIR = "cache"
+RECOGNITION_MODES = ["标准", "流式 (长音频)", "并行 (多核CPU)", "双声道 (按声道区分说话人)"]
 
 SESSION_STATE_KEYS = {
     "oc_audio_raw_text": "",
@@ -54,40 +72,35 @@ def perform_text_fix(
     if not input_text or not typo_prompt_template:
         return input_text, ""
 
-    final_prompt = typo_prompt_template + "\n" + input_text
-    full_raw_response = ""
-
-    system_config = load_config_section("SYSTEM")
-    llm_mode = system_config.get("llm_mode", "Ollama") # 'Ollama' or 'OpenAI'
-    response_stream = None
-
     try:
-        if llm_mode == "Ollama":
-            response_stream = generate_ollama_completion(final_prompt)
-        elif llm_mode == "OpenAI": # This refers to using an OpenAI-compatible API
-            openai_config = load_config_section("OPENAI") # Reads [OPENAI] from config.ini
-            model_name = openai_config.get("model") # Gets default model from [OPENAI]
-            if not model_name:
-                st.error("默认在线模型未在config.ini中配置。请先在 设置 > 在线模型 页面配置。")
-                return input_text, "默认在线模型未配置"
-            
-            available_online_models = get_openai_model_names() # Fetches from openai.json
-            if model_name not in available_online_models:
-                st.warning(f"配置的默认在线模型 '{model_name}' 未在 'config/openai.json' 中找到或定义。请检查设置。")
-            response_stream = generate_openai_completion(final_prompt, model_name)
-        else:
-            st.error(f"不支持的LLM模式: {llm_mode}")
-            return input_text, f"不支持的LLM模式: {llm_mode}"
-
-        for chunk in response_stream:
-            full_raw_response += chunk
-
-        cleaned_text, thoughts = extract_and_clean_think_tags(full_raw_response)
-        return cleaned_text, thoughts
+        # Chunks are fixed concurrently and stitched back in order
+        live_placeholder = st.empty()
+        fixed_text, thoughts, chunk_stats = fix_text_chunked(
+            input_text, typo_prompt_template, use_cache=use_llm_cache,
+            live_callback=live_placeholder.markdown, fix_mode=fix_mode, num_ctx=job_num_ctx,
+        )
+        live_placeholder.empty()
+        fallback_chunks = sum(1 for item in chunk_stats if item["mode"] == "edits_fallback")
+        st.write(
+            f"模型输出 {sum(item['output_tokens'] for item in chunk_stats)} tokens"
+            + (f", {fallback_chunks} 块改用全文改写" if fallback_chunks else "")
+        )
+        first_visible = [
+            item["first_visible_seconds"] for item in chunk_stats
+            if item["first_visible_seconds"] is not None
+        ]
+        if first_visible:
+            st.write(f"首个可见字延迟: {min(first_visible):.1f}s")
+        if len(chunk_stats) > 1:
+            st.write(
+                "分块耗时: "
+                + ", ".join(f"#{item['index'] + 1} {item['seconds']:.1f}s" for item in chunk_stats)
+            )
+        return fixed_text, thoughts
     except Exception as e:
         logger.error(f"Error in perform_text_fix: {e}")
         st.error(f"文本修正时发生错误: {e}")
-        return full_raw_response, f"文本修正时发生错误: {e}" # Return raw response on error
+        return input_text, f"文本修正时发生错误: {e}"
 
 
 def perform_summarization(
@@ -96,40 +109,25 @@ def perform_summarization(
     if not input_text or not summary_prompt_template:
         return input_text, ""
 
-    final_prompt = summary_prompt_template + "\n" + input_text
-    full_raw_response = ""
-
-    system_config = load_config_section("SYSTEM")
-    llm_mode = system_config.get("llm_mode", "Ollama") # 'Ollama' or 'OpenAI'
-    response_stream = None
-
     try:
-        if llm_mode == "Ollama":
-            response_stream = generate_ollama_completion(final_prompt)
-        elif llm_mode == "OpenAI": # This refers to using an OpenAI-compatible API
-            openai_config = load_config_section("OPENAI") # Reads [OPENAI] from config.ini
-            model_name = openai_config.get("model") # Gets default model from [OPENAI]
-            if not model_name:
-                st.error("默认在线模型未在config.ini中配置。请先在 设置 > 在线模型 页面配置。")
-                return input_text, "默认在线模型未配置"
-
-            available_online_models = get_openai_model_names() # Fetches from openai.json
-            if model_name not in available_online_models:
-                st.warning(f"配置的默认在线模型 '{model_name}' 未在 'config/openai.json' 中找到或定义。请检查设置。")
-            response_stream = generate_openai_completion(final_prompt, model_name)
-        else:
-            st.error(f"不支持的LLM模式: {llm_mode}")
-            return input_text, f"不支持的LLM模式: {llm_mode}"
-
-        for chunk in response_stream:
-            full_raw_response += chunk
-
-        cleaned_text, thoughts = extract_and_clean_think_tags(full_raw_response)
-        return cleaned_text, thoughts
+        # Long transcripts are summarised map-reduce style within the model context
+        live_placeholder = st.empty()
+        summary, thoughts, summary_stats = summarize_text(
+            input_text,
+            summary_prompt_template,
+            progress_callback=lambda stage, requests: st.write(f"{stage}: {requests} 个请求"),
+            use_cache=use_llm_cache,
+            live_callback=live_placeholder.markdown,
+            num_ctx=job_num_ctx,
+        )
+        live_placeholder.empty()
+        if summary_stats["first_visible_seconds"] is not None:
+            st.write(f"首个可见字延迟: {summary_stats['first_visible_seconds']:.1f}s")
+        return summary, thoughts
     except Exception as e:
         logger.error(f"Error in perform_summarization: {e}")
         st.error(f"文本归纳时发生错误: {e}")
-        return full_raw_response, f"文本归纳时发生错误: {e}" # Return raw response on error
+        return input_text, f"文本归纳时发生错误: {e}"
 
 st.header("🎙️ 一键转录、修正与归纳")
 st.markdown("上传音频文件，应用将自动完成语音转文字、文本校对和内容总结。")
@@ -139,15 +137,50 @@ with st.sidebar:
 
     st.subheader("步骤 1: 语音转录")
     distinguish_speakers = st.checkbox("区分说话人 (若模型支持)", value=True)
-    with st.expander("选择转录模型 (ModelScope)", expanded=False):
-        (model_id, model_rev, vad_id, vad_rev, punc_id, punc_rev, spk_id, spk_rev) = (
-            display_modelscope_model_selector()
+    recognition_mode = st.selectbox(
+        "识别模式",
+        RECOGNITION_MODES,
+        help="标准：整段识别。流式：按窗口分段解码与识别，内存占用不随音频时长增长，跨窗口的说话人编号可能不一致。"
+        "并行：先整体检测语音片段，再分配到多个进程并行识别，适合多核CPU上的长音频（需选择VAD模型）。"
+        "双声道：坐席与客户分处左右声道的通话录音，两个声道并行识别并按声道区分说话人，无需说话人模型（需选择VAD模型）。",
+    )
+    use_result_cache = st.checkbox(
+        "复用缓存的识别结果",
+        value=True,
+        help="同一音频与模型组合已识别过时直接返回缓存结果（标准模式）。取消勾选以强制重新识别。",
+    )
+    if recognition_mode == "并行 (多核CPU)":
+        parallel_workers = st.number_input(
+            "并行进程数", min_value=1, max_value=os.cpu_count() or 1,
+            value=max(1, (os.cpu_count() or 2) // 2),
         )
+    profile_name = display_modelscope_profile_selector()
+    (model_id, model_rev, vad_id, vad_rev, punc_id, punc_rev, spk_id, spk_rev) = (None,) * 8
+    if profile_name == CUSTOM_PROFILE:
+        with st.expander("选择转录模型 (ModelScope)", expanded=False):
+            (model_id, model_rev, vad_id, vad_rev, punc_id, punc_rev, spk_id, spk_rev) = (
+                display_modelscope_model_selector()
+            )
+
+    use_llm_cache = st.checkbox(
+        "复用缓存的模型输出",
+        value=True,
+        help="修正与归纳时，相同文本、模板和模型参数的请求直接返回缓存结果。",
+    )
 
     st.subheader("步骤 2: 文本修正 (可选)")
     enable_fix_typo = st.checkbox("启用文本修正", value=True)
     selected_fix_prompt_content = ""
+    fix_mode = FIX_MODE_REWRITE
     if enable_fix_typo:
+        fix_mode = st.radio(
+            "修正方式",
+            FIX_MODES,
+            format_func=lambda mode: "全文改写" if mode == FIX_MODE_REWRITE else "修改列表 (更快)",
+            horizontal=True,
+            key="oc_fix_mode",
+            help="修改列表模式下模型只输出需要修改的片段并在本地替换，无法定位的块自动改用全文改写。",
+        )
         with st.expander("选择修正提示词", expanded=False):
             fix_prompt_list = get_prompts_details("fix_typo_prompt")
             if fix_prompt_list:
@@ -221,10 +254,43 @@ if uploaded_audio_file:
 
     st.audio(audio_file_path, format=uploaded_audio_file.type)
 
+    audio_duration = get_audio_duration(audio_file_path)
+    selected_profile = None
+    if profile_name != CUSTOM_PROFILE:
+        selected_profile = resolve_modelscope_profile(
+            profile_name, audio_duration, distinguish_speakers
+        )
+        if selected_profile:
+            (model_id, model_rev, vad_id, vad_rev, punc_id, punc_rev, spk_id, spk_rev) = (
+                get_profile_model_selection(selected_profile)
+            )
+            st.caption(
+                f"识别档位：{selected_profile.get('title', selected_profile['name'])}，"
+                f"音频时长 {audio_duration / 60:.1f} 分钟，"
+                f"预计转录耗时约 {float(selected_profile.get('rtf', 0)) * audio_duration / 60:.1f} 分钟"
+            )
+
     if st.button("🚀 开始一键处理", type="primary", use_container_width=True):
         cleanup_session_state()
         st.session_state["oc_current_audio_filename"] = uploaded_audio_file.name
 
+        # Fix and summary requests share one num_ctx so Ollama never reloads the model between them
+        chunk_chars = get_llm_chunk_settings()[0]
+        job_ctx_candidates = [
+            plan_chunk_ctx(selected_fix_prompt_content, chunk_chars, expected_rewrite_tokens)
+            if enable_fix_typo and selected_fix_prompt_content else None,
+            plan_chunk_ctx(selected_summary_prompt_content, chunk_chars, expected_summary_tokens)
+            if enable_summarization and selected_summary_prompt_content else None,
+        ]
+        job_num_ctx = max((value for value in job_ctx_candidates if value), default=None)
+
+        if (enable_fix_typo or enable_summarization) and get_llm_mode() == LLM_MODE_OLLAMA:
+            # Load the model while ASR runs so the first LLM request skips the cold start
+            for endpoint in get_endpoint_pool(LLM_MODE_OLLAMA):
+                threading.Thread(
+                    target=warm_up_ollama_model, args=(endpoint["target"], job_num_ctx), daemon=True
+                ).start()
+
         with st.status("正在进行语音转录...", expanded=True) as status_transcription:
             st.write("调用ModelScope进行语音识别...")
             try:
@@ -233,13 +299,47 @@ if uploaded_audio_file:
                     status_transcription.update(label="转录失败!", state="error")
                     st.stop()
 
-                raw_recognition_result = run_modelscope_recognition(
+                model_kwargs = dict(
                     audio_input_path=audio_file_path,
                     model_id=model_id, model_revision=model_rev,
                     vad_model_id=vad_id, vad_model_revision=vad_rev,
                     punc_model_id=punc_id, punc_model_revision=punc_rev,
                     spk_model_id=spk_id, spk_model_revision=spk_rev,
                 )
+                recognition_start = time.perf_counter()
+                cache_hits_before = get_result_cache_counters()["hits"]
+                if recognition_mode == "流式 (长音频)":
+                    windows = []
+                    for window in run_modelscope_recognition_streaming(**model_kwargs):
+                        windows.append(window)
+                        status_transcription.update(
+                            label=f"正在进行语音转录... 已识别至 {window['window_end_ms'] / 1000:.0f} 秒"
+                        )
+                    raw_recognition_result = merge_recognition_windows(windows)
+                elif recognition_mode == "并行 (多核CPU)":
+                    raw_recognition_result = run_modelscope_recognition_parallel(
+                        **model_kwargs, num_workers=int(parallel_workers)
+                    )
+                elif recognition_mode == "双声道 (按声道区分说话人)":
+                    raw_recognition_result = run_modelscope_recognition_channel_split(
+                        **model_kwargs
+                    )
+                else:
+                    raw_recognition_result = run_modelscope_recognition(
+                        **model_kwargs, use_cache=use_result_cache
+                    )
+                # Only uncached standard runs are representative of a profile's speed
+                if (
+                    selected_profile
+                    and raw_recognition_result
+                    and recognition_mode == "标准"
+                    and get_result_cache_counters()["hits"] == cache_hits_before
+                ):
+                    record_profile_rtf(
+                        selected_profile["name"],
+                        time.perf_counter() - recognition_start,
+                        audio_duration,
+                    )
                 (
                     st.session_state.oc_full_transcription,
                     st.session_state.oc_speaker_transcription,
@@ -11,6 +11,12 @@ sys.path.append(
 )
 
 from scripts import ollama_scripts, openai_scripts
+from scripts.pipeline_registry import get_pipeline_registry
+from scripts.result_cache import get_result_cache_stats, clear_result_cache
+from scripts.pcm_cache import get_pcm_cache_stats
+from scripts.llm_cache import get_llm_cache_stats, clear_llm_cache
+from scripts.llm_router import get_router_stats
+from scripts.rate_limiter import get_rate_limit_stats
 from scripts.utils import CONFIG_INI_PATH, setup_logger
 
 logger = setup_logger("SettingsPage")
@@ -60,10 +66,79 @@ with tab_system:
         horizontal=True,
         help="选择用于文本修正和归纳任务的大语言模型后端。选择 'OpenAI' 将使用下方“在线模型”标签页配置的默认模型。",
     )
+
+    prefix_reuse = st.checkbox(
+        "前缀复用模式 (模板作为系统消息发送)",
+        value=config.getboolean("SYSTEM", "prefix_reuse", fallback=False),
+        help="修正与归纳时将所选提示词模板作为固定的系统消息发送（Ollama 使用 /api/chat），"
+        "同一模板处理多个分块时服务端可复用相同前缀的提示缓存，减少预填充时间。"
+        "可用 `python main.py bench-prefix <文本文件>` 对比两种方式的预填充耗时。",
+    )
+    col_llm_retries, col_llm_backoff = st.columns(2)
+    with col_llm_retries:
+        llm_max_retries = st.number_input(
+            "LLM请求重试轮数:",
+            min_value=0,
+            max_value=10,
+            value=int(config.get("SYSTEM", "llm_max_retries", fallback="2")),
+            help="所有端点都因连接错误、超时、限流或服务端错误失败时，再重试的轮数。",
+        )
+    with col_llm_backoff:
+        llm_retry_backoff = st.number_input(
+            "初始退避时间 (秒):",
+            min_value=0.0,
+            max_value=60.0,
+            value=float(config.get("SYSTEM", "llm_retry_backoff", fallback="1.0")),
+            step=0.5,
+            help="每轮重试前的等待时间，之后每轮翻倍。",
+        )
+    with st.expander("LLM端点状态", expanded=False):
+        router_stats = get_router_stats()
+        if router_stats:
+            st.dataframe(router_stats, use_container_width=True)
+        else:
+            st.caption("本次运行尚未发送LLM请求。")
+
+    st.subheader("模型输出缓存")
+    llm_cache_mode_labels = {
+        "auto": "仅确定性请求 (temperature 为 0)",
+        "always": "始终缓存",
+        "off": "关闭",
+    }
+    current_llm_cache_mode = config.get("SYSTEM", "llm_cache_mode", fallback="auto")
+    selected_llm_cache_mode = st.selectbox(
+        "缓存模式:",
+        list(llm_cache_mode_labels),
+        index=(
+            list(llm_cache_mode_labels).index(current_llm_cache_mode)
+            if current_llm_cache_mode in llm_cache_mode_labels
+            else 0
+        ),
+        format_func=lambda mode: llm_cache_mode_labels[mode],
+        help="对相同的提示、模型与采样参数直接返回缓存的输出，避免重复点击或页面重跑时重新生成。",
+    )
+    llm_cache_max_mb = st.number_input(
+        "缓存上限 (MB):",
+        min_value=1,
+        max_value=10240,
+        value=int(config.get("SYSTEM", "llm_cache_max_mb", fallback="64")),
+        help="超出上限时按最近最少使用顺序删除旧条目。",
+    )
+    with st.expander("模型输出缓存状态", expanded=False):
+        st.json(get_llm_cache_stats())
+        if st.button("清空模型输出缓存", key="clear_llm_cache"):
+            clear_llm_cache()
+            st.toast("模型输出缓存已清空。", icon="✅")
+
     if st.button("保存系统设置", key="save_system_settings", type="primary"):
         if "SYSTEM" not in config:
             config.add_section("SYSTEM")
         config["SYSTEM"]["llm_mode"] = selected_llm_mode
+        config["SYSTEM"]["llm_cache_mode"] = selected_llm_cache_mode
+        config["SYSTEM"]["prefix_reuse"] = str(prefix_reuse)
+        config["SYSTEM"]["llm_max_retries"] = str(llm_max_retries)
+        config["SYSTEM"]["llm_retry_backoff"] = str(llm_retry_backoff)
+        config["SYSTEM"]["llm_cache_max_mb"] = str(llm_cache_max_mb)
         save_configuration()
 
 with tab_modelscope:
@@ -89,10 +164,80 @@ with tab_modelscope:
         ),
         help="保存音频转录结果的根目录。",
     )
+    pipeline_memory_budget_mb = st.number_input(
+        "已加载模型内存预算 (MB):",
+        min_value=512,
+        max_value=262144,
+        value=int(
+            config.get("MODELSCOPE", "pipeline_memory_budget_mb", fallback="6144")
+        ),
+        step=512,
+        help="常驻内存的识别模型组合总占用上限，超出时按最近最少使用顺序卸载。重启应用后生效。",
+    )
+    pipeline_idle_ttl = st.number_input(
+        "模型空闲卸载时间 (秒):",
+        min_value=0,
+        max_value=86400,
+        value=int(config.get("MODELSCOPE", "pipeline_idle_ttl", fallback="1800")),
+        step=60,
+        help="模型组合超过该时长未被使用即自动卸载，0 表示不自动卸载。重启应用后生效。",
+    )
+
+    with st.expander("已加载模型统计", expanded=False):
+        st.json(get_pipeline_registry().stats())
+        if st.button("卸载所有已加载模型", key="clear_pipeline_registry"):
+            get_pipeline_registry().clear()
+            st.toast("已卸载所有识别模型。")
+
+    result_cache_enabled = st.checkbox(
+        "启用识别结果缓存",
+        value=config.getboolean("MODELSCOPE", "result_cache_enabled", fallback=True),
+        help="按音频内容和模型组合缓存识别结果，重复上传同一录音时直接复用。",
+    )
+    result_cache_max_mb = st.number_input(
+        "识别结果缓存上限 (MB):",
+        min_value=16,
+        max_value=65536,
+        value=int(config.get("MODELSCOPE", "result_cache_max_mb", fallback="512")),
+        step=16,
+        help="超出上限时按最近最少使用顺序删除旧的缓存结果。",
+    )
+
+    pcm_cache_max_mb = st.number_input(
+        "音频解码缓存上限 (MB):",
+        min_value=64,
+        max_value=262144,
+        value=int(config.get("MODELSCOPE", "pcm_cache_max_mb", fallback="2048")),
+        step=64,
+        help="上传的音频只解码一次为16 kHz单声道数据并缓存，超出上限时删除最久未用的条目。",
+    )
+    pcm_cache_max_age_hours = st.number_input(
+        "音频解码缓存保留时长 (小时):",
+        min_value=0,
+        max_value=8760,
+        value=int(float(config.get("MODELSCOPE", "pcm_cache_max_age_hours", fallback="72"))),
+        step=1,
+        help="超过该时长未使用的解码缓存将被删除，0 表示不按时长删除。",
+    )
+
+    with st.expander("音频解码缓存统计", expanded=False):
+        st.json(get_pcm_cache_stats())
+
+    with st.expander("识别结果缓存统计", expanded=False):
+        st.json(get_result_cache_stats())
+        if st.button("清空识别结果缓存", key="clear_result_cache"):
+            clear_result_cache()
+            st.toast("识别结果缓存已清空。")
 
     if st.button("保存ModelScope配置", key="save_modelscope_settings", type="primary"):
         config["MODELSCOPE"]["MODELSCOPE_CACHE"] = modelscope_cache_path
         config["MODELSCOPE"]["output_dir"] = output_dir_path
+        config["MODELSCOPE"]["pipeline_memory_budget_mb"] = str(pipeline_memory_budget_mb)
+        config["MODELSCOPE"]["pipeline_idle_ttl"] = str(pipeline_idle_ttl)
+        config["MODELSCOPE"]["result_cache_enabled"] = str(result_cache_enabled)
+        config["MODELSCOPE"]["result_cache_max_mb"] = str(result_cache_max_mb)
+        config["MODELSCOPE"]["pcm_cache_max_mb"] = str(pcm_cache_max_mb)
+        config["MODELSCOPE"]["pcm_cache_max_age_hours"] = str(pcm_cache_max_age_hours)
         if save_configuration():
             if not os.path.exists(modelscope_cache_path):
                 os.makedirs(modelscope_cache_path, exist_ok=True)
@@ -110,6 +255,16 @@ with tab_ollama:
         config.get("OLLAMA", "base_url", fallback="http://localhost:11434"),
         help="例如: http://localhost:11434",
     )
+    ollama_extra_base_urls = st.text_area(
+        "其他Ollama地址 (可选, 每行一个):",
+        "\n".join(
+            url.strip()
+            for url in config.get("OLLAMA", "base_urls", fallback="").split(",")
+            if url.strip()
+        ),
+        height=80,
+        help="部署了相同模型的其他Ollama服务。请求按进行中请求数最少的原则分配，某个地址连接失败或超时时自动切换到其他地址。",
+    )
 
     ollama_model_list = []
     if ollama_base_url:
@@ -168,6 +323,83 @@ with tab_ollama:
         help="核心采样参数。模型会考虑累积概率达到top_p的最高概率词汇。",
     )
 
+    col_ollama_dynamic_ctx, col_ollama_max_ctx = st.columns(2)
+    with col_ollama_dynamic_ctx:
+        ollama_dynamic_ctx = st.checkbox(
+            "按提示长度自动选择 num_ctx",
+            value=config.getboolean("OLLAMA", "dynamic_ctx", fallback=True),
+            help="发送前估算提示与输出的token数，短文本使用较小的上下文以减少显存占用和预填充时间，长文本按需增大。",
+        )
+    with col_ollama_max_ctx:
+        ollama_max_ctx = st.number_input(
+            "自动选择时的 num_ctx 上限:",
+            min_value=2048,
+            max_value=131072,
+            value=int(config.get("OLLAMA", "max_ctx", fallback="16384")),
+            step=2048,
+            disabled=not ollama_dynamic_ctx,
+            help="超过该上限的文本将分块处理。",
+        )
+
+    col_ollama_chunk, col_ollama_concurrency = st.columns(2)
+    with col_ollama_chunk:
+        ollama_chunk_chars = st.number_input(
+            "长文本分块大小 (字符):",
+            min_value=200,
+            max_value=200000,
+            value=int(config.get("OLLAMA", "chunk_chars", fallback="2000")),
+            step=100,
+            help="文本预估超出上下文（或修正文本超过该长度）时，在说话人段落边界处分块，每块不超过该字数。",
+        )
+    with col_ollama_concurrency:
+        ollama_map_concurrency = st.number_input(
+            "分块并发请求数:",
+            min_value=1,
+            max_value=32,
+            value=int(config.get("OLLAMA", "map_concurrency", fallback="2")),
+            help="同时发送给Ollama的分块请求数，建议不超过服务端的 OLLAMA_NUM_PARALLEL。",
+        )
+    ollama_max_parallel = st.number_input(
+        "Ollama最大并行请求数:",
+        min_value=1,
+        max_value=64,
+        value=int(config.get("OLLAMA", "max_parallel", fallback="4")),
+        help="本程序所有任务同时发送给Ollama的请求总数上限，建议与服务端的 OLLAMA_NUM_PARALLEL 一致，超出的请求排队等待。",
+    )
+
+    col_ollama_keep_alive, col_ollama_pool = st.columns(2)
+    with col_ollama_keep_alive:
+        ollama_keep_alive = st.text_input(
+            "模型保活时长 (keep_alive):",
+            value=config.get("OLLAMA", "keep_alive", fallback="30m"),
+            help="请求结束后模型在显存中保留的时长，如 30m、1h；-1 表示一直保留，0 表示立即卸载。",
+        )
+    with col_ollama_pool:
+        ollama_pool_size = st.number_input(
+            "HTTP连接池大小:",
+            min_value=1,
+            max_value=64,
+            value=int(config.get("OLLAMA", "pool_size", fallback="8")),
+            help="复用的HTTP连接数，应不小于分块并发请求数。",
+        )
+
+    col_ollama_connect_timeout, col_ollama_read_timeout = st.columns(2)
+    with col_ollama_connect_timeout:
+        ollama_connect_timeout = st.number_input(
+            "连接超时 (秒):",
+            min_value=1,
+            max_value=120,
+            value=int(float(config.get("OLLAMA", "connect_timeout", fallback="5"))),
+        )
+    with col_ollama_read_timeout:
+        ollama_read_timeout = st.number_input(
+            "读取超时 (秒):",
+            min_value=10,
+            max_value=3600,
+            value=int(float(config.get("OLLAMA", "read_timeout", fallback="300"))),
+            help="两次收到数据之间的最长等待时间，需覆盖模型加载与长提示的预填充时间。",
+        )
+
     if st.button("保存Ollama配置", key="save_ollama_settings", type="primary"):
         if not ollama_base_url.strip():
             st.error("Ollama API 地址不能为空。")
@@ -177,10 +409,22 @@ with tab_ollama:
             st.stop()
 
         config["OLLAMA"]["base_url"] = ollama_base_url
+        config["OLLAMA"]["base_urls"] = ", ".join(
+            url.strip() for url in ollama_extra_base_urls.splitlines() if url.strip()
+        )
         config["OLLAMA"]["model"] = selected_ollama_model
         config["OLLAMA"]["max_tokens"] = str(ollama_max_tokens_ctx)
         config["OLLAMA"]["temperature"] = str(ollama_temperature)
         config["OLLAMA"]["top_p"] = str(ollama_top_p)
+        config["OLLAMA"]["chunk_chars"] = str(ollama_chunk_chars)
+        config["OLLAMA"]["map_concurrency"] = str(ollama_map_concurrency)
+        config["OLLAMA"]["dynamic_ctx"] = str(ollama_dynamic_ctx)
+        config["OLLAMA"]["max_ctx"] = str(ollama_max_ctx)
+        config["OLLAMA"]["max_parallel"] = str(ollama_max_parallel)
+        config["OLLAMA"]["keep_alive"] = ollama_keep_alive.strip() or "30m"
+        config["OLLAMA"]["pool_size"] = str(ollama_pool_size)
+        config["OLLAMA"]["connect_timeout"] = str(ollama_connect_timeout)
+        config["OLLAMA"]["read_timeout"] = str(ollama_read_timeout)
         if save_configuration():
             st.rerun()
 
@@ -222,6 +466,18 @@ with tab_online_model: # Changed variable name for the tab
                     help="API密钥将存储在 config/openai.json 中。",
                     required=True, # Making API key required for most online models
                 ),
+                "rpm": st.column_config.NumberColumn(
+                    "每分钟请求数 (RPM)",
+                    help="服务商的每分钟请求数限额，超出时请求排队等待。0 或留空表示不限制。",
+                    min_value=0,
+                    step=1,
+                ),
+                "tpm": st.column_config.NumberColumn(
+                    "每分钟Token数 (TPM)",
+                    help="服务商的每分钟Token数限额（提示与输出合计），超出时请求排队等待。0 或留空表示不限制。",
+                    min_value=0,
+                    step=1000,
+                ),
             },
             height=300,
         )
@@ -308,6 +564,23 @@ with tab_online_model: # Changed variable name for the tab
         st.warning("没有可用的在线模型。请通过“管理在线模型列表”添加和配置模型。")
 
 
+    current_fallback_models = [
+        name.strip()
+        for name in config.get("OPENAI", "fallback_models", fallback="").split(",")
+        if name.strip()
+    ]
+    selected_fallback_models = st.multiselect(
+        "备用在线模型 (可选):",
+        [name for name in online_model_names_list if name != selected_default_online_model],
+        default=[
+            name
+            for name in current_fallback_models
+            if name in online_model_names_list and name != selected_default_online_model
+        ],
+        help="默认模型连接失败、超时、限流或服务端错误时，按负载依次切换到这些模型。",
+        key="online_fallback_models_selector",
+    )
+
     # Parameters for the default online model (still stored in [OPENAI] section of config.ini)
     openai_max_tokens = st.number_input(
         "默认Tokens上限 (max_tokens):",
@@ -337,6 +610,52 @@ with tab_online_model: # Changed variable name for the tab
         key="online_model_top_p_slider", # Changed key
     )
 
+    openai_context_window = st.number_input(
+        "默认模型上下文长度 (tokens):",
+        min_value=1024,
+        max_value=2000000,
+        value=int(config.get("OPENAI", "context_window", fallback="32768")),
+        step=1024,
+        help="用于估算提示是否能放入模型上下文，超出时将分块处理。",
+        key="online_model_context_window_input",
+    )
+    col_online_chunk, col_online_concurrency = st.columns(2)
+    with col_online_chunk:
+        openai_chunk_chars = st.number_input(
+            "长文本分块大小 (字符):",
+            min_value=200,
+            max_value=500000,
+            value=int(config.get("OPENAI", "chunk_chars", fallback="12000")),
+            step=500,
+            help="文本预估超出上下文（或修正文本超过该长度）时，在说话人段落边界处分块，每块不超过该字数。",
+            key="online_model_chunk_chars_input",
+        )
+    with col_online_concurrency:
+        openai_map_concurrency = st.number_input(
+            "分块并发请求数:",
+            min_value=1,
+            max_value=64,
+            value=int(config.get("OPENAI", "map_concurrency", fallback="4")),
+            help="同时发送给在线模型的分块请求数。",
+            key="online_model_map_concurrency_input",
+        )
+    openai_max_parallel = st.number_input(
+        "在线模型最大并行请求数:",
+        min_value=1,
+        max_value=256,
+        value=int(config.get("OPENAI", "max_parallel", fallback="8")),
+        help="本程序所有任务同时发送给在线模型的请求总数上限，超出的请求排队等待。",
+        key="online_model_max_parallel_input",
+    )
+
+    with st.expander("限流状态", expanded=False):
+        rate_limit_stats = get_rate_limit_stats()
+        if rate_limit_stats:
+            st.dataframe(rate_limit_stats, use_container_width=True)
+            st.caption("可用额度长期接近 0 或排队数持续大于 0 说明吞吐受配额限制。")
+        else:
+            st.caption("本次运行尚未发送在线模型请求。")
+
     if st.button("保存在线模型默认设置", key="save_online_model_defaults", type="primary"): # Changed key
         if not selected_default_online_model and online_model_names_list:
             st.error("请选择一个默认的在线模型。")
@@ -347,4 +666,9 @@ with tab_online_model: # Changed variable name for the tab
             config["OPENAI"]["max_tokens"] = str(openai_max_tokens)
             config["OPENAI"]["temperature"] = str(openai_temperature)
             config["OPENAI"]["top_p"] = str(openai_top_p)
+            config["OPENAI"]["chunk_chars"] = str(openai_chunk_chars)
+            config["OPENAI"]["map_concurrency"] = str(openai_map_concurrency)
+            config["OPENAI"]["context_window"] = str(openai_context_window)
+            config["OPENAI"]["max_parallel"] = str(openai_max_parallel)
+            config["OPENAI"]["fallback_models"] = ", ".join(selected_fallback_models)
             save_configuration()
\ No newline at end of file
@@ -7,16 +7,10 @@ sys.path.append(
     os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 )
 
-from scripts.ollama_scripts import generate_ollama_completion
-from scripts.openai_scripts import (
-    generate_openai_completion,
-    get_openai_model_names,
-)  # Stays openai_scripts
+from scripts.summarization import summarize_text, update_rolling_summary
 from scripts.utils import (
     get_prompts_details,
     copy_text_to_clipboard,
-    load_config_section,
-    extract_and_clean_think_tags,
 )
 
 st.subheader("✍️ 文本归纳与摘要")
@@ -67,6 +61,19 @@ with col_config:
             key="summary_prompt_editor",
         )
 
+    use_llm_cache = st.checkbox(
+        "复用缓存的模型输出",
+        value=True,
+        key="sm_use_llm_cache",
+        help="相同文本、模板和模型参数的请求直接返回缓存结果。取消勾选以强制重新生成。",
+    )
+    rolling_summary = st.checkbox(
+        "增量归纳",
+        value=False,
+        key="sm_rolling_summary",
+        help="适用于持续追加的转录文本：只将上次归纳之后新增的文本并入已有结果，耗时与新增文本长度成正比。"
+        "更换模板或修改了已归纳的部分时自动重新开始。",
+    )
     generate_button = st.button(
         f"开始生成{summary_type}", type="primary", use_container_width=True
     )
@@ -120,50 +127,44 @@ if generate_button and text_to_summarize:
         st.session_state.sm_cleaned_text = ""
         st.session_state.sm_thoughts = ""
 
+        live_placeholder = st.empty()
         with st.spinner(f"正在生成{summary_type}，请稍候..."):
-            final_prompt_for_llm = edited_prompt_content + "\n" + text_to_summarize
-
-            full_raw_response = ""
-            response_stream = None
             try:
-                system_config = load_config_section("SYSTEM")
-                llm_mode = system_config.get(
-                    "llm_mode", "Ollama"
-                )  # 'Ollama' or 'OpenAI'
-
-                if llm_mode == "Ollama":
-                    response_stream = generate_ollama_completion(final_prompt_for_llm)
-                elif (
-                    llm_mode == "OpenAI"
-                ):  # This refers to using an OpenAI-compatible API
-                    openai_config = load_config_section(
-                        "OPENAI"
-                    )  # Reads [OPENAI] from config.ini
-                    openai_model_name = openai_config.get(
-                        "model"
-                    )  # Gets default model from [OPENAI]
-                    if not openai_model_name:
-                        st.error(
-                            "默认在线模型未在config.ini中配置。请先在 设置 > 在线模型 页面配置。"
-                        )
-                        st.stop()
-                    # get_openai_model_names() fetches from openai.json
-                    available_online_models = get_openai_model_names()
-                    if openai_model_name not in available_online_models:
-                        st.warning(
-                            f"配置的默认在线模型 '{openai_model_name}' 未在 'config/openai.json' 中找到或定义。请检查设置。"
-                        )
-                    response_stream = generate_openai_completion(
-                        final_prompt_for_llm, openai_model_name
+                if rolling_summary:
+                    # Only text appended since the last run is folded into the running result
+                    rolling_state, thoughts, summary_stats = update_rolling_summary(
+                        st.session_state.get("sm_rolling_state"),
+                        text_to_summarize,
+                        edited_prompt_content,
+                        use_cache=use_llm_cache,
+                        live_callback=live_placeholder.markdown,
+                    )
+                    st.session_state["sm_rolling_state"] = rolling_state
+                    cleaned_text = rolling_state["summary"]
+                    if summary_stats["restarted"]:
+                        st.caption("模板或已归纳的文本有变化，已重新开始归纳。")
+                    st.caption(
+                        f"新增 {summary_stats['new_chars']} 字，{summary_stats['requests']} 个请求"
+                        f"（并入 {summary_stats['folds']} 次，压缩 {summary_stats['compactions']} 次）"
                     )
                 else:
-                    st.error(f"不支持的LLM模式: {llm_mode}")
-                    st.stop()
-
-                for chunk in response_stream:
-                    full_raw_response += chunk
-
-                cleaned_text, thoughts = extract_and_clean_think_tags(full_raw_response)
+                    # Transcripts longer than one chunk are summarised map-reduce style;
+                    # answer tokens of the current stage are rendered as they stream in
+                    cleaned_text, thoughts, summary_stats = summarize_text(
+                        text_to_summarize,
+                        edited_prompt_content,
+                        progress_callback=lambda stage, requests: st.caption(
+                            f"{stage}: {requests} 个请求"
+                        ),
+                        use_cache=use_llm_cache,
+                        live_callback=live_placeholder.markdown,
+                    )
+                live_placeholder.empty()
+                if summary_stats["first_visible_seconds"] is not None:
+                    st.caption(
+                        f"首个可见字延迟: {summary_stats['first_visible_seconds']:.1f}s，"
+                        f"总耗时: {summary_stats['total_seconds']:.1f}s"
+                    )
 
                 st.session_state["sm_cleaned_text"] = cleaned_text
                 st.session_state["sm_thoughts"] = thoughts
@@ -173,7 +174,6 @@ if generate_button and text_to_summarize:
                 st.error(f"配置错误: {ve}")
             except Exception as e:
                 st.error(f"生成过程中发生错误: {e}")
-                st.session_state["sm_cleaned_text"] = full_raw_response
                 st.session_state["sm_thoughts"] = f"错误发生，未能解析思考过程: {e}"
 elif generate_button and not text_to_summarize:
     st.warning("请输入待归纳的文本。")
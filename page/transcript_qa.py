@@ -0,0 +1,116 @@
+import streamlit as st
+import sys
+import os
+
+# Ensure the project root is in sys.path
+sys.path.append(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+)
+
+from scripts.transcript_index import DEFAULT_TOP_K, answer_question
+from scripts.utils import copy_text_to_clipboard
+
+st.subheader("🔎 转录问答")
+st.markdown("针对长转录文本提问，只检索与问题最相关的片段发送给模型，而不是整篇转录。")
+
+col_config, col_text_input = st.columns([1, 2])
+
+with col_config:
+    st.markdown("#### 提问")
+    question = st.text_area(
+        "问题:",
+        height=100,
+        key="qa_question",
+        placeholder="例如：关于预算最后是怎么决定的？",
+    )
+    top_k = st.slider(
+        "使用的片段数",
+        min_value=1,
+        max_value=20,
+        value=DEFAULT_TOP_K,
+        key="qa_top_k",
+        help="按相关度选取的片段数上限。片段越多，回答越全面，提示也越长。",
+    )
+    use_llm_cache = st.checkbox(
+        "复用缓存的模型输出",
+        value=True,
+        key="qa_use_llm_cache",
+        help="相同片段、问题和模型参数的请求直接返回缓存结果。",
+    )
+    ask_button = st.button("开始提问", type="primary", use_container_width=True)
+
+with col_text_input:
+    st.markdown("#### 转录文本")
+    default_text = st.session_state.get("ft_cleaned_text") or st.session_state.get(
+        "transcription_speaker_text", ""
+    )
+    transcript_text = st.text_area(
+        "转录文本:",
+        height=400,
+        key="qa_text_input",
+        value=default_text,
+        placeholder="在此处粘贴按说话人组织的转录文本...",
+    )
+
+st.markdown("---")
+st.subheader("💬 回答")
+
+if "qa_answer" not in st.session_state:
+    st.session_state.qa_answer = ""
+if "qa_thoughts" not in st.session_state:
+    st.session_state.qa_thoughts = ""
+if "qa_segments" not in st.session_state:
+    st.session_state.qa_segments = []
+
+if ask_button:
+    if not transcript_text.strip():
+        st.warning("请输入转录文本。")
+    elif not question.strip():
+        st.warning("请输入问题。")
+    else:
+        st.session_state.qa_answer = ""
+        st.session_state.qa_thoughts = ""
+        st.session_state.qa_segments = []
+
+        live_placeholder = st.empty()
+        with st.spinner("正在检索并回答，请稍候..."):
+            try:
+                answer, thoughts, qa_stats = answer_question(
+                    transcript_text,
+                    question,
+                    top_k=top_k,
+                    use_cache=use_llm_cache,
+                    live_callback=live_placeholder.markdown,
+                )
+                live_placeholder.empty()
+                st.caption(
+                    f"使用 {len(qa_stats['segments'])}/{qa_stats['total_segments']} 个片段，"
+                    f"提示 {qa_stats['prompt_chars']} 字（全文 {qa_stats['transcript_chars']} 字），"
+                    f"耗时 {qa_stats['total_seconds']:.1f}s"
+                )
+                st.session_state.qa_answer = answer
+                st.session_state.qa_thoughts = thoughts
+                st.session_state.qa_segments = qa_stats["segments"]
+            except ValueError as ve:
+                st.error(f"配置错误: {ve}")
+            except Exception as e:
+                st.error(f"提问过程中发生错误: {e}")
+
+if st.session_state.get("qa_answer"):
+    st.markdown(st.session_state.qa_answer)
+    st.button(
+        "复制回答",
+        on_click=copy_text_to_clipboard,
+        args=(st.session_state.qa_answer,),
+        key="copy_qa_answer",
+    )
+
+if st.session_state.get("qa_segments"):
+    with st.expander("查看检索到的片段"):
+        for segment in st.session_state.qa_segments:
+            st.markdown(f"**片段{segment['index'] + 1}** (相关度 {segment['score']})")
+            st.text(segment["text"])
+
+if st.session_state.get("qa_thoughts"):
+    with st.expander("查看模型的思考过程 🤔"):
+        st.markdown(st.session_state.qa_thoughts)
@@ -1,4 +1,5 @@
 import re
+import time
 import streamlit as st
 import sys
 import os
@@ -13,11 +14,25 @@ from scripts.modelscope_scripts import (
     organize_recognition_results,
     save_transcription_results,
     display_modelscope_model_selector,  # Renamed and behavior changed
+    display_modelscope_profile_selector,
+    resolve_modelscope_profile,
+    get_profile_model_selection,
+    record_profile_rtf,
+    CUSTOM_PROFILE,
+    run_modelscope_recognition_streaming,
+    merge_recognition_windows,
 )
+from scripts.parallel_recognition import (
+    run_modelscope_recognition_parallel,
+    run_modelscope_recognition_channel_split,
+)
+from scripts.audio_io import get_audio_duration
+from scripts.result_cache import get_result_cache_counters
 from scripts.utils import setup_logger, copy_text_to_clipboard
 
 logger = setup_logger("TranscriptionPage")
 CACHE_DIR = "cache"  # Define cache directory
+RECOGNITION_MODES = ["标准", "流式 (长音频)", "并行 (多核CPU)", "双声道 (按声道区分说话人)"]
 
 # Initialize session state keys
 SESSION_STATE_KEYS_TRANSCRIPTION = {
@@ -82,10 +97,30 @@ st.caption("使用ModelScope模型将音频文件转换为文本。")
 with st.sidebar:
     st.title("⚙️ 模型配置")
     st.info("建议使用默认模型组合。更改模型可能导致预料之外的行为或错误。")
-    with st.expander("选择转录模型", expanded=True):
-        # This function now directly returns the selected model_id and revision_str
-        (model_id, model_rev, vad_id, vad_rev, punc_id, punc_rev, spk_id, spk_rev) = (
-            display_modelscope_model_selector()
+    profile_name = display_modelscope_profile_selector()
+    (model_id, model_rev, vad_id, vad_rev, punc_id, punc_rev, spk_id, spk_rev) = (None,) * 8
+    if profile_name == CUSTOM_PROFILE:
+        with st.expander("选择转录模型", expanded=True):
+            # This function now directly returns the selected model_id and revision_str
+            (model_id, model_rev, vad_id, vad_rev, punc_id, punc_rev, spk_id, spk_rev) = (
+                display_modelscope_model_selector()
+            )
+    recognition_mode = st.selectbox(
+        "识别模式",
+        RECOGNITION_MODES,
+        help="标准：整段识别。流式：按窗口分段解码与识别，内存占用不随音频时长增长，跨窗口的说话人编号可能不一致。"
+        "并行：先整体检测语音片段，再分配到多个进程并行识别，适合多核CPU上的长音频（需选择VAD模型）。"
+        "双声道：坐席与客户分处左右声道的通话录音，两个声道并行识别并按声道区分说话人，无需说话人模型（需选择VAD模型）。",
+    )
+    use_result_cache = st.checkbox(
+        "复用缓存的识别结果",
+        value=True,
+        help="同一音频与模型组合已识别过时直接返回缓存结果（标准模式）。取消勾选以强制重新识别。",
+    )
+    if recognition_mode == "并行 (多核CPU)":
+        parallel_workers = st.number_input(
+            "并行进程数", min_value=1, max_value=os.cpu_count() or 1,
+            value=max(1, (os.cpu_count() or 2) // 2),
         )
 
 # Main area for file upload and results
@@ -106,7 +141,7 @@ if uploaded_audio_file:
     st.audio(uploaded_audio_file, format=uploaded_audio_file.type)
 
     if st.button("▶️ 开始识别", type="primary", use_container_width=True):
-        if not model_id:  # Check if model selection from sidebar was successful
+        if profile_name == CUSTOM_PROFILE and not model_id:  # Check if model selection from sidebar was successful
             st.error("主转录模型未选择或加载失败。请检查侧边栏配置。")
         else:
             cleanup_transcription_state()  # Clear previous results for this file
@@ -122,9 +157,29 @@ if uploaded_audio_file:
             with open(audio_file_path, "wb") as f:
                 f.write(uploaded_audio_file.getbuffer())
 
+            audio_duration = get_audio_duration(audio_file_path)
+            selected_profile = None
+            if profile_name != CUSTOM_PROFILE:
+                # This page always separates speakers, so auto favours the speaker model
+                selected_profile = resolve_modelscope_profile(
+                    profile_name, audio_duration, distinguish_speakers=True
+                )
+                if not selected_profile:
+                    st.error("未找到所选识别档位。请检查 modelscope_models.json 中的 profiles 配置。")
+                    st.stop()
+                (model_id, model_rev, vad_id, vad_rev, punc_id, punc_rev, spk_id, spk_rev) = (
+                    get_profile_model_selection(selected_profile)
+                )
+                st.caption(
+                    f"识别档位：{selected_profile.get('title', selected_profile['name'])}，"
+                    f"预计耗时约 {float(selected_profile.get('rtf', 0)) * audio_duration / 60:.1f} 分钟"
+                )
+
             with st.spinner("识别中，请耐心等待..."):
                 try:
-                    raw_result = run_modelscope_recognition(
+                    recognition_start = time.perf_counter()
+                    cache_hits_before = get_result_cache_counters()["hits"]
+                    model_kwargs = dict(
                         audio_input_path=audio_file_path,
                         model_id=model_id,
                         model_revision=model_rev,
@@ -135,6 +190,41 @@ if uploaded_audio_file:
                         spk_model_id=spk_id,
                         spk_model_revision=spk_rev,
                     )
+                    if recognition_mode == "流式 (长音频)":
+                        windows = []
+                        progress_placeholder = st.empty()
+                        for window in run_modelscope_recognition_streaming(**model_kwargs):
+                            windows.append(window)
+                            progress_placeholder.text_area(
+                                f"已识别至 {window['window_end_ms'] / 1000:.0f} 秒:",
+                                "".join(w["text"] for w in windows[-3:]),
+                                height=150,
+                                disabled=True,
+                            )
+                        raw_result = merge_recognition_windows(windows)
+                    elif recognition_mode == "并行 (多核CPU)":
+                        raw_result = run_modelscope_recognition_parallel(
+                            **model_kwargs, num_workers=int(parallel_workers)
+                        )
+                    elif recognition_mode == "双声道 (按声道区分说话人)":
+                        raw_result = run_modelscope_recognition_channel_split(
+                            **model_kwargs
+                        )
+                    else:
+                        raw_result = run_modelscope_recognition(
+                            **model_kwargs, use_cache=use_result_cache
+                        )
+                        # Only uncached standard runs are representative of a profile's speed
+                        if (
+                            selected_profile
+                            and raw_result
+                            and get_result_cache_counters()["hits"] == cache_hits_before
+                        ):
+                            record_profile_rtf(
+                                selected_profile["name"],
+                                time.perf_counter() - recognition_start,
+                                audio_duration,
+                            )
 
                     (
                         st.session_state.transcription_full_text,
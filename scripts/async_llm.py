@@ -0,0 +1,144 @@
+import sys
+import os
+import queue
+import asyncio
+import threading
+
+# Ensure the project root is in sys.path for consistent imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils import load_config_section, setup_logger
+
+logger = setup_logger("ASYNC_LLM")
+
+# Process-wide cap on in-flight requests per backend, shared by every job and
+# Streamlit session (e.g. match Ollama's OLLAMA_NUM_PARALLEL).
+DEFAULT_MAX_PARALLEL = {"OLLAMA": 4, "OPENAI": 8}
+_STREAM_END = object()
+
+_loop = None
+_loop_lock = threading.Lock()
+_limiters = {}
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    获取后台线程中常驻的事件循环 (首次调用时启动)。
+    所有异步LLM请求都在该循环中执行, 连接池与并发限制器因此可以在请求之间共享。
+
+    :return: asyncio.AbstractEventLoop, 后台事件循环.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="async-llm-loop", daemon=True
+            ).start()
+        return _loop
+
+
+def get_max_parallel(section: str) -> int:
+    """
+    读取后端的最大并行请求数 ([OLLAMA] 或 [OPENAI] 区域的 max_parallel)。
+
+    :param section: str, 配置区域名称 ("OLLAMA" 或 "OPENAI").
+    :return: int, 最大并行请求数.
+    """
+    try:
+        return max(1, int(load_config_section(section).get("max_parallel", DEFAULT_MAX_PARALLEL[section])))
+    except ValueError as e:
+        logger.warning(f"Invalid max_parallel for {section}, using default: {e}")
+        return DEFAULT_MAX_PARALLEL[section]
+
+
+class BackendLimiter:
+    """
+    限制后端同时进行的请求数的异步上下文管理器 (只能在后台事件循环中使用)。
+
+    与 asyncio.Semaphore 不同, 上限可以在运行中修改: 调小后, 新请求会等到进行中的请求数低于新上限,
+    因此任何时刻进行中的请求数都不会超过当前上限。
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            # The limit may have been raised since the waiters last checked it
+            self._condition.notify_all()
+            await self._condition.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+
+async def get_backend_limiter(section: str) -> BackendLimiter:
+    """
+    获取后端共享的并发限制器 (只能在后台事件循环中使用)。每个后端只有一个限制器,
+    修改max_parallel后在下一次请求开始前按新值调整上限。
+
+    :param section: str, 配置区域名称 ("OLLAMA" 或 "OPENAI").
+    :return: BackendLimiter, 以 async with 使用, 限制该后端同时进行的请求数.
+    """
+    # Reading config.ini is file I/O, so it runs in a worker thread instead of on the loop
+    limit = await asyncio.to_thread(get_max_parallel, section)
+    limiter = _limiters.get(section)
+    if limiter is None:
+        limiter = _limiters[section] = BackendLimiter(limit)
+    else:
+        # Resized in place rather than replaced, so requests still holding a
+        # slot are counted against the new limit
+        limiter.limit = limit
+    return limiter
+
+
+def submit(coroutine):
+    """
+    在后台事件循环中调度协程。
+
+    :param coroutine: 协程对象.
+    :return: concurrent.futures.Future, 可在任意线程中等待或取消.
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, get_event_loop())
+
+
+def iterate_sync(async_generator):
+    """
+    将异步生成器转换为同步生成器 (同步适配层), 供原有的 generate_*_completion 接口使用。
+    调用方提前关闭生成器 (如中途停止) 时, 后台的请求会被取消并释放连接。
+
+    :param async_generator: 异步生成器, 在后台事件循环中迭代.
+    :return: 生成器, 逐个产生异步生成器的元素.
+    """
+    items = queue.Queue()
+
+    async def pump():
+        try:
+            async for item in async_generator:
+                items.put(item)
+        except BaseException as e:
+            items.put(e)
+            raise
+        finally:
+            items.put(_STREAM_END)
+
+    future = submit(pump())
+    try:
+        while True:
+            item = items.get()
+            if item is _STREAM_END:
+                break
+            if isinstance(item, BaseException):
+                if isinstance(item, asyncio.CancelledError):
+                    break
+                raise item
+            yield item
+    finally:
+        future.cancel()
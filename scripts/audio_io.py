@@ -0,0 +1,218 @@
+import sys
+import os
+import shutil
+import struct
+import subprocess
+import numpy as np
+
+# Ensure the project root is in sys.path for consistent imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils import setup_logger
+
+logger = setup_logger("AUDIO_IO")
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".m4a")
+MODEL_SAMPLE_RATE = 16000  # ModelScope ASR models expect 16 kHz mono input
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def get_audio_duration(audio_path: str) -> float:
+    """
+    获取音频文件的时长 (秒)。
+
+    :param audio_path: str, 音频文件路径.
+    :return: float, 时长秒数, 无法读取时返回0.0.
+    """
+    try:
+        import soundfile
+
+        return float(soundfile.info(audio_path).duration)
+    except Exception:
+        pass
+
+    try:
+        import librosa
+
+        return float(librosa.get_duration(path=audio_path))
+    except Exception as e:
+        logger.warning(f"Could not determine duration of {audio_path}: {e}")
+        return 0.0
+
+
+def get_audio_channel_count(audio_path: str) -> int:
+    """
+    获取音频文件的声道数。
+
+    :param audio_path: str, 音频文件路径.
+    :return: int, 声道数, 无法读取时返回0.
+    """
+    try:
+        import soundfile
+
+        return int(soundfile.info(audio_path).channels)
+    except Exception:
+        pass
+
+    if shutil.which("ffprobe"):
+        try:
+            output = subprocess.run(
+                [
+                    "ffprobe", "-v", "error", "-select_streams", "a:0",
+                    "-show_entries", "stream=channels", "-of", "csv=p=0",
+                    audio_path,
+                ],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            return int(output.strip().splitlines()[0])
+        except (subprocess.CalledProcessError, ValueError, IndexError) as e:
+            logger.warning(f"ffprobe could not read channels of {audio_path}: {e}")
+    return 0
+
+
+def _iter_ffmpeg_blocks(audio_path: str, block_samples: int, channel: int = None):
+    """使用ffmpeg将音频 (或其中一个声道) 流式解码为16 kHz单声道float32块。"""
+    channel_filter = ["-af", f"pan=mono|c0=c{channel}"] if channel is not None else []
+    command = [
+        "ffmpeg", "-nostdin", "-loglevel", "error",
+        "-i", audio_path,
+        *channel_filter,
+        "-f", "f32le", "-ac", "1", "-ar", str(MODEL_SAMPLE_RATE),
+        "-",
+    ]
+    block_bytes = block_samples * 4
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            usable = len(data) - len(data) % 4
+            yield np.frombuffer(data[:usable], dtype=np.float32)
+        process.wait()
+        if process.returncode != 0:
+            error_output = process.stderr.read().decode("utf-8", errors="ignore")
+            raise RuntimeError(f"ffmpeg failed to decode {audio_path}: {error_output}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.stdout.close()
+        process.stderr.close()
+
+
+def _iter_soundfile_blocks(audio_path: str, block_samples: int, channel: int = None):
+    """在没有ffmpeg时使用soundfile分块读取, 必要时逐块重采样。"""
+    import soundfile
+
+    info = soundfile.info(audio_path)
+    source_block = max(1, int(block_samples * info.samplerate / MODEL_SAMPLE_RATE))
+    for block in soundfile.blocks(
+        audio_path, blocksize=source_block, dtype="float32", always_2d=True
+    ):
+        mono = block[:, channel] if channel is not None else block.mean(axis=1)
+        if info.samplerate != MODEL_SAMPLE_RATE:
+            import librosa
+
+            mono = librosa.resample(
+                mono, orig_sr=info.samplerate, target_sr=MODEL_SAMPLE_RATE
+            )
+        yield mono.astype(np.float32, copy=False)
+
+
+def iter_audio_blocks(audio_path: str, block_seconds: float, channel: int = None):
+    """
+    以固定时长的块流式解码音频, 内存占用与音频总时长无关。
+
+    :param audio_path: str, 音频文件路径.
+    :param block_seconds: float, 每块的时长 (秒).
+    :param channel: int, 只解码指定声道 (从0开始), 为None时混合为单声道.
+    :return: 生成器, 逐块产生16 kHz单声道float32的numpy数组.
+    """
+    block_samples = max(1, int(block_seconds * MODEL_SAMPLE_RATE))
+    if shutil.which("ffmpeg"):
+        yield from _iter_ffmpeg_blocks(audio_path, block_samples, channel)
+    else:
+        logger.warning("ffmpeg not found, falling back to soundfile block decoding")
+        yield from _iter_soundfile_blocks(audio_path, block_samples, channel)
+
+
+def sniff_native_wav(audio_path: str):
+    """
+    解析WAV文件头, 判断其是否已是模型原生格式 (16 kHz 单声道 16位PCM)。
+
+    :param audio_path: str, 音频文件路径.
+    :return: tuple 或 None, 原生格式时返回 (采样数据起始偏移, 采样数), 否则返回None.
+    """
+    try:
+        with open(audio_path, "rb") as f:
+            header = f.read(12)
+            if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+                return None
+
+            is_native_format = False
+            while True:
+                chunk_header = f.read(8)
+                if len(chunk_header) < 8:
+                    return None
+                chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+
+                if chunk_id == b"fmt ":
+                    fmt = f.read(chunk_size)
+                    if len(fmt) < 16:
+                        return None
+                    audio_format, channels, sample_rate, _, _, bits = struct.unpack(
+                        "<HHIIHH", fmt[:16]
+                    )
+                    if audio_format == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                        audio_format = struct.unpack("<H", fmt[24:26])[0]
+                    is_native_format = (
+                        audio_format == WAVE_FORMAT_PCM
+                        and channels == 1
+                        and sample_rate == MODEL_SAMPLE_RATE
+                        and bits == 16
+                    )
+                    if chunk_size % 2:
+                        f.seek(1, os.SEEK_CUR)
+                elif chunk_id == b"data":
+                    if not is_native_format:
+                        return None
+                    data_offset = f.tell()
+                    # Streaming recorders may leave the size field unset (0 or 0xFFFFFFFF)
+                    available = os.path.getsize(audio_path) - data_offset
+                    data_size = chunk_size if 0 < chunk_size <= available else available
+                    return data_offset, data_size // 2
+                else:
+                    f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+    except (OSError, struct.error):
+        return None
+
+
+def open_native_wav(audio_path: str):
+    """
+    对模型原生格式的WAV直接内存映射其int16采样, 跳过解码与重采样。
+
+    :param audio_path: str, 音频文件路径.
+    :return: np.memmap 或 None, 原生格式时返回只读int16数组, 否则返回None.
+    """
+    wav_layout = sniff_native_wav(audio_path)
+    if wav_layout is None:
+        return None
+    data_offset, sample_count = wav_layout
+    if sample_count == 0:
+        return np.zeros(0, dtype=np.int16)
+    return np.memmap(
+        audio_path, dtype="<i2", mode="r", offset=data_offset, shape=(sample_count,)
+    )
+
+
+def pcm_to_float32(samples: np.ndarray) -> np.ndarray:
+    """
+    将采样转换为模型所需的float32 (int16按满幅归一化), float32输入原样返回。
+
+    :param samples: np.ndarray, int16或float32采样 (可为np.memmap切片).
+    :return: np.ndarray, float32采样.
+    """
+    if samples.dtype == np.int16:
+        return samples.astype(np.float32) / 32768.0
+    return np.asarray(samples, dtype=np.float32)
@@ -0,0 +1,287 @@
+import sys
+import os
+import time
+import multiprocessing
+
+# Ensure the project root is in sys.path for consistent imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils import setup_logger
+from scripts.audio_io import AUDIO_EXTENSIONS, get_audio_duration
+from scripts.modelscope_scripts import (
+    get_asr_pipeline,
+    get_modelscope_setting,
+    get_modelscope_model_lists,
+    run_modelscope_recognition,
+    organize_recognition_results,
+    save_transcription_results,
+)
+
+logger = setup_logger("BATCH_TRANSCRIPTION")
+
+FULL_TEXT_FILENAME = "全文.txt"
+
+DEFAULT_FILES_PER_GROUP = 16
+
+# Joins the sub-directories of a file found with recursive=True into its output name
+OUTPUT_NAME_SEPARATOR = "__"
+
+# Model tuple, batching budget and input root held by each worker process, set by _init_worker
+_worker_models = None
+_worker_batch_size_s = None
+_worker_input_dir = None
+# Set when the model fails to load in _init_worker; every task of the worker then reports it
+_worker_load_error = None
+
+
+def get_default_model_selection() -> tuple:
+    """
+    获取与界面默认选项一致的模型组合 (各列表中的第一个模型)。
+
+    :return: tuple, (主模型, 版本, VAD模型, 版本, 标点模型, 版本, 说话人模型, 版本).
+    """
+    main_models, vad_models, punc_models, speaker_models = get_modelscope_model_lists()
+    if not main_models:
+        raise ValueError("No ASR models configured in modelscope_models.json.")
+
+    selection = []
+    for model_list in (main_models, vad_models, punc_models, speaker_models):
+        first = model_list[0] if model_list else {}
+        selection.extend([first.get("model") or None, first.get("revision") or None])
+    return tuple(selection)
+
+
+def find_audio_files(input_dir: str, recursive: bool = False) -> list[str]:
+    """
+    查找目录中的音频文件。
+
+    :param input_dir: str, 输入目录.
+    :param recursive: bool, 是否递归查找子目录.
+    :return: list[str], 排序后的音频文件路径列表.
+    """
+    audio_files = []
+    if recursive:
+        for root, _, filenames in os.walk(input_dir):
+            for filename in filenames:
+                if filename.lower().endswith(AUDIO_EXTENSIONS):
+                    audio_files.append(os.path.join(root, filename))
+    else:
+        for filename in os.listdir(input_dir):
+            file_path = os.path.join(input_dir, filename)
+            if os.path.isfile(file_path) and filename.lower().endswith(AUDIO_EXTENSIONS):
+                audio_files.append(file_path)
+    return sorted(audio_files)
+
+
+def get_output_name(audio_path: str, input_dir: str = None) -> str:
+    """
+    获取音频文件的输出目录名: 相对输入目录的路径去掉扩展名, 子目录之间以 OUTPUT_NAME_SEPARATOR 连接,
+    使递归查找时不同子目录中的同名文件不会互相覆盖。输入目录下的文件仍只使用文件名。
+
+    :param audio_path: str, 音频文件路径.
+    :param input_dir: str, 输入目录, 为None时只使用文件名.
+    :return: str, 输出目录名.
+    """
+    relative_path = os.path.relpath(audio_path, input_dir) if input_dir else os.path.basename(audio_path)
+    parts = os.path.normpath(os.path.splitext(relative_path)[0]).split(os.sep)
+    return OUTPUT_NAME_SEPARATOR.join(parts)
+
+
+def has_existing_outputs(audio_path: str, input_dir: str = None) -> bool:
+    """
+    判断音频文件是否已有转录结果。
+
+    :param audio_path: str, 音频文件路径.
+    :param input_dir: str, 输入目录, 用于确定输出目录名 (见 get_output_name).
+    :return: bool, 输出目录中已存在全文结果时返回True.
+    """
+    output_dir = get_modelscope_setting("output_dir")
+    return os.path.exists(
+        os.path.join(output_dir, get_output_name(audio_path, input_dir), FULL_TEXT_FILENAME)
+    )
+
+
+def _init_worker(
+    model_selection: tuple, threads_per_worker: int, batch_size_s: float = None, input_dir: str = None
+):
+    """
+    工作进程初始化: 限制推理线程数并预先加载一次模型。
+
+    加载失败时不抛出异常 (进程池初始化函数中的异常会使进程池不断重建工作进程, 任务永远不会完成),
+    而是记录错误, 由之后的每个任务作为该文件的失败原因返回.
+    """
+    global _worker_models, _worker_batch_size_s, _worker_input_dir, _worker_load_error
+    _worker_models = model_selection
+    _worker_batch_size_s = batch_size_s
+    _worker_input_dir = input_dir
+
+    try:
+        import torch
+
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+
+    if batch_size_s is None:
+        try:
+            get_asr_pipeline(*model_selection)
+        except Exception as e:
+            _worker_load_error = f"model load failed: {e}"
+            logger.error(f"Worker {os.getpid()} could not load the ASR model: {e}")
+
+
+def _transcribe_file(audio_path: str) -> dict:
+    """
+    在工作进程中转录单个文件并保存结果。
+
+    :param audio_path: str, 音频文件路径.
+    :return: dict, 包含文件路径、是否成功、音频时长、耗时和错误信息.
+    """
+    start = time.perf_counter()
+    audio_seconds = get_audio_duration(audio_path)
+    try:
+        if _worker_load_error:
+            raise RuntimeError(_worker_load_error)
+        raw_result = run_modelscope_recognition(audio_path, *_worker_models)
+        full_text, speaker_text = organize_recognition_results(raw_result)
+        if not full_text and not speaker_text:
+            raise RuntimeError("empty recognition result")
+
+        filename_base = get_output_name(audio_path, _worker_input_dir)
+        if not save_transcription_results(full_text, speaker_text, filename_base):
+            raise RuntimeError("failed to save results")
+        error = None
+    except Exception as e:
+        error = str(e)
+
+    return {
+        "path": audio_path,
+        "ok": error is None,
+        "audio_seconds": audio_seconds,
+        "elapsed_seconds": time.perf_counter() - start,
+        "error": error,
+    }
+
+
+def _transcribe_file_group(audio_paths: list[str]) -> list[dict]:
+    """
+    在工作进程中以跨文件片段批处理方式转录一组文件并保存结果。
+
+    :param audio_paths: list[str], 同一组的音频文件路径.
+    :return: list[dict], 每个文件的结果字典 (结构同_transcribe_file).
+    """
+    from scripts.segment_batching import transcribe_files_batched
+
+    start = time.perf_counter()
+    try:
+        results_by_path, errors_by_path, _ = transcribe_files_batched(
+            audio_paths, _worker_models, _worker_batch_size_s
+        )
+        group_error = None
+    except Exception as e:
+        # Only a failure shared by the whole group (e.g. loading the models) ends up here
+        results_by_path, errors_by_path, group_error = {}, {}, str(e)
+    # Batched calls cannot be attributed to single files, so the group's
+    # wall time is spread across its files for reporting.
+    elapsed_per_file = (time.perf_counter() - start) / max(1, len(audio_paths))
+
+    file_results = []
+    for audio_path in audio_paths:
+        error = group_error or errors_by_path.get(audio_path)
+        if error is None:
+            full_text, speaker_text = organize_recognition_results(results_by_path.get(audio_path, []))
+            filename_base = get_output_name(audio_path, _worker_input_dir)
+            if not full_text:
+                error = "empty recognition result"
+            elif not save_transcription_results(full_text, speaker_text, filename_base):
+                error = "failed to save results"
+        file_results.append(
+            {
+                "path": audio_path,
+                "ok": error is None,
+                "audio_seconds": get_audio_duration(audio_path),
+                "elapsed_seconds": elapsed_per_file,
+                "error": error,
+            }
+        )
+    return file_results
+
+
+def run_batch_transcription(
+    input_dir: str,
+    model_selection: tuple,
+    workers: int = 1,
+    recursive: bool = False,
+    overwrite: bool = False,
+    progress_callback=None,
+    batch_size_s: float = None,
+    files_per_group: int = DEFAULT_FILES_PER_GROUP,
+) -> dict:
+    """
+    使用进程池批量转录目录中的音频文件。
+
+    :param input_dir: str, 音频所在目录.
+    :param model_selection: tuple, 8项模型组合 (见get_default_model_selection).
+    :param workers: int, 工作进程数, 每个进程各自常驻一份模型.
+    :param recursive: bool, 是否递归查找子目录.
+    :param overwrite: bool, 为True时重新转录已有结果的文件.
+    :param progress_callback: callable, 每完成一个文件时以结果字典调用.
+    :param batch_size_s: float, 设置后启用跨文件片段批处理, 为每个批次的音频秒数上限.
+    :param files_per_group: int, 批处理模式下每个任务包含的文件数.
+    :return: dict, 汇总统计 (文件数、跳过数、失败数、每小时文件数、实时率等).
+    """
+    audio_files = find_audio_files(input_dir, recursive)
+    pending = [
+        path for path in audio_files if overwrite or not has_existing_outputs(path, input_dir)
+    ]
+    skipped = len(audio_files) - len(pending)
+    logger.info(
+        f"Batch transcription: {len(audio_files)} files found, "
+        f"{skipped} skipped, {len(pending)} pending, {workers} workers"
+    )
+
+    results = []
+    start = time.perf_counter()
+    if pending:
+        workers = max(1, min(workers, len(pending)))
+        threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+        # spawn avoids inheriting torch/OpenMP state from the parent process
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(
+            processes=workers,
+            initializer=_init_worker,
+            initargs=(model_selection, threads_per_worker, batch_size_s, input_dir),
+        ) as pool:
+            if batch_size_s is None:
+                result_groups = (
+                    [result] for result in pool.imap_unordered(_transcribe_file, pending)
+                )
+            else:
+                groups = [
+                    pending[i : i + files_per_group]
+                    for i in range(0, len(pending), files_per_group)
+                ]
+                result_groups = pool.imap_unordered(_transcribe_file_group, groups)
+            for result_group in result_groups:
+                for result in result_group:
+                    results.append(result)
+                    if result["ok"]:
+                        logger.info(f"Transcribed {result['path']} in {result['elapsed_seconds']:.1f}s")
+                    else:
+                        logger.error(f"Failed to transcribe {result['path']}: {result['error']}")
+                    if progress_callback:
+                        progress_callback(result)
+    wall_seconds = time.perf_counter() - start
+
+    succeeded = [r for r in results if r["ok"]]
+    audio_seconds = sum(r["audio_seconds"] for r in succeeded)
+    return {
+        "found": len(audio_files),
+        "skipped": skipped,
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "wall_seconds": wall_seconds,
+        "audio_seconds": audio_seconds,
+        "files_per_hour": len(succeeded) / wall_seconds * 3600 if wall_seconds > 0 else 0.0,
+        "real_time_factor": wall_seconds / audio_seconds if audio_seconds > 0 else 0.0,
+    }
@@ -0,0 +1,177 @@
+import sys
+import os
+import time
+import difflib
+
+# Ensure the project root is in sys.path for consistent imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils import setup_logger
+from scripts.text_chunking import chunk_by_turns
+from scripts.llm_scripts import LLM_MODE_OLLAMA, get_llm_chunk_settings, get_llm_mode
+from scripts.llm_router import get_endpoint_pool
+from scripts.token_budget import count_template_tokens, expected_rewrite_tokens, plan_job_ctx
+from scripts.ollama_scripts import (
+    OLLAMA_API_CHAT_ENDPOINT,
+    OLLAMA_API_GENERATE_ENDPOINT,
+    get_ollama_config_values,
+    get_ollama_connection_settings,
+    get_ollama_session,
+)
+from scripts.openai_scripts import set_openai_client
+from scripts.text_fixing import FIX_MODES, fix_text_chunked
+
+logger = setup_logger("LLM_BENCHMARK")
+
+# Unrelated to any template or chunk, so warming up leaves no reusable prefix in the KV cache
+WARM_UP_TEMPLATE = "请用一句话回答。"
+WARM_UP_TEXT = "天空为什么是蓝色的?"
+
+
+def _ollama_prefill(template: str, chunk: str, use_system: bool, num_ctx: int = None) -> dict:
+    """发送只生成一个token的请求, 读取Ollama报告的预填充token数与耗时 (num_ctx为None时使用配置值)。"""
+    base_url, model_name, configured_num_ctx, _, _ = get_ollama_config_values()
+    num_ctx = num_ctx or configured_num_ctx
+    settings = get_ollama_connection_settings()
+    payload = {
+        "model": model_name,
+        "stream": False,
+        "options": {"num_ctx": num_ctx, "num_predict": 1, "temperature": 0},
+    }
+    if use_system:
+        endpoint = OLLAMA_API_CHAT_ENDPOINT
+        payload["messages"] = [
+            {"role": "system", "content": template},
+            {"role": "user", "content": chunk},
+        ]
+    else:
+        endpoint = OLLAMA_API_GENERATE_ENDPOINT
+        payload["prompt"] = template + "\n" + chunk
+    start = time.perf_counter()
+    response = get_ollama_session(base_url, settings["pool_size"]).post(
+        f"{base_url.rstrip('/')}{endpoint}",
+        json=payload,
+        timeout=(settings["connect_timeout"], settings["read_timeout"]),
+    )
+    response.raise_for_status()
+    result = response.json()
+    return {
+        "wall_seconds": time.perf_counter() - start,
+        "prefill_seconds": result.get("prompt_eval_duration", 0) / 1e9,
+        # Ollama only counts prompt tokens it actually evaluated, so reused prefix tokens drop out
+        "prompt_tokens_evaluated": result.get("prompt_eval_count", 0),
+        "cached_tokens": None,
+    }
+
+
+def _openai_prefill(template: str, chunk: str, use_system: bool, model_name: str) -> dict:
+    """发送只生成一个token的请求, 以请求耗时近似首token延迟, 并读取服务端报告的缓存token数。"""
+    if use_system:
+        messages = [{"role": "system", "content": template}, {"role": "user", "content": chunk}]
+    else:
+        messages = [{"role": "user", "content": template + "\n" + chunk}]
+    start = time.perf_counter()
+    response = set_openai_client(model_name).chat.completions.create(
+        model=model_name, messages=messages, max_tokens=1, temperature=0
+    )
+    wall_seconds = time.perf_counter() - start
+    usage = getattr(response, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "wall_seconds": wall_seconds,
+        "prefill_seconds": wall_seconds,
+        "prompt_tokens_evaluated": getattr(usage, "prompt_tokens", 0) or 0,
+        "cached_tokens": getattr(details, "cached_tokens", None),
+    }
+
+
+def benchmark_prefix_reuse(
+    template: str, text: str, chunk_chars: int = None, output_estimator=expected_rewrite_tokens
+) -> dict:
+    """
+    比较同一模板依次处理多个分块时, 模板拼接在正文前 (/api/generate) 与模板作为固定系统消息
+    (/api/chat 或 system 角色) 两种方式的每块预填充耗时。请求只生成一个token且不经过输出缓存。
+
+    Ollama使用服务端报告的 prompt_eval_duration, 上下文大小与实际修正/归纳任务相同 (plan_job_ctx);
+    在线模型以请求耗时近似, 并读取 usage.prompt_tokens_details.cached_tokens (服务端支持时)。
+    计时前先用无关的提示加载模型, 两种方式的第一个请求都不会命中预热留下的提示缓存。
+
+    :param template: str, 提示词模板.
+    :param text: str, 用于分块的文本.
+    :param chunk_chars: int, 每块最大字符数, 为None时使用当前后端的配置.
+    :param output_estimator: callable, 由正文token数估算输出token数, 用于确定上下文大小
+                             (修正模板为 expected_rewrite_tokens, 归纳模板为 expected_summary_tokens).
+    :return: dict, 包含 llm_mode、chunks、template_tokens、num_ctx, 以及 "concatenated" 与 "system_prefix"
+             两组统计 (mean_prefill_seconds、total_prefill_seconds、mean_prompt_tokens_evaluated、
+             cached_tokens).
+    :raises ValueError: 如果文本为空.
+    """
+    llm_mode = get_llm_mode()
+    chunks = chunk_by_turns(text, chunk_chars or get_llm_chunk_settings(llm_mode)[0])
+    if not chunks:
+        raise ValueError("Benchmark text is empty.")
+    num_ctx = plan_job_ctx(template, chunks, output_estimator, llm_mode)
+    if llm_mode == LLM_MODE_OLLAMA:
+
+        def measure(template: str, chunk: str, use_system: bool) -> dict:
+            return _ollama_prefill(template, chunk, use_system, num_ctx)
+
+    else:
+        model_name = get_endpoint_pool(llm_mode)[0]["target"]
+
+        def measure(template: str, chunk: str, use_system: bool) -> dict:
+            return _openai_prefill(template, chunk, use_system, model_name)
+
+    # Load the model once so neither mode pays the cold start
+    measure(WARM_UP_TEMPLATE, WARM_UP_TEXT, False)
+
+    report = {
+        "llm_mode": llm_mode,
+        "chunks": len(chunks),
+        "template_tokens": count_template_tokens(template),
+        "num_ctx": num_ctx,
+    }
+    for label, use_system in (("concatenated", False), ("system_prefix", True)):
+        results = [measure(template, chunk, use_system) for chunk in chunks]
+        cached = [r["cached_tokens"] for r in results if r["cached_tokens"] is not None]
+        total_prefill = sum(r["prefill_seconds"] for r in results)
+        report[label] = {
+            "mean_prefill_seconds": round(total_prefill / len(results), 3),
+            "total_prefill_seconds": round(total_prefill, 2),
+            "mean_prompt_tokens_evaluated": round(
+                sum(r["prompt_tokens_evaluated"] for r in results) / len(results), 1
+            ),
+            "cached_tokens": sum(cached) if cached else None,
+        }
+        logger.info(f"Prefix benchmark {label}: {report[label]}")
+    return report
+
+
+def benchmark_fix_modes(template: str, text: str, chunk_chars: int = None) -> dict:
+    """
+    用同一模板和文本分别以全文改写与修改列表两种方式修正 (不使用输出缓存), 比较输出token数与耗时。
+
+    :param template: str, 修正模板.
+    :param text: str, 待修正文本.
+    :param chunk_chars: int, 每块最大字符数, 为None时使用当前后端的配置.
+    :return: dict, 以模式 ("rewrite"、"edits") 为键, 各含 wall_seconds、output_tokens、chunks
+             与 fallback_chunks (修改列表无法应用而改写的块数); 另含 output_similarity
+             (两种方式结果的相似度, 用于确认质量接近).
+    """
+    report, outputs = {}, {}
+    for fix_mode in FIX_MODES:
+        start = time.perf_counter()
+        outputs[fix_mode], _, chunk_stats = fix_text_chunked(
+            text, template, chunk_chars=chunk_chars, use_cache=False, fix_mode=fix_mode
+        )
+        report[fix_mode] = {
+            "wall_seconds": round(time.perf_counter() - start, 2),
+            "output_tokens": sum(item["output_tokens"] for item in chunk_stats),
+            "chunks": len(chunk_stats),
+            "fallback_chunks": sum(1 for item in chunk_stats if item["mode"] == "edits_fallback"),
+        }
+        logger.info(f"Fix benchmark {fix_mode}: {report[fix_mode]}")
+    report["output_similarity"] = round(
+        difflib.SequenceMatcher(None, *(outputs[fix_mode] for fix_mode in FIX_MODES), autojunk=False).ratio(), 3
+    )
+    return report
@@ -0,0 +1,210 @@
+import sys
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+
+# Ensure the project root is in sys.path for consistent imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils import load_config_section, setup_logger
+
+logger = setup_logger("LLM_CACHE")
+
+LLM_CACHE_PATH = os.path.join("cache", "llm_responses.sqlite3")
+LLM_CACHE_MODE_AUTO = "auto"  # Cache only deterministic (temperature 0) requests
+LLM_CACHE_MODE_ALWAYS = "always"
+LLM_CACHE_MODE_OFF = "off"
+LLM_CACHE_MODES = [LLM_CACHE_MODE_AUTO, LLM_CACHE_MODE_ALWAYS, LLM_CACHE_MODE_OFF]
+DEFAULT_LLM_CACHE_MAX_MB = 64
+REPLAY_CHUNK_CHARS = 16
+
+_db_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(stat_name: str):
+    with _stats_lock:
+        _stats[stat_name] += 1
+
+
+def get_llm_cache_settings() -> tuple[str, int]:
+    """
+    从config.ini的SYSTEM区域读取模型输出缓存设置。
+
+    :return: tuple[str, int], (缓存模式 auto/always/off, 最大占用字节数).
+    """
+    try:
+        system_config = load_config_section("SYSTEM")
+        mode = system_config.get("llm_cache_mode", LLM_CACHE_MODE_AUTO).strip().lower()
+        max_mb = int(system_config.get("llm_cache_max_mb", DEFAULT_LLM_CACHE_MAX_MB))
+    except ValueError as e:
+        logger.warning(f"Invalid LLM cache settings, using defaults: {e}")
+        mode, max_mb = LLM_CACHE_MODE_AUTO, DEFAULT_LLM_CACHE_MAX_MB
+    if mode not in LLM_CACHE_MODES:
+        mode = LLM_CACHE_MODE_AUTO
+    return mode, max_mb * 1024 * 1024
+
+
+@contextmanager
+def _open_db():
+    """打开缓存数据库并在一个事务中使用, 结束时提交并关闭连接。"""
+    os.makedirs(os.path.dirname(LLM_CACHE_PATH), exist_ok=True)
+    with _db_lock:
+        connection = sqlite3.connect(LLM_CACHE_PATH, timeout=30)
+        try:
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, backend TEXT, model TEXT, response TEXT, "
+                    "size INTEGER, created REAL, last_access REAL)"
+                )
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)"
+                )
+                yield connection
+        finally:
+            connection.close()
+
+
+def get_llm_cache_key(
+    prompt: str, backend: str, model_name: str, options: dict, use_cache: bool = True
+):
+    """
+    判断本次请求是否使用缓存, 并生成缓存键。
+
+    :param prompt: str, 最终发送给模型的提示.
+    :param backend: str, 后端名称 ("Ollama" 或 "OpenAI").
+    :param model_name: str, 模型名称.
+    :param options: dict, 影响输出的采样参数 (temperature、top_p、max_tokens/num_ctx 等).
+    :param use_cache: bool, 为False时跳过缓存 (单次请求绕过).
+    :return: str 或 None, 缓存键; 不使用缓存时返回None.
+    """
+    if not use_cache:
+        return None
+    mode, _ = get_llm_cache_settings()
+    if mode == LLM_CACHE_MODE_OFF:
+        return None
+    if mode == LLM_CACHE_MODE_AUTO and float(options.get("temperature", 1.0)) != 0.0:
+        return None
+    key_material = json.dumps(
+        [prompt, backend, model_name, options], ensure_ascii=False, sort_keys=True
+    )
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+
+def load_cached_response(cache_key: str):
+    """
+    读取缓存的模型输出, 命中时刷新访问时间。
+
+    :param cache_key: str, 缓存键.
+    :return: str 或 None, 缓存的完整输出, 未命中时返回None.
+    """
+    try:
+        with _open_db() as connection:
+            row = connection.execute(
+                "SELECT response FROM responses WHERE key = ?", (cache_key,)
+            ).fetchone()
+            if row is not None:
+                connection.execute(
+                    "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), cache_key)
+                )
+            _count("hits" if row is not None else "misses")
+    except sqlite3.Error as e:
+        logger.warning(f"LLM cache lookup failed: {e}")
+        return None
+    return row[0] if row is not None else None
+
+
+def store_cached_response(cache_key: str, backend: str, model_name: str, response: str):
+    """
+    写入一次成功完成的模型输出, 并按LRU淘汰超出容量的旧条目。
+    只应在流式输出完整结束且未发生错误时调用。
+
+    :param cache_key: str, 缓存键.
+    :param backend: str, 后端名称.
+    :param model_name: str, 模型名称.
+    :param response: str, 完整输出.
+    """
+    if not response:
+        return
+    _, max_bytes = get_llm_cache_settings()
+    now = time.time()
+    size = len(response.encode("utf-8"))
+    try:
+        with _open_db() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cache_key, backend, model_name, response, size, now, now),
+            )
+            _count("writes")
+            _evict(connection, max_bytes)
+    except sqlite3.Error as e:
+        logger.warning(f"LLM cache write failed: {e}")
+
+
+def _evict(connection: sqlite3.Connection, max_bytes: int):
+    total_bytes = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    if total_bytes <= max_bytes:
+        return
+    for key, size in connection.execute(
+        "SELECT key, size FROM responses ORDER BY last_access"
+    ).fetchall():
+        if total_bytes <= max_bytes:
+            break
+        connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+        total_bytes -= size
+        _count("evictions")
+
+
+def replay_cached_response(response: str):
+    """
+    将缓存的完整输出按小块重新产出, 使调用方的流式处理逻辑保持不变。
+
+    :param response: str, 缓存的完整输出.
+    :return: 生成器, 逐块产生文本.
+    """
+    for start in range(0, len(response), REPLAY_CHUNK_CHARS):
+        yield response[start : start + REPLAY_CHUNK_CHARS]
+
+
+def clear_llm_cache():
+    """删除所有缓存的模型输出。"""
+    try:
+        with _open_db() as connection:
+            connection.execute("DELETE FROM responses")
+    except sqlite3.Error as e:
+        logger.warning(f"Failed to clear LLM cache: {e}")
+
+
+def get_llm_cache_stats() -> dict:
+    """
+    返回模型输出缓存的统计信息。
+
+    :return: dict, 包含模式、条目数、占用大小和本进程内的命中/未命中次数.
+    """
+    mode, max_bytes = get_llm_cache_settings()
+    with _stats_lock:
+        stats = dict(_stats)
+    entries, size_bytes = 0, 0
+    if os.path.exists(LLM_CACHE_PATH):
+        try:
+            with _open_db() as connection:
+                entries, size_bytes = connection.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read LLM cache stats: {e}")
+    stats.update(
+        {
+            "mode": mode,
+            "entries": entries,
+            "size_mb": round(size_bytes / 1024 / 1024, 2),
+            "max_mb": round(max_bytes / 1024 / 1024, 1),
+        }
+    )
+    return stats
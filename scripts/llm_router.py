@@ -0,0 +1,257 @@
+import sys
+import os
+import time
+import asyncio
+
+import httpx
+import openai
+
+# Ensure the project root is in sys.path for consistent imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils import load_config_section, setup_logger
+from scripts.ollama_scripts import agenerate_ollama_completion
+from scripts.openai_scripts import agenerate_openai_completion
+
+logger = setup_logger("LLM_ROUTER")
+
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_RETRY_BACKOFF_SECONDS = 1.0
+# An endpoint that failed this many times in a row (connection errors, timeouts, 5xx)
+# is skipped for a while, unless every endpoint in the pool is unhealthy.
+UNHEALTHY_AFTER_FAILURES = 2
+UNHEALTHY_COOLDOWN_SECONDS = 30.0
+LATENCY_EWMA_WEIGHT = 0.3
+
+# Endpoint stats are only mutated on the async_llm event loop; readers get copies.
+_endpoint_stats = {}
+
+
+class LLMRequestError(Exception):
+    """路由后的LLM请求最终失败 (配置错误、不可重试的错误、输出中途出错或重试耗尽)。"""
+
+
+def _split_list(value: str) -> list[str]:
+    return [item.strip() for item in (value or "").replace("\n", ",").split(",") if item.strip()]
+
+
+def get_endpoint_pool(llm_mode: str) -> list[dict]:
+    """
+    读取当前后端可用的端点池。
+
+    Ollama: [OLLAMA] base_url 以及 base_urls 中的其他地址 (使用同一模型);
+    OpenAI: [OPENAI] 默认模型以及 fallback_models 中的备用模型 (均需在openai.json中配置).
+
+    :param llm_mode: str, "Ollama" 或 "OpenAI".
+    :return: list[dict], 每个端点包含 name、backend 与 target (Ollama地址或在线模型名称).
+    :raises ValueError: 如果LLM模式不受支持或端点未配置.
+    """
+    if llm_mode == "Ollama":
+        ollama_config = load_config_section("OLLAMA")
+        base_urls = _split_list(ollama_config.get("base_url", "")) + _split_list(
+            ollama_config.get("base_urls", "")
+        )
+        targets = list(dict.fromkeys(url.rstrip("/") for url in base_urls))
+        if not targets:
+            raise ValueError("Ollama 'base_url' is not configured in config.ini.")
+    elif llm_mode == "OpenAI":
+        openai_config = load_config_section("OPENAI")
+        default_model = openai_config.get("model")
+        if not default_model:
+            raise ValueError("默认在线模型未在config.ini中配置。请先在 设置 > 在线模型 页面配置。")
+        targets = list(
+            dict.fromkeys([default_model] + _split_list(openai_config.get("fallback_models", "")))
+        )
+    else:
+        raise ValueError(f"不支持的LLM模式: {llm_mode}")
+    return [{"name": f"{llm_mode}:{target}", "backend": llm_mode, "target": target} for target in targets]
+
+
+def get_retry_settings() -> tuple[int, float]:
+    """
+    读取[SYSTEM]区域的重试设置。
+
+    :return: tuple[int, float], (最大重试轮数, 初始退避秒数).
+    """
+    system_config = load_config_section("SYSTEM")
+    try:
+        max_retries = max(0, int(system_config.get("llm_max_retries", DEFAULT_MAX_RETRIES)))
+        backoff = max(0.0, float(system_config.get("llm_retry_backoff", DEFAULT_RETRY_BACKOFF_SECONDS)))
+    except ValueError as e:
+        logger.warning(f"Invalid retry settings, using defaults: {e}")
+        max_retries, backoff = DEFAULT_MAX_RETRIES, DEFAULT_RETRY_BACKOFF_SECONDS
+    return max_retries, backoff
+
+
+def _get_stats(endpoint: dict) -> dict:
+    stats = _endpoint_stats.get(endpoint["name"])
+    if stats is None:
+        stats = {
+            "endpoint": endpoint["name"],
+            "outstanding": 0,
+            "requests": 0,
+            "successes": 0,
+            "failures": 0,
+            "consecutive_failures": 0,
+            "latency_seconds": None,
+            "first_chunk_seconds": None,
+            "unhealthy_until": 0.0,
+            "last_error": "",
+        }
+        _endpoint_stats[endpoint["name"]] = stats
+    return stats
+
+
+def _ewma(previous, value: float) -> float:
+    if previous is None:
+        return value
+    return previous * (1 - LATENCY_EWMA_WEIGHT) + value * LATENCY_EWMA_WEIGHT
+
+
+def _pick_endpoint(endpoints: list[dict], tried: set):
+    """在本轮未尝试的端点中, 优先选择健康、进行中请求最少、最近未失败、延迟最低的一个。"""
+    now = time.monotonic()
+    candidates = [endpoint for endpoint in endpoints if endpoint["name"] not in tried]
+    if not candidates:
+        return None
+
+    def rank(endpoint: dict):
+        stats = _get_stats(endpoint)
+        return (
+            stats["unhealthy_until"] > now,
+            stats["outstanding"],
+            stats["consecutive_failures"],
+            stats["latency_seconds"] or 0.0,
+        )
+
+    return min(candidates, key=rank)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """连接错误、超时、429与5xx可以重试或切换端点, 其余错误 (如配置错误、4xx) 直接返回。"""
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def _is_endpoint_failure(error: Exception) -> bool:
+    """连接错误、超时与5xx说明端点本身有问题, 计入健康状态; 429与其他4xx (鉴权、模型名错误等) 不计入。"""
+    if isinstance(error, (httpx.TransportError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code >= 500
+    return False
+
+
+def _open_stream(endpoint: dict, prompt: str, num_ctx: int, use_cache: bool, system: str):
+    if endpoint["backend"] == "Ollama":
+        return agenerate_ollama_completion(
+            prompt, num_ctx, use_cache, system, base_url=endpoint["target"], raise_errors=True
+        )
+    return agenerate_openai_completion(
+        prompt, endpoint["target"], use_cache, system, raise_errors=True
+    )
+
+
+async def agenerate_routed(
+    llm_mode: str, prompt: str, num_ctx: int = None, use_cache: bool = True, system: str = None
+):
+    """
+    在端点池中选择端点并生成文本补全 (流式, 在async_llm的事件循环中使用)。
+
+    按进行中请求数最少的原则选择端点; 在输出第一块之前发生连接错误、超时、429或5xx时
+    切换到下一个端点, 所有端点都失败后按指数退避重试下一轮。已开始输出后的错误无法透明重试,
+    会抛出LLMRequestError。各端点的健康状态与延迟见 get_router_stats.
+
+    :param llm_mode: str, "Ollama" 或 "OpenAI".
+    :param prompt: str, 输入给模型的提示.
+    :param num_ctx: int, Ollama的上下文窗口大小, OpenAI后端忽略.
+    :param use_cache: bool, 为False时本次请求绕过模型输出缓存.
+    :param system: str, 系统消息, 为None时不单独发送.
+    :return: 异步生成器, 逐块产生生成的文本.
+    :raises LLMRequestError: 如果配置错误、出现不可重试的错误、已开始输出后出错或重试耗尽.
+    """
+    try:
+        endpoints = await asyncio.to_thread(get_endpoint_pool, llm_mode)
+        max_retries, backoff = await asyncio.to_thread(get_retry_settings)
+    except ValueError as e:
+        raise LLMRequestError(f"LLM配置错误: {e}") from e
+
+    last_error = None
+    for attempt_round in range(max_retries + 1):
+        if attempt_round > 0:
+            delay = backoff * 2 ** (attempt_round - 1)
+            logger.warning(f"All {llm_mode} endpoints failed, retrying in {delay:.1f}s: {last_error}")
+            await asyncio.sleep(delay)
+
+        tried = set()
+        while True:
+            endpoint = _pick_endpoint(endpoints, tried)
+            if endpoint is None:
+                break
+            tried.add(endpoint["name"])
+            stats = _get_stats(endpoint)
+            stats["outstanding"] += 1
+            stats["requests"] += 1
+            start = time.perf_counter()
+            emitted = False
+            try:
+                async for chunk in _open_stream(endpoint, prompt, num_ctx, use_cache, system):
+                    if not emitted:
+                        stats["first_chunk_seconds"] = _ewma(
+                            stats["first_chunk_seconds"], time.perf_counter() - start
+                        )
+                        emitted = True
+                    yield chunk
+            except Exception as e:
+                stats["failures"] += 1
+                stats["last_error"] = f"{type(e).__name__}: {e}"[:200]
+                if _is_endpoint_failure(e):
+                    stats["consecutive_failures"] += 1
+                    if stats["consecutive_failures"] >= UNHEALTHY_AFTER_FAILURES:
+                        stats["unhealthy_until"] = time.monotonic() + UNHEALTHY_COOLDOWN_SECONDS
+                if emitted or not _is_retryable(e):
+                    logger.error(f"LLM request on {endpoint['name']} failed: {e}")
+                    raise LLMRequestError(f"LLM请求失败 ({endpoint['name']}): {e}") from e
+                last_error = e
+                logger.warning(f"LLM request on {endpoint['name']} failed, failing over: {e}")
+                continue
+            finally:
+                stats["outstanding"] -= 1
+
+            stats["successes"] += 1
+            stats["consecutive_failures"] = 0
+            stats["unhealthy_until"] = 0.0
+            stats["latency_seconds"] = _ewma(stats["latency_seconds"], time.perf_counter() - start)
+            return
+
+    raise LLMRequestError(
+        f"LLM请求失败, 已重试{max_retries}轮 ({len(endpoints)}个端点): {last_error}"
+    ) from last_error
+
+
+def get_router_stats() -> list[dict]:
+    """
+    返回各端点的健康状态与延迟统计 (本进程内)。
+
+    :return: list[dict], 每个端点包含 endpoint、healthy、outstanding、requests、successes、failures、
+             latency_seconds (完整请求耗时的指数加权平均)、first_chunk_seconds 与 last_error.
+    """
+    now = time.monotonic()
+    report = []
+    for stats in list(_endpoint_stats.values()):
+        entry = dict(stats)
+        entry["healthy"] = entry.pop("unhealthy_until") <= now
+        for key in ("latency_seconds", "first_chunk_seconds"):
+            if entry[key] is not None:
+                entry[key] = round(entry[key], 2)
+        report.append(entry)
+    return report
@@ -0,0 +1,206 @@
+import sys
+import os
+import asyncio
+from concurrent.futures import wait
+
+# Ensure the project root is in sys.path for consistent imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils import load_config_section, setup_logger
+from scripts.async_llm import iterate_sync, submit
+from scripts.llm_router import LLMRequestError, agenerate_routed
+
+logger = setup_logger("LLM_SCRIPTS")
+
+LLM_MODE_OLLAMA = "Ollama"
+LLM_MODE_OPENAI = "OpenAI"
+
+# Per-backend defaults: a local model with num_ctx 4096 needs far smaller
+# chunks (and less fan-out) than a hosted long-context model.
+DEFAULT_CHUNK_CHARS = {LLM_MODE_OLLAMA: 2000, LLM_MODE_OPENAI: 12000}
+DEFAULT_MAP_CONCURRENCY = {LLM_MODE_OLLAMA: 2, LLM_MODE_OPENAI: 4}
+LIVE_POLL_SECONDS = 0.2
+
+
+def get_llm_mode() -> str:
+    """
+    获取当前选择的LLM后端。
+
+    :return: str, "Ollama" 或 "OpenAI".
+    """
+    return load_config_section("SYSTEM").get("llm_mode", LLM_MODE_OLLAMA)
+
+
+def get_llm_model_identity(llm_mode: str = None) -> str:
+    """
+    返回当前后端与默认模型的标识, 用于区分不同模型生成的结果。
+
+    :param llm_mode: str, "Ollama" 或 "OpenAI", 为None时读取当前配置.
+    :return: str, 形如 "Ollama:gemma3:4b".
+    """
+    llm_mode = llm_mode or get_llm_mode()
+    return f"{llm_mode}:{load_config_section(_backend_section(llm_mode)).get('model', '')}"
+
+
+def _backend_section(llm_mode: str) -> str:
+    if llm_mode == LLM_MODE_OLLAMA:
+        return "OLLAMA"
+    if llm_mode == LLM_MODE_OPENAI:
+        return "OPENAI"
+    raise ValueError(f"不支持的LLM模式: {llm_mode}")
+
+
+def is_prefix_reuse_enabled() -> bool:
+    """
+    是否启用前缀复用模式 ([SYSTEM] prefix_reuse): 提示词模板作为固定的系统消息发送
+    (Ollama使用 /api/chat), 便于服务端复用相同前缀的提示缓存。
+
+    :return: bool, 是否启用.
+    """
+    return load_config_section("SYSTEM").getboolean("prefix_reuse", fallback=False)
+
+
+def generate_llm_completion(
+    prompt: str, num_ctx: int = None, use_cache: bool = True, system: str = None
+):
+    """
+    按照[SYSTEM] llm_mode选择后端, 经llm_router在端点池中路由并生成文本补全 (流式)。
+
+    :param prompt: str, 输入给模型的提示 (提供system时为模板之后的正文).
+    :param num_ctx: int, Ollama的上下文窗口大小 (见token_budget.plan_prompt), OpenAI后端忽略.
+    :param use_cache: bool, 为False时本次请求绕过模型输出缓存.
+    :param system: str, 提示词模板; 启用前缀复用时作为系统消息发送, 否则拼接在prompt之前.
+    :return: 生成器, 逐块产生生成的文本; 最终失败时产生错误说明 (保持原有同步接口的行为,
+             需要区分失败的调用方应使用 complete_text).
+    """
+    try:
+        yield from iterate_sync(agenerate_llm_completion(prompt, num_ctx, use_cache, system))
+    except LLMRequestError as e:
+        logger.error(f"LLM request failed: {e}")
+        yield str(e)
+
+
+async def agenerate_llm_completion(
+    prompt: str, num_ctx: int = None, use_cache: bool = True, system: str = None
+):
+    """
+    generate_llm_completion 的异步版本, 在后台事件循环 (async_llm) 中使用。
+
+    :param prompt: str, 输入给模型的提示 (提供system时为模板之后的正文).
+    :param num_ctx: int, Ollama的上下文窗口大小, OpenAI后端忽略.
+    :param use_cache: bool, 为False时本次请求绕过模型输出缓存.
+    :param system: str, 提示词模板; 启用前缀复用时作为系统消息发送, 否则拼接在prompt之前.
+    :return: 异步生成器, 逐块产生生成的文本.
+    """
+    if system is not None and not await asyncio.to_thread(is_prefix_reuse_enabled):
+        prompt, system = system + "\n" + prompt, None
+    llm_mode = await asyncio.to_thread(get_llm_mode)
+    async for chunk in agenerate_routed(llm_mode, prompt, num_ctx, use_cache, system):
+        yield chunk
+
+
+async def acomplete_text(
+    prompt: str, num_ctx: int = None, use_cache: bool = True, on_chunk=None, system: str = None
+) -> str:
+    """
+    complete_text 的异步版本, 供 run_concurrently 调度的协程使用。
+
+    :param prompt: str, 输入给模型的提示 (提供system时为模板之后的正文).
+    :param num_ctx: int, Ollama的上下文窗口大小, 为None时使用配置值.
+    :param use_cache: bool, 为False时本次请求绕过模型输出缓存.
+    :param on_chunk: callable, 每收到一块输出时调用 (例如 ThinkTagStreamParser.feed).
+    :param system: str, 提示词模板, 见 agenerate_llm_completion.
+    :return: str, 模型的完整输出.
+    :raises LLMRequestError: 如果请求最终失败.
+    """
+    chunks = []
+    async for chunk in agenerate_llm_completion(prompt, num_ctx, use_cache, system):
+        chunks.append(chunk)
+        if on_chunk:
+            on_chunk(chunk)
+    return "".join(chunks)
+
+
+def complete_text(
+    prompt: str, num_ctx: int = None, use_cache: bool = True, on_chunk=None, system: str = None
+) -> str:
+    """
+    生成文本补全并返回完整的原始输出 (包含可能的<think>标签)。
+
+    :param prompt: str, 输入给模型的提示 (提供system时为模板之后的正文).
+    :param num_ctx: int, Ollama的上下文窗口大小, 为None时使用配置值.
+    :param use_cache: bool, 为False时本次请求绕过模型输出缓存.
+    :param on_chunk: callable, 每收到一块输出时调用 (例如 ThinkTagStreamParser.feed).
+    :param system: str, 提示词模板, 见 agenerate_llm_completion.
+    :return: str, 模型的完整输出.
+    :raises LLMRequestError: 如果请求最终失败.
+    """
+    chunks = []
+    for chunk in iterate_sync(agenerate_llm_completion(prompt, num_ctx, use_cache, system)):
+        chunks.append(chunk)
+        if on_chunk:
+            on_chunk(chunk)
+    return "".join(chunks)
+
+
+def get_llm_chunk_settings(llm_mode: str = None) -> tuple[int, int]:
+    """
+    读取当前后端的分块设置 (位于[OLLAMA]或[OPENAI]区域)。
+
+    :param llm_mode: str, LLM模式, 为None时使用当前配置的模式.
+    :return: tuple[int, int], (每块最大字符数, 并发请求数).
+    """
+    llm_mode = llm_mode or get_llm_mode()
+    backend_config = load_config_section(_backend_section(llm_mode))
+    try:
+        chunk_chars = int(backend_config.get("chunk_chars", DEFAULT_CHUNK_CHARS[llm_mode]))
+        concurrency = int(
+            backend_config.get("map_concurrency", DEFAULT_MAP_CONCURRENCY[llm_mode])
+        )
+    except ValueError as e:
+        logger.warning(f"Invalid chunk settings for {llm_mode}, using defaults: {e}")
+        chunk_chars, concurrency = DEFAULT_CHUNK_CHARS[llm_mode], DEFAULT_MAP_CONCURRENCY[llm_mode]
+    return max(200, chunk_chars), max(1, concurrency)
+
+
+def run_concurrently(
+    func, items: list, max_concurrency: int, poll_callback=None, poll_interval: float = LIVE_POLL_SECONDS
+) -> list:
+    """
+    在后台事件循环中以有限并发对每个元素执行协程函数func, 结果顺序与输入一致。
+    各后端另有进程级的并行上限 (max_parallel), 多个任务同时运行时共同受其限制。
+    任一调用出错或等待被中断 (如停止页面) 时, 其余调用会被取消。
+
+    :param func: 协程函数, 对单个元素执行 (通常会发起LLM请求).
+    :param items: list, 输入元素列表.
+    :param max_concurrency: int, 本次同时进行的最大调用数.
+    :param poll_callback: callable, 等待期间在调用线程中定期调用 (用于刷新界面,
+                          Streamlit组件只能在脚本线程中更新).
+    :param poll_interval: float, poll_callback的调用间隔 (秒).
+    :return: list, 每个元素对应的返回值.
+    """
+
+    async def run_all():
+        limiter = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run_one(item):
+            async with limiter:
+                return await func(item)
+
+        tasks = [asyncio.ensure_future(run_one(item)) for item in items]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    future = submit(run_all())
+    try:
+        while poll_callback and not future.done():
+            wait([future], timeout=poll_interval)
+            poll_callback()
+        return future.result()
+    except BaseException:
+        future.cancel()
+        raise
@@ -1,12 +1,25 @@
 import sys
 import os
+import re
 import json
+import tempfile
+import threading
+import numpy as np
 import streamlit as st
 
 # Ensure the project root is in sys.path for consistent imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from scripts.utils import load_config_section, setup_logger  # Corrected import
+from scripts.pipeline_registry import get_pipeline_registry
+from scripts.audio_io import MODEL_SAMPLE_RATE, iter_audio_blocks, pcm_to_float32
+from scripts.pcm_cache import find_cached_pcm, get_decoded_pcm, iter_pcm_blocks
+from scripts.result_cache import (
+    build_result_cache_key,
+    get_result_cache_settings,
+    load_cached_result,
+    store_cached_result,
+)
 from modelscope.utils.constant import Tasks
 from modelscope.pipelines import pipeline
 
@@ -17,6 +30,24 @@ CONFIG_DIR = "config"
 MODELSCOPE_MODELS_JSON_FILE = "modelscope_models.json"
 MODELSCOPE_MODELS_JSON_PATH = os.path.join(CONFIG_DIR, MODELSCOPE_MODELS_JSON_FILE)
 
+CUSTOM_PROFILE = "custom"
+AUTO_PROFILE = "auto"
+# Recordings longer than this fall back to the fast profile in auto mode
+AUTO_PROFILE_LONG_AUDIO_SECONDS = 1800
+PROFILE_RTF_SMOOTHING = 0.3
+# Measured RTF is machine-specific runtime state, kept out of the tracked model config
+PROFILE_RTF_PATH = os.path.join("cache", "profile_rtf.json")
+_profile_rtf_lock = threading.Lock()
+
+DEFAULT_STREAM_WINDOW_SECONDS = 300
+STREAM_DECODE_BLOCK_SECONDS = 10
+# Speech in the last part of a window may be cut mid-sentence, so it is
+# carried over to the next window instead of being recognised twice.
+STREAM_WINDOW_TAIL_GUARD_MS = 3000
+
+# Rich-transcription tags emitted by SenseVoice, e.g. <|zh|><|NEUTRAL|><|Speech|><|woitn|>
+RICH_TRANSCRIPTION_TAG_PATTERN = re.compile(r"<\|[^|<>]*\|>")
+
 
 def get_modelscope_setting(setting_key: str) -> str:
     """
@@ -28,8 +59,7 @@ def get_modelscope_setting(setting_key: str) -> str:
     return load_config_section("MODELSCOPE")[setting_key]
 
 
-def run_modelscope_recognition(
-    audio_input_path: str,
+def get_asr_pipeline(
     model_id: str,
     model_revision: str,
     vad_model_id: str,
@@ -38,11 +68,10 @@ def run_modelscope_recognition(
     punc_model_revision: str,
     spk_model_id: str,
     spk_model_revision: str,
-) -> list:
+):
     """
-    使用指定的ModelScope模型对音频进行识别。
+    从进程级注册表获取ASR推理管道, 未加载时才创建。
 
-    :param audio_input_path: str, 输入音频文件的路径.
     :param model_id: str, 主模型ID.
     :param model_revision: str, 主模型版本.
     :param vad_model_id: str, VAD模型ID.
@@ -51,7 +80,7 @@ def run_modelscope_recognition(
     :param punc_model_revision: str, 标点模型版本.
     :param spk_model_id: str, 说话人模型ID.
     :param spk_model_revision: str, 说话人模型版本.
-    :return: list, 识别结果列表.
+    :return: ModelScope ASR pipeline 实例.
     :raises ValueError: 如果MODELSCOPE_CACHE未配置.
     """
     cache_path = get_modelscope_setting("MODELSCOPE_CACHE")
@@ -59,8 +88,19 @@ def run_modelscope_recognition(
         raise ValueError("MODELSCOPE_CACHE is not configured in config.ini.")
     os.environ["MODELSCOPE_CACHE"] = cache_path  # Set cache path for ModelScope
 
-    try:
-        inference_pipeline = pipeline(
+    pipeline_key = (
+        model_id,
+        model_revision,
+        vad_model_id,
+        vad_model_revision,
+        punc_model_id,
+        punc_model_revision,
+        spk_model_id,
+        spk_model_revision,
+    )
+    return get_pipeline_registry().get(
+        pipeline_key,
+        lambda: pipeline(
             task=Tasks.auto_speech_recognition,
             model=model_id,
             model_revision=model_revision,
@@ -71,8 +111,92 @@ def run_modelscope_recognition(
             spk_model=spk_model_id,
             spk_model_revision=spk_model_revision,
             disable_update=True
+        ),
+    )
+
+
+def run_modelscope_recognition(
+    audio_input_path: str,
+    model_id: str,
+    model_revision: str,
+    vad_model_id: str,
+    vad_model_revision: str,
+    punc_model_id: str,
+    punc_model_revision: str,
+    spk_model_id: str,
+    spk_model_revision: str,
+    use_cache: bool = True,
+) -> list:
+    """
+    使用指定的ModelScope模型对音频进行识别。
+    推理管道由进程级注册表复用, 仅在首次使用某个模型组合时加载;
+    相同音频内容与模型组合的识别结果从磁盘缓存直接返回。
+
+    :param audio_input_path: str, 输入音频文件的路径.
+    :param model_id: str, 主模型ID.
+    :param model_revision: str, 主模型版本.
+    :param vad_model_id: str, VAD模型ID.
+    :param vad_model_revision: str, VAD模型版本.
+    :param punc_model_id: str, 标点模型ID.
+    :param punc_model_revision: str, 标点模型版本.
+    :param spk_model_id: str, 说话人模型ID.
+    :param spk_model_revision: str, 说话人模型版本.
+    :param use_cache: bool, 为False时跳过识别结果缓存.
+    :return: list, 识别结果列表.
+    :raises ValueError: 如果MODELSCOPE_CACHE未配置.
+    """
+    model_selection = (
+        model_id,
+        model_revision,
+        vad_model_id,
+        vad_model_revision,
+        punc_model_id,
+        punc_model_revision,
+        spk_model_id,
+        spk_model_revision,
+    )
+    cache_enabled, cache_max_bytes = get_result_cache_settings()
+    cache_key = None
+    if use_cache and cache_enabled:
+        try:
+            cache_key = build_result_cache_key(audio_input_path, model_selection)
+            cached_result = load_cached_result(cache_key)
+            if cached_result is not None:
+                logger.info(f"Result cache hit for {audio_input_path}")
+                return cached_result
+        except OSError as e:
+            logger.warning(f"Result cache lookup failed for {audio_input_path}: {e}")
+            cache_key = None
+
+    try:
+        inference_pipeline = get_asr_pipeline(
+            model_id,
+            model_revision,
+            vad_model_id,
+            vad_model_revision,
+            punc_model_id,
+            punc_model_revision,
+            spk_model_id,
+            spk_model_revision,
         )
-        rec_result = inference_pipeline(audio_input_path)
+    except ValueError:
+        raise
+    except Exception as e:
+        logger.error(f"ModelScope pipeline load error: {e}")
+        st.error(f"加载语音识别模型时发生错误: {e}")
+        return []
+
+    try:
+        audio_input = pcm_to_float32(get_decoded_pcm(audio_input_path))
+    except Exception as e:
+        # Let the pipeline decode the file itself if our decoder cannot
+        logger.warning(f"PCM decode failed for {audio_input_path}, passing path: {e}")
+        audio_input = audio_input_path
+
+    try:
+        rec_result = inference_pipeline(audio_input)
+        if rec_result and cache_key:
+            store_cached_result(cache_key, rec_result, cache_max_bytes)
         return rec_result if rec_result else []
 
     except Exception as e:
@@ -81,9 +205,261 @@ def run_modelscope_recognition(
         return []
 
 
+def get_vad_pipeline(vad_model_id: str, vad_model_revision: str):
+    """
+    从进程级注册表获取独立的VAD推理管道。
+
+    :param vad_model_id: str, VAD模型ID.
+    :param vad_model_revision: str, VAD模型版本.
+    :return: ModelScope VAD pipeline 实例.
+    """
+    cache_path = get_modelscope_setting("MODELSCOPE_CACHE")
+    if not cache_path:
+        raise ValueError("MODELSCOPE_CACHE is not configured in config.ini.")
+    os.environ["MODELSCOPE_CACHE"] = cache_path
+
+    return get_pipeline_registry().get(
+        ("vad", vad_model_id, vad_model_revision),
+        lambda: pipeline(
+            task=Tasks.voice_activity_detection,
+            model=vad_model_id,
+            model_revision=vad_model_revision,
+            disable_update=True
+        ),
+    )
+
+
+def get_punc_pipeline(punc_model_id: str, punc_model_revision: str):
+    """
+    从进程级注册表获取独立的标点推理管道。
+    FunASR只在经过VAD切分的识别流程中调用标点模型, 不带VAD的ASR管道需要单独加标点。
+
+    :param punc_model_id: str, 标点模型ID.
+    :param punc_model_revision: str, 标点模型版本.
+    :return: ModelScope punctuation pipeline 实例.
+    """
+    cache_path = get_modelscope_setting("MODELSCOPE_CACHE")
+    if not cache_path:
+        raise ValueError("MODELSCOPE_CACHE is not configured in config.ini.")
+    os.environ["MODELSCOPE_CACHE"] = cache_path
+
+    return get_pipeline_registry().get(
+        ("punc", punc_model_id, punc_model_revision),
+        lambda: pipeline(
+            task=Tasks.punctuation,
+            model=punc_model_id,
+            model_revision=punc_model_revision,
+            disable_update=True
+        ),
+    )
+
+
+def punctuate_text(punc_pipeline, text: str) -> str:
+    """
+    为识别文本添加标点。标点模型出错时返回原文。
+
+    :param punc_pipeline: ModelScope punctuation pipeline 实例 (get_punc_pipeline).
+    :param text: str, 无标点的识别文本.
+    :return: str, 加标点后的文本.
+    """
+    if not text or not text.strip():
+        return text
+    try:
+        punc_result = punc_pipeline(text)
+    except Exception as e:
+        logger.warning(f"Punctuation failed, keeping raw text: {e}")
+        return text
+    if isinstance(punc_result, list):
+        punc_result = punc_result[0] if punc_result else {}
+    if isinstance(punc_result, dict):
+        return punc_result.get("text", text) or text
+    return text
+
+
+def detect_speech_segments(vad_pipeline, samples: np.ndarray) -> list[list[int]]:
+    """
+    使用VAD管道检测音频中的语音片段。
+
+    :param vad_pipeline: VAD推理管道.
+    :param samples: np.ndarray, 16 kHz单声道float32音频.
+    :return: list[list[int]], 语音片段 [[开始毫秒, 结束毫秒], ...].
+    """
+    vad_result = vad_pipeline(samples)
+    if isinstance(vad_result, list):
+        vad_result = vad_result[0] if vad_result else {}
+    return [list(map(int, segment)) for segment in vad_result.get("value", [])]
+
+
+def _find_window_cut_ms(vad_pipeline, samples: np.ndarray) -> int:
+    """
+    在窗口末尾附近寻找静音处作为切分点, 避免把句子切断。
+
+    :param vad_pipeline: VAD推理管道, 为None时按窗口长度硬切分.
+    :param samples: np.ndarray, 当前窗口的音频.
+    :return: int, 切分位置 (相对窗口起点的毫秒数).
+    """
+    window_ms = int(len(samples) * 1000 / MODEL_SAMPLE_RATE)
+    if vad_pipeline is None:
+        return window_ms
+
+    segments = detect_speech_segments(vad_pipeline, samples)
+    limit_ms = window_ms - STREAM_WINDOW_TAIL_GUARD_MS
+    complete = [i for i, (_, end) in enumerate(segments) if end <= limit_ms]
+    if not complete:
+        return window_ms
+
+    last = complete[-1]
+    gap_end = segments[last + 1][0] if last + 1 < len(segments) else window_ms
+    return (segments[last][1] + gap_end) // 2
+
+
+def _rebase_sentence_info(sentence_info: list, offset_ms: int) -> list:
+    """将窗口内的句子时间戳平移为相对整段音频的时间戳。"""
+    rebased = []
+    for sentence in sentence_info:
+        sentence = dict(sentence)
+        for key in ("start", "end"):
+            if isinstance(sentence.get(key), (int, float)):
+                sentence[key] = sentence[key] + offset_ms
+        if isinstance(sentence.get("timestamp"), list):
+            sentence["timestamp"] = [
+                [begin + offset_ms, end + offset_ms]
+                for begin, end in sentence["timestamp"]
+            ]
+        rebased.append(sentence)
+    return rebased
+
+
+def join_recognised_texts(texts: list[str]) -> str:
+    """拼接多段识别文本, 仅在两段英文/数字之间补空格。"""
+    joined = ""
+    for text in texts:
+        if not text:
+            continue
+        if joined and joined[-1].isascii() and joined[-1].isalnum() and text[0].isascii() and text[0].isalnum():
+            joined += " "
+        joined += text
+    return joined
+
+
+def run_modelscope_recognition_streaming(
+    audio_input_path: str,
+    model_id: str,
+    model_revision: str,
+    vad_model_id: str,
+    vad_model_revision: str,
+    punc_model_id: str,
+    punc_model_revision: str,
+    spk_model_id: str,
+    spk_model_revision: str,
+    window_seconds: float = DEFAULT_STREAM_WINDOW_SECONDS,
+):
+    """
+    以VAD对齐的窗口流式识别长音频, 峰值内存与音频总时长无关。
+
+    每个窗口在末尾附近的静音处切分, 未完成的语音并入下一个窗口。
+    注意: 说话人聚类在每个窗口内独立进行, 跨窗口的说话人编号不保证一致。
+
+    :param audio_input_path: str, 输入音频文件的路径.
+    :param model_id: str, 主模型ID.
+    :param model_revision: str, 主模型版本.
+    :param vad_model_id: str, VAD模型ID.
+    :param vad_model_revision: str, VAD模型版本.
+    :param punc_model_id: str, 标点模型ID.
+    :param punc_model_revision: str, 标点模型版本.
+    :param spk_model_id: str, 说话人模型ID.
+    :param spk_model_revision: str, 说话人模型版本.
+    :param window_seconds: float, 每个识别窗口的时长 (秒).
+    :return: 生成器, 逐窗口产生 {"text", "sentence_info", "window_start_ms", "window_end_ms"}.
+    """
+    inference_pipeline = get_asr_pipeline(
+        model_id,
+        model_revision,
+        vad_model_id,
+        vad_model_revision,
+        punc_model_id,
+        punc_model_revision,
+        spk_model_id,
+        spk_model_revision,
+    )
+    vad_pipeline = (
+        get_vad_pipeline(vad_model_id, vad_model_revision) if vad_model_id else None
+    )
+
+    window_samples = int(window_seconds * MODEL_SAMPLE_RATE)
+    buffer = np.zeros(0, dtype=np.float32)
+    window_start_ms = 0
+    cached_samples = find_cached_pcm(audio_input_path)
+    if cached_samples is not None:
+        blocks = iter_pcm_blocks(cached_samples, STREAM_DECODE_BLOCK_SECONDS)
+    else:
+        blocks = iter_audio_blocks(audio_input_path, STREAM_DECODE_BLOCK_SECONDS)
+    exhausted = False
+
+    while not exhausted or len(buffer):
+        while not exhausted and len(buffer) < window_samples:
+            block = next(blocks, None)
+            if block is None:
+                exhausted = True
+            else:
+                buffer = np.concatenate([buffer, block])
+        if not len(buffer):
+            break
+
+        if exhausted:
+            cut_ms = int(len(buffer) * 1000 / MODEL_SAMPLE_RATE)
+        else:
+            cut_ms = _find_window_cut_ms(vad_pipeline, buffer)
+        cut_samples = max(1, min(len(buffer), cut_ms * MODEL_SAMPLE_RATE // 1000))
+        window, buffer = buffer[:cut_samples], buffer[cut_samples:].copy()
+
+        window_result = inference_pipeline(window) or []
+        window_info = window_result[0] if window_result else {}
+        window_end_ms = window_start_ms + int(len(window) * 1000 / MODEL_SAMPLE_RATE)
+        yield {
+            "text": window_info.get("text", ""),
+            "sentence_info": _rebase_sentence_info(
+                window_info.get("sentence_info", []), window_start_ms
+            ),
+            "window_start_ms": window_start_ms,
+            "window_end_ms": window_end_ms,
+        }
+        window_start_ms = window_end_ms
+
+
+def merge_recognition_windows(windows: list[dict]) -> list:
+    """
+    将流式识别产生的窗口结果合并为与run_modelscope_recognition相同的结构。
+
+    :param windows: list[dict], run_modelscope_recognition_streaming 产生的窗口结果.
+    :return: list, [{"text": ..., "sentence_info": [...]}].
+    """
+    if not windows:
+        return []
+    sentence_info = []
+    for window in windows:
+        sentence_info.extend(window.get("sentence_info", []))
+    return [
+        {
+            "text": join_recognised_texts([w.get("text", "") for w in windows]),
+            "sentence_info": sentence_info,
+        }
+    ]
+
+
+def strip_rich_transcription_tags(text: str) -> str:
+    """
+    去除SenseVoice等模型输出的语种、情感、事件标签 (如 <|zh|><|NEUTRAL|><|Speech|>)。
+
+    :param text: str, 识别文本.
+    :return: str, 去除标签后的文本.
+    """
+    return RICH_TRANSCRIPTION_TAG_PATTERN.sub("", text).strip()
+
+
 def organize_recognition_results(recognition_output: list) -> tuple[str, str]:
     """
-    根据语音识别结果组织文本和说话人信息。
+    根据语音识别结果组织文本和说话人信息。SenseVoice的标签会被去除, 不会进入转录文本与后续的修正、归纳。
 
     :param recognition_output: list, ModelScope ASR管道的输出.
     :return: tuple[str, str], (完整文本, 按说话人组织的文本).
@@ -98,7 +474,7 @@ def organize_recognition_results(recognition_output: list) -> tuple[str, str]:
         return "", ""  # Return empty strings for invalid/empty input
 
     result_info = recognition_output[0]
-    full_text = result_info.get("text", "")
+    full_text = strip_rich_transcription_tags(result_info.get("text", ""))
     sentence_details = result_info.get("sentence_info", [])
 
     organized_text_parts = []
@@ -108,7 +484,7 @@ def organize_recognition_results(recognition_output: list) -> tuple[str, str]:
 
         for segment in sentence_details:
             speaker_id = segment.get("spk")  # Speaker ID is often an int
-            text_segment = segment.get("text", "")
+            text_segment = strip_rich_transcription_tags(segment.get("text", ""))
 
             if current_speaker is None or speaker_id != current_speaker:
                 if (
@@ -203,6 +579,137 @@ def get_modelscope_model_lists() -> tuple[list, list, list, list]:
         return [], [], [], []
 
 
+def get_modelscope_profiles() -> list[dict]:
+    """
+    从JSON配置文件加载ASR速度档位 (如 fast / balanced / accurate)。
+
+    :return: list[dict], 档位列表, 每项包含模型组合与实时率 (rtf);
+             已有实测值 (见 record_profile_rtf) 时使用实测值, 否则使用配置中的预估值.
+    """
+    try:
+        with open(MODELSCOPE_MODELS_JSON_PATH, "r", encoding="utf-8") as f:
+            profiles = json.load(f).get("profiles", [])
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        logger.error(f"Failed to load ModelScope profiles: {e}")
+        return []
+    measured = _load_profile_rtf()
+    for profile in profiles:
+        if profile.get("name") in measured:
+            profile.update(measured[profile["name"]])
+    return profiles
+
+
+def get_profile_model_selection(profile: dict) -> tuple:
+    """
+    将档位转换为识别函数使用的8项模型组合, 空字符串表示不使用该子模型。
+
+    :param profile: dict, 档位配置.
+    :return: tuple, (主模型, 版本, VAD模型, 版本, 标点模型, 版本, 说话人模型, 版本).
+    """
+    selection = []
+    for prefix in ("", "vad_", "punc_", "spk_"):
+        model = profile.get(f"{prefix}model") or None
+        selection.extend([model, (profile.get(f"{prefix}revision") or None) if model else None])
+    return tuple(selection)
+
+
+def resolve_modelscope_profile(
+    profile_name: str, audio_duration: float, distinguish_speakers: bool
+):
+    """
+    根据档位名称获取档位; "auto"按音频时长与是否区分说话人自动选择。
+
+    :param profile_name: str, 档位名称或"auto".
+    :param audio_duration: float, 音频时长 (秒).
+    :param distinguish_speakers: bool, 是否需要区分说话人.
+    :return: dict 或 None, 选中的档位, 未找到时返回None.
+    """
+    profiles = {profile["name"]: profile for profile in get_modelscope_profiles()}
+    if profile_name == AUTO_PROFILE:
+        if distinguish_speakers:
+            profile_name = "accurate"
+        elif audio_duration > AUTO_PROFILE_LONG_AUDIO_SECONDS:
+            profile_name = "fast"
+        else:
+            profile_name = "balanced"
+    return profiles.get(profile_name)
+
+
+def _load_profile_rtf() -> dict:
+    """:return: dict, {档位名称: {"rtf": 实测实时率, "rtf_samples": 样本数}}, 文件不存在或损坏时为空."""
+    try:
+        with open(PROFILE_RTF_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Failed to load measured profile RTF from {PROFILE_RTF_PATH}: {e}")
+        return {}
+
+
+def record_profile_rtf(profile_name: str, elapsed_seconds: float, audio_seconds: float):
+    """
+    以指数滑动平均更新档位的实测实时率, 保存到 PROFILE_RTF_PATH (不修改模型配置文件)。
+
+    在锁内读取、更新后先写入临时文件再替换, 并发的识别任务不会互相覆盖或留下写了一半的文件。
+
+    :param profile_name: str, 档位名称.
+    :param elapsed_seconds: float, 本次识别耗时 (秒).
+    :param audio_seconds: float, 音频时长 (秒).
+    """
+    if audio_seconds <= 0 or elapsed_seconds <= 0:
+        return
+    measured_rtf = elapsed_seconds / audio_seconds
+    with _profile_rtf_lock:
+        measured = _load_profile_rtf()
+        entry = measured.get(profile_name, {})
+        samples = int(entry.get("rtf_samples", 0))
+        if samples == 0:
+            rtf = measured_rtf
+        else:
+            rtf = (1 - PROFILE_RTF_SMOOTHING) * float(entry["rtf"]) + PROFILE_RTF_SMOOTHING * measured_rtf
+        measured[profile_name] = {"rtf": round(rtf, 4), "rtf_samples": samples + 1}
+
+        temp_path = None
+        try:
+            os.makedirs(os.path.dirname(PROFILE_RTF_PATH), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(PROFILE_RTF_PATH), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(measured, f, indent=4, ensure_ascii=False)
+            os.replace(temp_path, PROFILE_RTF_PATH)
+            logger.info(f"Profile '{profile_name}' measured RTF {measured_rtf:.3f}")
+        except OSError as e:
+            logger.error(f"Failed to record RTF for profile '{profile_name}': {e}")
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+def display_modelscope_profile_selector() -> str:
+    """
+    在Streamlit界面上显示ASR速度档位选择器。
+
+    :return: str, 档位名称, "auto"表示自动选择, "custom"表示手动选择各模型.
+    """
+    profiles = get_modelscope_profiles()
+    options = [AUTO_PROFILE] + [p["name"] for p in profiles] + [CUSTOM_PROFILE]
+    titles = {AUTO_PROFILE: "自动", CUSTOM_PROFILE: "自定义"}
+    titles.update({p["name"]: p.get("title", p["name"]) for p in profiles})
+
+    selected_profile = st.selectbox(
+        "识别速度档位",
+        options,
+        format_func=lambda name: titles.get(name, name),
+        help="自动：需要区分说话人时使用“精准”，长音频使用“极速”，其余使用“均衡”。自定义：手动选择各个模型。",
+    )
+    profile = next((p for p in profiles if p["name"] == selected_profile), None)
+    if profile:
+        st.caption(
+            f"{profile.get('description', '')} 实时率约 {float(profile.get('rtf', 0)):.3f}"
+            f"（每小时音频约需 {float(profile.get('rtf', 0)) * 60:.0f} 分钟）"
+        )
+    return selected_profile
+
+
 def display_modelscope_model_selector():
     """
     在Streamlit界面上显示ModelScope模型选择器，并返回所选模型及其版本。
@@ -1,17 +1,41 @@
 import requests  # Using requests instead of ollama library
+import httpx
+from requests.adapters import HTTPAdapter
 import json
-import configparser
+import asyncio
 import sys
 import os
+import threading
 import streamlit as st  # For st.error in case of UI interaction needs
 
 # Ensure the project root is in sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from scripts.utils import CONFIG_INI_PATH  # Use defined constant
+from scripts.utils import load_config_section, setup_logger
+from scripts.async_llm import get_backend_limiter, iterate_sync
+from scripts.llm_cache import (
+    get_llm_cache_key,
+    load_cached_response,
+    replay_cached_response,
+    store_cached_response,
+)
 
 # Ollama API endpoints (confirm these with your Ollama version if issues arise)
 OLLAMA_API_LIST_MODELS_ENDPOINT = "/api/tags"
 OLLAMA_API_GENERATE_ENDPOINT = "/api/generate"
+OLLAMA_API_CHAT_ENDPOINT = "/api/chat"
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 300.0
+DEFAULT_KEEP_ALIVE = "30m"
+
+logger = setup_logger("OLLAMA_SCRIPTS")
+
+# One pooled session per base_url, shared by all threads of the process
+_sessions = {}
+_sessions_lock = threading.Lock()
+# Async clients live on the shared background event loop (see async_llm)
+_async_clients = {}
 
 
 def get_ollama_config_values() -> tuple:
@@ -21,12 +45,7 @@ def get_ollama_config_values() -> tuple:
     :return: tuple, (base_url, model_name, max_tokens/num_ctx, temperature, top_p).
     :raises ValueError: 如果Ollama配置区域或关键配置项缺失.
     """
-    config = configparser.ConfigParser()
-    config.read(CONFIG_INI_PATH, encoding="utf-8")
-    if "OLLAMA" not in config:
-        raise ValueError(f"Section 'OLLAMA' not found in '{CONFIG_INI_PATH}'.")
-
-    ollama_config = config["OLLAMA"]
+    ollama_config = load_config_section("OLLAMA")
     base_url = ollama_config.get("base_url")
     model_name = ollama_config.get("model")
     # max_tokens in config for Ollama is num_ctx (context window size)
@@ -43,6 +62,100 @@ def get_ollama_config_values() -> tuple:
     return base_url, model_name, num_ctx, temperature, top_p
 
 
+def get_ollama_connection_settings() -> dict:
+    """
+    获取Ollama连接相关的设置 (连接池大小、超时与模型保活时长)。
+
+    :return: dict, 包含 pool_size、connect_timeout、read_timeout 与 keep_alive.
+    """
+    try:
+        ollama_config = load_config_section("OLLAMA")
+    except ValueError:
+        ollama_config = {}
+    return {
+        "pool_size": int(ollama_config.get("pool_size", DEFAULT_POOL_SIZE)),
+        "connect_timeout": float(ollama_config.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT)),
+        "read_timeout": float(ollama_config.get("read_timeout", DEFAULT_READ_TIMEOUT)),
+        # Ollama accepts a duration string ("30m"), seconds, or -1 to keep the model loaded
+        "keep_alive": ollama_config.get("keep_alive", DEFAULT_KEEP_ALIVE),
+    }
+
+
+def _parse_keep_alive(keep_alive: str):
+    keep_alive = str(keep_alive).strip()
+    return int(keep_alive) if keep_alive.lstrip("-").isdigit() else keep_alive
+
+
+def get_ollama_session(base_url: str, pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """
+    获取指定Ollama地址共享的连接池会话, 复用TCP连接。
+
+    :param base_url: str, Ollama服务地址.
+    :param pool_size: int, 连接池大小 (应不小于并发请求数).
+    :return: requests.Session, 共享会话.
+    """
+    session_key = (base_url.rstrip("/"), pool_size)
+    with _sessions_lock:
+        session = _sessions.get(session_key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[session_key] = session
+        return session
+
+
+def _log_generation_stats(model_name: str, part: dict):
+    """记录Ollama在最后一条响应中返回的耗时统计 (单位为纳秒)。"""
+    def seconds(key: str) -> float:
+        return part.get(key, 0) / 1e9
+
+    eval_count = part.get("eval_count", 0)
+    eval_seconds = seconds("eval_duration")
+    logger.info(
+        f"Ollama {model_name}: load {seconds('load_duration'):.2f}s, "
+        f"prompt {part.get('prompt_eval_count', 0)} tokens in {seconds('prompt_eval_duration'):.2f}s, "
+        f"generated {eval_count} tokens in {eval_seconds:.2f}s "
+        f"({eval_count / eval_seconds if eval_seconds > 0 else 0:.1f} tokens/s), "
+        f"total {seconds('total_duration'):.2f}s"
+    )
+
+
+def warm_up_ollama_model(base_url: str = None, num_ctx: int = None) -> float:
+    """
+    预先加载配置的Ollama模型 (发送空提示), 使后续修正与归纳不再等待模型加载。
+    Ollama在num_ctx变化时会重新加载模型, 因此应传入后续请求将使用的同一个num_ctx.
+
+    :param base_url: str, 要预热的Ollama地址, 为None时使用config.ini中的base_url.
+    :param num_ctx: int, 加载模型时使用的上下文大小, 为None时使用config.ini中的num_ctx.
+    :return: float, 模型加载耗时 (秒); 失败时返回-1.
+    """
+    try:
+        configured_base_url, model_name, configured_num_ctx, _, _ = get_ollama_config_values()
+        base_url = base_url or configured_base_url
+        num_ctx = num_ctx or configured_num_ctx
+        settings = get_ollama_connection_settings()
+        response = get_ollama_session(base_url, settings["pool_size"]).post(
+            f"{base_url.rstrip('/')}{OLLAMA_API_GENERATE_ENDPOINT}",
+            json={
+                "model": model_name,
+                "prompt": "",
+                "stream": False,
+                "keep_alive": _parse_keep_alive(settings["keep_alive"]),
+                "options": {"num_ctx": num_ctx},
+            },
+            timeout=(settings["connect_timeout"], settings["read_timeout"]),
+        )
+        response.raise_for_status()
+        load_seconds = response.json().get("load_duration", 0) / 1e9
+        logger.info(f"Ollama model {model_name} warmed up on {base_url}, load {load_seconds:.2f}s")
+        return load_seconds
+    except (ValueError, requests.exceptions.RequestException) as e:
+        logger.warning(f"Ollama warm-up failed on {base_url}: {e}")
+        return -1.0
+
+
 def get_ollama_model_list() -> list[str]:
     """
     使用requests从Ollama API获取可用的模型列表。
@@ -57,8 +170,10 @@ def get_ollama_model_list() -> list[str]:
         return []
 
     try:
-        response = requests.get(
-            f"{base_url.rstrip('/')}{OLLAMA_API_LIST_MODELS_ENDPOINT}"
+        settings = get_ollama_connection_settings()
+        response = get_ollama_session(base_url, settings["pool_size"]).get(
+            f"{base_url.rstrip('/')}{OLLAMA_API_LIST_MODELS_ENDPOINT}",
+            timeout=(settings["connect_timeout"], settings["connect_timeout"] * 2),
         )
         response.raise_for_status()  # Raise an HTTPError for bad responses (4XX or 5XX)
         models_data = response.json()
@@ -77,59 +192,144 @@ def get_ollama_model_list() -> list[str]:
         return []
 
 
-def generate_ollama_completion(prompt: str):
+def _get_async_client(base_url: str, pool_size: int) -> httpx.AsyncClient:
+    """获取后台事件循环中共享的异步HTTP客户端 (只能在该循环中调用)。"""
+    client_key = (base_url.rstrip("/"), pool_size)
+    client = _async_clients.get(client_key)
+    if client is None:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+        _async_clients[client_key] = client
+    return client
+
+
+async def agenerate_ollama_completion(
+    prompt: str,
+    num_ctx: int = None,
+    use_cache: bool = True,
+    system: str = None,
+    base_url: str = None,
+    raise_errors: bool = False,
+):
     """
-    使用requests向Ollama API发送生成请求并处理流式响应。
+    异步向Ollama发送生成请求并逐块产生输出, 同时进行的请求数受[OLLAMA] max_parallel限制。
+    未提供system时使用 /api/generate, 否则使用 /api/chat 并将system作为系统消息发送。
+    确定性请求 (或按设置启用缓存时) 的完整输出会被缓存, 相同请求直接以流的形式重放。
 
-    :param prompt: str, 输入给模型的提示.
-    :return: 生成器, 逐块产生生成的文本.
+    :param prompt: str, 输入给模型的提示 (使用 /api/chat 时为用户消息).
+    :param num_ctx: int, 本次请求的上下文窗口大小, 为None时使用config.ini中的配置.
+    :param use_cache: bool, 为False时本次请求绕过输出缓存.
+    :param system: str, 系统消息, 为None时不使用 /api/chat.
+    :param base_url: str, 本次请求使用的Ollama地址, 为None时使用config.ini中的base_url.
+    :param raise_errors: bool, 为True时网络与服务端错误直接抛出 (供llm_router重试), 而不是产生错误说明.
+    :return: 异步生成器, 逐块产生生成的文本; 出错时产生错误说明.
     """
     try:
-        base_url, model_name, num_ctx, temperature, top_p = get_ollama_config_values()
+        # Settings are read in a worker thread so file I/O never blocks the shared event loop
+        configured_base_url, model_name, configured_num_ctx, temperature, top_p = (
+            await asyncio.to_thread(get_ollama_config_values)
+        )
     except ValueError as e:
+        if raise_errors:
+            raise
         yield f"Ollama配置错误: {e}"
         return
+    base_url = base_url or configured_base_url
+    num_ctx = num_ctx or configured_num_ctx
+    settings = await asyncio.to_thread(get_ollama_connection_settings)
 
+    options = {
+        "num_ctx": num_ctx,
+        "temperature": temperature,
+        "top_p": top_p,
+        # "num_predict": num_predict, # If you want to control max generated tokens explicitly
+    }
     payload = {
         "model": model_name,
-        "prompt": prompt,
         "stream": True,
-        "options": {
-            "num_ctx": num_ctx,
-            "temperature": temperature,
-            "top_p": top_p,
-            # "num_predict": num_predict, # If you want to control max generated tokens explicitly
-        },
+        "keep_alive": _parse_keep_alive(settings["keep_alive"]),
+        "options": options,
     }
+    if system is None:
+        endpoint = OLLAMA_API_GENERATE_ENDPOINT
+        payload["prompt"] = prompt
+        cache_options = options
+    else:
+        endpoint = OLLAMA_API_CHAT_ENDPOINT
+        payload["messages"] = [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt},
+        ]
+        cache_options = dict(options, system=system)
+
+    cache_key = await asyncio.to_thread(
+        get_llm_cache_key, prompt, "Ollama", model_name, cache_options, use_cache
+    )
+    if cache_key:
+        cached_response = await asyncio.to_thread(load_cached_response, cache_key)
+        if cached_response is not None:
+            for chunk in replay_cached_response(cached_response):
+                yield chunk
+            return
 
+    response_chunks = []
     try:
-        with requests.post(
-            f"{base_url.rstrip('/')}{OLLAMA_API_GENERATE_ENDPOINT}",
-            json=payload,
-            stream=True,
-            timeout=120,  # Added a timeout
-        ) as response:
-            response.raise_for_status()
-            for line in response.iter_lines():
-                if line:
+        async with await get_backend_limiter("OLLAMA"):
+            client = _get_async_client(base_url, settings["pool_size"])
+            async with client.stream(
+                "POST",
+                f"{base_url.rstrip('/')}{endpoint}",
+                json=payload,
+                timeout=httpx.Timeout(settings["read_timeout"], connect=settings["connect_timeout"]),
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
                     try:
-                        decoded_line = line.decode("utf-8")
-                        part = json.loads(decoded_line)
-                        yield part.get("response", "")
-                        if (
-                            part.get("done", False)
-                            and part.get("done_reason") == "stop"
-                        ):  # Check for done signal
-                            break
+                        part = json.loads(line)
                     except json.JSONDecodeError:
                         # Log this, as it might indicate an issue or non-JSON line
-                        print(
-                            f"Warning: Could not decode JSON from Ollama stream: {decoded_line}"
-                        )
+                        logger.warning(f"Could not decode JSON from Ollama stream: {line}")
                         continue
-    except requests.exceptions.Timeout:
-        yield f"Ollama请求超时 ({base_url}{OLLAMA_API_GENERATE_ENDPOINT})。"
-    except requests.exceptions.RequestException as e:
+                    if system is None:
+                        response_chunks.append(part.get("response", ""))
+                    else:
+                        response_chunks.append(part.get("message", {}).get("content", ""))
+                    yield response_chunks[-1]
+                    if part.get("done", False):
+                        _log_generation_stats(model_name, part)
+                        break
+        # Only reached when the stream finished without errors
+        if cache_key:
+            await asyncio.to_thread(
+                store_cached_response, cache_key, "Ollama", model_name, "".join(response_chunks)
+            )
+    except httpx.TimeoutException:
+        if raise_errors:
+            raise
+        yield f"Ollama请求超时 ({base_url}{endpoint})。"
+    except httpx.HTTPError as e:
+        if raise_errors:
+            raise
         yield f"连接Ollama时发生网络错误: {e}"
     except Exception as e:  # Catch any other unexpected errors
+        if raise_errors:
+            raise
         yield f"处理Ollama响应时发生未知错误: {e}"
+
+
+def generate_ollama_completion(
+    prompt: str, num_ctx: int = None, use_cache: bool = True, system: str = None
+):
+    """
+    向Ollama API发送生成请求并处理流式响应 (agenerate_ollama_completion 的同步适配)。
+
+    :param prompt: str, 输入给模型的提示.
+    :param num_ctx: int, 本次请求的上下文窗口大小, 为None时使用config.ini中的配置.
+    :param use_cache: bool, 为False时本次请求绕过输出缓存.
+    :param system: str, 系统消息, 提供时使用 /api/chat.
+    :return: 生成器, 逐块产生生成的文本.
+    """
+    return iterate_sync(agenerate_ollama_completion(prompt, num_ctx, use_cache, system))
@@ -1,41 +1,95 @@
-from openai import OpenAI
+import openai
+from openai import AsyncOpenAI, OpenAI
 import os
 import sys
 import json
-import configparser
+import asyncio
+import threading
 
 # Ensure the project root is in sys.path for consistent imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from scripts.utils import CONFIG_INI_PATH  # Use defined constant
+from scripts.utils import load_config_section, setup_logger
+from scripts.async_llm import get_backend_limiter, iterate_sync, submit
+from scripts.token_budget import count_tokens
+from scripts import rate_limiter
+from scripts.llm_cache import (
+    get_llm_cache_key,
+    load_cached_response,
+    replay_cached_response,
+    store_cached_response,
+)
 
 CONFIG_DIR = "config"
 OPENAI_CONFIG_JSON_FILE = "openai.json" # This file will now store API keys too
 OPENAI_JSON_PATH = os.path.join(CONFIG_DIR, OPENAI_CONFIG_JSON_FILE)
+RATE_LIMIT_MAX_RETRIES = 5
 
+logger = setup_logger("OPENAI_SCRIPTS")
 
-def set_openai_client(model_name: str) -> OpenAI:
-    """
-    根据模型名称设置并返回OpenAI兼容客户端。
-    API Key 和 Base URL 从 openai.json 读取。
+# Clients keep their own httpx connection pool, so one client per endpoint and
+# key is shared by every request instead of paying a TLS handshake each time.
+_clients = {}
+_clients_lock = threading.Lock()
+_settings_memo = {"signature": None, "settings": None}
+# Async clients live on the shared background event loop (see async_llm)
+_async_clients = {}
 
-    :param model_name: str, 使用的模型名称.
-    :return: OpenAI, 配置好的客户端实例.
-    :raises ValueError: 如果模型配置未找到或不完整.
-    """
+
+def _load_openai_settings() -> dict:
+    """读取openai.json, 文件修改时间与大小不变时复用上次的解析结果。"""
     try:
-        with open(OPENAI_JSON_PATH, "r", encoding="utf-8") as f:
-            openai_settings = json.load(f)
+        stat = os.stat(OPENAI_JSON_PATH)
     except FileNotFoundError:
         raise ValueError(
             f"在线模型配置文件 '{OPENAI_JSON_PATH}' 未找到。"
         )
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _clients_lock:
+        if _settings_memo["signature"] == signature:
+            return _settings_memo["settings"]
+    try:
+        with open(OPENAI_JSON_PATH, "r", encoding="utf-8") as f:
+            openai_settings = json.load(f)
     except json.JSONDecodeError:
         raise ValueError(
             f"在线模型配置文件 '{OPENAI_JSON_PATH}' 格式错误。"
         )
+    with _clients_lock:
+        _settings_memo["signature"], _settings_memo["settings"] = signature, openai_settings
+    return openai_settings
 
 
+async def _close_async_clients():
+    clients = list(_async_clients.values())
+    _async_clients.clear()
+    for client in clients:
+        try:
+            await client.close()
+        except Exception as e:
+            logger.warning(f"Failed to close async OpenAI client: {e}")
+
+
+def invalidate_openai_clients():
+    """关闭并丢弃所有缓存的客户端与已解析的openai.json (在线模型配置变更后调用)。"""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+        _settings_memo["signature"], _settings_memo["settings"] = None, None
+    if _async_clients:
+        submit(_close_async_clients())
+    for client in clients:
+        try:
+            client.close()
+        except Exception as e:
+            logger.warning(f"Failed to close OpenAI client: {e}")
+    if clients:
+        logger.info(f"Invalidated {len(clients)} cached OpenAI client(s)")
+
+
+def _find_model_config(model_name: str) -> dict:
+    openai_settings = _load_openai_settings()
+
     model_config = next(
         (
             model
@@ -48,7 +102,34 @@ def set_openai_client(model_name: str) -> OpenAI:
         raise ValueError(
             f"模型 '{model_name}' 的配置未在 '{OPENAI_JSON_PATH}' 中找到。"
         )
+    return model_config
+
+
+def get_model_rate_limits(model_name: str) -> tuple[int, int]:
+    """
+    读取openai.json中模型的限流配额 (rpm 与 tpm, 缺失或为0表示不限制)。
+
+    :param model_name: str, 模型名称.
+    :return: tuple[int, int], (每分钟请求数, 每分钟token数).
+    :raises ValueError: 如果模型配置未找到.
+    """
+    model_config = _find_model_config(model_name)
+    try:
+        return int(model_config.get("rpm") or 0), int(model_config.get("tpm") or 0)
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid rpm/tpm for {model_name}, rate limiting disabled")
+        return 0, 0
+
+
+def _get_model_endpoint(model_name: str) -> tuple[str, str]:
+    """
+    从openai.json中查找模型的 Base URL 与 API Key。
 
+    :param model_name: str, 模型名称.
+    :return: tuple[str, str], (base_url, api_key).
+    :raises ValueError: 如果模型配置未找到或不完整.
+    """
+    model_config = _find_model_config(model_name)
     api_key = model_config.get("api_key")
     base_url = model_config.get("base_url")
 
@@ -60,8 +141,37 @@ def set_openai_client(model_name: str) -> OpenAI:
         raise ValueError(
             f"模型 '{model_name}' 的 Base URL 未在 '{OPENAI_JSON_PATH}' 中配置。"
         )
+    return base_url, api_key
+
 
-    client = OpenAI(base_url=base_url, api_key=api_key)
+def set_openai_client(model_name: str) -> OpenAI:
+    """
+    根据模型名称返回OpenAI兼容客户端。
+    API Key 和 Base URL 从 openai.json 读取, 相同 (Base URL, API Key) 的客户端在请求间复用。
+
+    :param model_name: str, 使用的模型名称.
+    :return: OpenAI, 配置好的客户端实例.
+    :raises ValueError: 如果模型配置未找到或不完整.
+    """
+    base_url, api_key = _get_model_endpoint(model_name)
+    client_key = (base_url.rstrip("/"), api_key)
+    with _clients_lock:
+        client = _clients.get(client_key)
+        if client is None:
+            client = OpenAI(base_url=base_url, api_key=api_key)
+            _clients[client_key] = client
+    return client
+
+
+def _get_async_openai_client(base_url: str, api_key: str) -> AsyncOpenAI:
+    """获取后台事件循环中共享的异步客户端 (只能在该循环中调用), 配置变更后按新的键重建。"""
+    client_key = (base_url.rstrip("/"), api_key)
+    client = _async_clients.get(client_key)
+    if client is None:
+        # 429s are paced by rate_limiter and other failures handled by llm_router,
+        # so the SDK's own silent retries are disabled here
+        client = AsyncOpenAI(base_url=base_url, api_key=api_key, max_retries=0)
+        _async_clients[client_key] = client
     return client
 
 
@@ -88,52 +198,133 @@ def get_openai_model_names() -> list[str]:
         return []
 
 
-def generate_openai_completion(prompt: str, model_name: str):
+def _get_sampling_options() -> tuple[float, int, float]:
+    options_settings = load_config_section("OPENAI")
+    temperature = float(options_settings.get("temperature", 0.7))
+    max_tokens = int(options_settings.get("max_tokens", 2560))
+    top_p = float(options_settings.get("top_p", 1.0))
+    return temperature, max_tokens, top_p
+
+
+def _build_messages(prompt: str, system: str = None) -> list[dict]:
+    messages = [{"role": "user", "content": prompt}]
+    if system is not None:
+        messages.insert(0, {"role": "system", "content": system})
+    return messages
+
+
+async def agenerate_openai_completion(
+    prompt: str, model_name: str, use_cache: bool = True, system: str = None, raise_errors: bool = False
+):
     """
-    使用OpenAI兼容的 Chat Completions API 生成文本补全（流式）。
+    异步使用OpenAI兼容的 Chat Completions API 生成文本补全 (流式),
+    同时进行的请求数受[OPENAI] max_parallel限制, 发送速率受openai.json中该模型的rpm/tpm配额限制;
+    收到429时按 Retry-After 暂停该模型并排队重试。
+    按设置启用缓存时 (默认仅temperature为0), 相同请求直接以流的形式重放缓存的输出。
 
     :param prompt: str, 用户的完整输入提示。
     :param model_name: str, 要使用的模型名称。
-    :return: 生成器, 逐块产生生成的文本。
+    :param use_cache: bool, 为False时本次请求绕过输出缓存。
+    :param system: str, 系统消息, 为None时只发送用户消息。
+    :param raise_errors: bool, 为True时错误直接抛出 (供llm_router重试), 而不是产生错误说明。
+    :return: 异步生成器, 逐块产生生成的文本; 出错时产生错误说明。
     """
     try:
-        client = set_openai_client(model_name)
-        config = configparser.ConfigParser()
-        config.read(CONFIG_INI_PATH, encoding="utf-8")
-
-        if "OPENAI" not in config:
-            raise ValueError(f"区域 'OPENAI' 未在 '{CONFIG_INI_PATH}' 中找到。")
-
-        options_settings = config["OPENAI"]
-        temperature = float(options_settings.get("temperature", 0.7))
-        max_tokens = int(options_settings.get("max_tokens", 2560))
-        top_p = float(options_settings.get("top_p", 1.0))
-
-        response_stream = client.chat.completions.create(
-            model=model_name,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            temperature=temperature,
-            max_tokens=max_tokens,
-            top_p=top_p,
-            stream=True,
+        # config.ini and openai.json are read off the event loop
+        temperature, max_tokens, top_p = await asyncio.to_thread(_get_sampling_options)
+
+        cache_options = {"temperature": temperature, "max_tokens": max_tokens, "top_p": top_p}
+        if system is not None:
+            cache_options["system"] = system
+        cache_key = await asyncio.to_thread(
+            get_llm_cache_key, prompt, "OpenAI", model_name, cache_options, use_cache
         )
+        if cache_key:
+            cached_response = await asyncio.to_thread(load_cached_response, cache_key)
+            if cached_response is not None:
+                for chunk in replay_cached_response(cached_response):
+                    yield chunk
+                return
+
+        rpm, tpm = await asyncio.to_thread(get_model_rate_limits, model_name)
+        base_url, api_key = await asyncio.to_thread(_get_model_endpoint, model_name)
+        limiter = await get_backend_limiter("OPENAI")
+        prompt_tokens = count_tokens(prompt) + (count_tokens(system) if system else 0)
+        # Reserve the prompt plus a typical completion; settled against the real output below
+        reserved_tokens = prompt_tokens + min(max_tokens, max(256, prompt_tokens))
+        response_chunks = []
+        for attempt in range(RATE_LIMIT_MAX_RETRIES + 1):
+            await rate_limiter.acquire(model_name, rpm, tpm, reserved_tokens)
+            used_tokens = None
+            try:
+                async with limiter:
+                    client = _get_async_openai_client(base_url, api_key)
+                    response_stream = await client.chat.completions.create(
+                        model=model_name,
+                        messages=_build_messages(prompt, system),
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        top_p=top_p,
+                        stream=True,
+                    )
+                    async for part in response_stream:
+                        if part.choices and len(part.choices) > 0 and part.choices[0].delta and part.choices[0].delta.content:
+                            response_chunks.append(part.choices[0].delta.content)
+                            yield response_chunks[-1]
+                break
+            except openai.RateLimitError as e:
+                # Queue behind the provider's Retry-After instead of failing the request
+                if not response_chunks:
+                    used_tokens = 0  # A rejected request consumed no tokens
+                if response_chunks or attempt == RATE_LIMIT_MAX_RETRIES:
+                    raise
+                rate_limiter.pause(model_name, rate_limiter.get_retry_after_seconds(e, attempt))
+            finally:
+                # Settled on every exit, errors and early closes included, so no reservation leaks
+                if used_tokens is None:
+                    used_tokens = prompt_tokens + count_tokens("".join(response_chunks))
+                rate_limiter.settle_tokens(model_name, reserved_tokens, used_tokens)
+        # Only reached when the stream finished without errors
+        if cache_key:
+            await asyncio.to_thread(
+                store_cached_response, cache_key, "OpenAI", model_name, "".join(response_chunks)
+            )
 
-        for part in response_stream:
-            if part.choices and len(part.choices) > 0 and part.choices[0].delta and part.choices[0].delta.content:
-                yield part.choices[0].delta.content
-    
     except Exception as e:
+        if raise_errors:
+            raise
         yield f"处理OpenAI响应时发生错误: {e}"
 
 
+def generate_openai_completion(
+    prompt: str, model_name: str, use_cache: bool = True, system: str = None
+):
+    """
+    使用OpenAI兼容的 Chat Completions API 生成文本补全（流式, agenerate_openai_completion 的同步适配）。
+
+    :param prompt: str, 用户的完整输入提示。
+    :param model_name: str, 要使用的模型名称。
+    :param use_cache: bool, 为False时本次请求绕过输出缓存。
+    :param system: str, 系统消息, 为None时只发送用户消息。
+    :return: 生成器, 逐块产生生成的文本。
+    """
+    return iterate_sync(agenerate_openai_completion(prompt, model_name, use_cache, system))
+
+
+def _parse_quota(value) -> int:
+    try:
+        return max(0, int(float(value or 0)))
+    except (TypeError, ValueError):
+        return 0
+
+
 def update_openai_model_info(model_info_list: list[dict]) -> bool:
     """
-    更新在线模型配置信息（model, base_url, api_key）到 openai.json 文件。
+    更新在线模型配置信息（model, base_url, api_key, rpm, tpm）到 openai.json 文件。
 
     :param model_info_list: list[dict], 包含模型信息的字典列表.
-                           每个字典应包含 'model', 'base_url', 'api_key'.
+                           每个字典应包含 'model', 'base_url', 'api_key',
+                           可选 'rpm' (每分钟请求数) 与 'tpm' (每分钟token数), 0表示不限制.
     :return: bool, 操作是否成功.
     :raises Exception: 如果保存过程中发生错误.
     """
@@ -162,6 +353,9 @@ def update_openai_model_info(model_info_list: list[dict]) -> bool:
                 "model": model_entry.get("model").strip(),
                 "base_url": model_entry.get("base_url").strip(),
                 "api_key": model_entry.get("api_key", "").strip(), # Store API key directly
+                # Optional client-side quotas; 0 means unlimited
+                "rpm": _parse_quota(model_entry.get("rpm")),
+                "tpm": _parse_quota(model_entry.get("tpm")),
             }
             new_model_config_list.append(update_model)
 
@@ -172,7 +366,8 @@ def update_openai_model_info(model_info_list: list[dict]) -> bool:
         
         with open(OPENAI_JSON_PATH, "w", encoding="utf-8") as f:
             json.dump(openai_settings, f, indent=4, ensure_ascii=False)
-        
+        invalidate_openai_clients()
+
         return True
     except Exception as e:
         # Consider logging this error instead of raising generic Exception
@@ -184,7 +379,7 @@ def get_openai_model_info() -> list[dict]:
     """
     获取所有已配置的在线模型及其API密钥和URL（从openai.json文件）。
 
-    :return: list[dict], 模型信息列表, 每个字典包含 'model', 'base_url', 'api_key'.
+    :return: list[dict], 模型信息列表, 每个字典包含 'model', 'base_url', 'api_key', 'rpm', 'tpm'.
     :raises Exception: 如果获取信息时发生错误.
     """
     try:
@@ -213,6 +408,8 @@ def get_openai_model_info() -> list[dict]:
                 "model": model_name,
                 "base_url": model_conf.get("base_url", ""),
                 "api_key": model_conf.get("api_key", ""), # Get API key from JSON
+                "rpm": _parse_quota(model_conf.get("rpm")),
+                "tpm": _parse_quota(model_conf.get("tpm")),
             }
             model_info_list.append(model_info)
 
@@ -0,0 +1,423 @@
+import sys
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+# Ensure the project root is in sys.path for consistent imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils import setup_logger
+from scripts.audio_io import MODEL_SAMPLE_RATE, get_audio_channel_count, pcm_to_float32
+from scripts.pcm_cache import get_decoded_pcm
+from scripts.pipeline_registry import get_pipeline_registry
+from scripts.modelscope_scripts import (
+    get_asr_pipeline,
+    get_punc_pipeline,
+    get_vad_pipeline,
+    detect_speech_segments,
+    join_recognised_texts,
+    punctuate_text,
+    run_modelscope_recognition,
+)
+from modelscope.utils.constant import Tasks
+from modelscope.pipelines import pipeline
+
+logger = setup_logger("PARALLEL_RECOGNITION")
+
+# Segments shorter than this give unreliable speaker embeddings
+MIN_EMBEDDING_SECONDS = 0.8
+SPEAKER_SIMILARITY_THRESHOLD = 0.6
+
+_pool = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+
+def get_speaker_embedding_pipeline(spk_model_id: str, spk_model_revision: str):
+    """
+    从进程级注册表获取说话人嵌入 (speaker verification) 管道。
+
+    :param spk_model_id: str, 说话人模型ID (如CAM++).
+    :param spk_model_revision: str, 说话人模型版本.
+    :return: ModelScope speaker verification pipeline 实例.
+    """
+    return get_pipeline_registry().get(
+        ("sv", spk_model_id, spk_model_revision),
+        lambda: pipeline(
+            task=Tasks.speaker_verification,
+            model=spk_model_id,
+            model_revision=spk_model_revision,
+            disable_update=True
+        ),
+    )
+
+
+def _init_worker(
+    model_id: str, model_revision: str, punc_model_id: str, punc_model_revision: str, threads_per_worker: int
+):
+    """
+    工作进程初始化: 划分推理线程数并预先加载所有任务共用的模型 (不含VAD的识别管道与标点管道)。
+    VAD与说话人模型随任务传入, 由进程内的注册表按需加载并复用。
+    """
+    try:
+        import torch
+
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+
+    # Segments are already cut by VAD before recognition. FunASR only applies punctuation
+    # inside its VAD path, so punctuation is a separate pipeline here.
+    get_asr_pipeline(model_id, model_revision, None, None, None, None, None, None)
+    if punc_model_id:
+        get_punc_pipeline(punc_model_id, punc_model_revision)
+
+
+def _probe_speaker_embedding(task: tuple) -> bool:
+    """
+    在工作进程中加载说话人模型并对一个片段提取嵌入, 用于在并行识别开始前确认能够区分说话人。
+
+    :param task: tuple, (说话人模型ID, 版本, 采样数组).
+    :return: bool, 能够得到嵌入时返回True.
+    """
+    spk_model_id, spk_model_revision, samples = task
+    try:
+        sv_pipeline = get_speaker_embedding_pipeline(spk_model_id, spk_model_revision)
+        sv_result = sv_pipeline([samples], output_emb=True)
+        return len(sv_result["embs"][0]) > 0
+    except Exception as e:
+        logger.warning(f"Speaker embedding model {spk_model_id} is unavailable: {e}")
+        return False
+
+
+def _recognise_shard(task: tuple) -> list[dict]:
+    """
+    在工作进程中识别一个分片内的所有语音片段。
+
+    :param task: tuple, (8项模型组合, [(开始毫秒, 结束毫秒, 采样数组), ...]).
+    :return: list[dict], 每个片段的 {"start", "end", "text", "embedding"}.
+    """
+    model_selection, shard = task
+    model_id, model_rev, _, _, punc_id, punc_rev, spk_id, spk_rev = model_selection
+    asr_pipeline = get_asr_pipeline(model_id, model_rev, None, None, None, None, None, None)
+    punc_pipeline = get_punc_pipeline(punc_id, punc_rev) if punc_id else None
+    sv_pipeline = get_speaker_embedding_pipeline(spk_id, spk_rev) if spk_id else None
+
+    segment_results = []
+    for start_ms, end_ms, samples in shard:
+        rec_result = asr_pipeline(samples) or []
+        text = rec_result[0].get("text", "") if rec_result else ""
+        if punc_pipeline is not None:
+            text = punctuate_text(punc_pipeline, text)
+
+        embedding = None
+        if sv_pipeline is not None and len(samples) >= MIN_EMBEDDING_SECONDS * MODEL_SAMPLE_RATE:
+            try:
+                sv_result = sv_pipeline([samples], output_emb=True)
+                embedding = np.asarray(sv_result["embs"][0], dtype=np.float32)
+            except Exception as e:
+                logger.warning(f"Speaker embedding failed for segment {start_ms}-{end_ms}: {e}")
+
+        segment_results.append(
+            {"start": start_ms, "end": end_ms, "text": text, "embedding": embedding}
+        )
+    return segment_results
+
+
+def _recognise_channel(task: tuple) -> list:
+    """
+    在工作进程中识别单个声道的完整音频 (不使用说话人模型)。
+    先用VAD切分语音片段, 每个句子因此带有真实的起止时间, 两个声道的结果可以按时间交错合并。
+
+    :param task: tuple, (8项模型组合, 该声道的16 kHz float32采样).
+    :return: list, 该声道的句子列表 [{"text", "start", "end"}, ...].
+    """
+    model_selection, samples = task
+    vad_id, vad_rev = model_selection[2], model_selection[3]
+    segments = detect_speech_segments(get_vad_pipeline(vad_id, vad_rev), samples)
+    shard = [
+        (start, end, samples[start * MODEL_SAMPLE_RATE // 1000 : end * MODEL_SAMPLE_RATE // 1000])
+        for start, end in segments
+    ]
+    return [
+        {"text": result["text"], "start": result["start"], "end": result["end"]}
+        for result in _recognise_shard((tuple(model_selection[:6]) + (None, None), shard))
+    ]
+
+
+def _get_worker_pool(model_selection: tuple, workers: int) -> ProcessPoolExecutor:
+    """
+    获取常驻的工作进程池, 避免每次调用都重新加载模型。
+    进程池只在预先加载的模型 (主模型与标点模型) 或进程数变化时重建; VAD、说话人模型和识别方式随任务传入,
+    切换它们不会重建进程池.
+    """
+    global _pool, _pool_key
+    model_id, model_rev, _, _, punc_id, punc_rev, _, _ = model_selection
+    with _pool_lock:
+        key = (model_id, model_rev, punc_id, punc_rev, workers)
+        if _pool is None or _pool_key != key:
+            if _pool is not None:
+                _pool.shutdown(wait=True)
+            threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_id, model_rev, punc_id, punc_rev, threads_per_worker),
+            )
+            _pool_key = key
+        return _pool
+
+
+def get_default_worker_count() -> int:
+    """:return: int, 默认的工作进程数 (CPU核数的一半)."""
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def shard_segments(segments: list[list[int]], shard_count: int) -> list[list[list[int]]]:
+    """
+    将语音片段按时间顺序划分为总时长大致相等的连续分片。
+
+    :param segments: list[list[int]], [[开始毫秒, 结束毫秒], ...].
+    :param shard_count: int, 分片数量.
+    :return: list, 分片列表, 每个分片为一组连续的片段.
+    """
+    total_ms = sum(end - start for start, end in segments)
+    target_ms = total_ms / max(1, shard_count)
+    shards, current, current_ms = [], [], 0
+    for segment in segments:
+        current.append(segment)
+        current_ms += segment[1] - segment[0]
+        if current_ms >= target_ms and len(shards) < shard_count - 1:
+            shards.append(current)
+            current, current_ms = [], 0
+    if current:
+        shards.append(current)
+    return shards
+
+
+def assign_global_speakers(
+    embeddings: list, threshold: float = SPEAKER_SIMILARITY_THRESHOLD
+) -> list:
+    """
+    对所有分片的片段嵌入做全局聚类, 使说话人编号在各分片间保持一致。
+
+    :param embeddings: list, 每个片段的嵌入向量, 过短片段为None.
+    :param threshold: float, 归入已有说话人的最小余弦相似度.
+    :return: list, 每个片段的说话人编号 (无嵌入的片段沿用前一片段的编号).
+    """
+    missing = sum(1 for embedding in embeddings if embedding is None)
+    if missing:
+        logger.warning(
+            f"{missing}/{len(embeddings)} segments have no speaker embedding "
+            "and inherit the previous segment's speaker"
+        )
+    centroids, counts, labels = [], [], []
+    previous_label = 0
+    for embedding in embeddings:
+        if embedding is None:
+            labels.append(previous_label)
+            continue
+        vector = embedding / (np.linalg.norm(embedding) + 1e-8)
+        similarities = [float(np.dot(vector, c)) for c in centroids]
+        best = int(np.argmax(similarities)) if similarities else -1
+        if best >= 0 and similarities[best] >= threshold:
+            merged = centroids[best] * counts[best] + vector
+            centroids[best] = merged / (np.linalg.norm(merged) + 1e-8)
+            counts[best] += 1
+            label = best
+        else:
+            centroids.append(vector)
+            counts.append(1)
+            label = len(centroids) - 1
+        labels.append(label)
+        previous_label = label
+    return labels
+
+
+def run_modelscope_recognition_parallel(
+    audio_input_path: str,
+    model_id: str,
+    model_revision: str,
+    vad_model_id: str,
+    vad_model_revision: str,
+    punc_model_id: str,
+    punc_model_revision: str,
+    spk_model_id: str,
+    spk_model_revision: str,
+    num_workers: int = None,
+) -> list:
+    """
+    先整体运行一次VAD, 再将语音片段分片到多个工作进程并行识别, 最后按时间顺序合并。
+
+    :param audio_input_path: str, 输入音频文件的路径.
+    :param model_id: str, 主模型ID.
+    :param model_revision: str, 主模型版本.
+    :param vad_model_id: str, VAD模型ID (并行模式必需).
+    :param vad_model_revision: str, VAD模型版本.
+    :param punc_model_id: str, 标点模型ID.
+    :param punc_model_revision: str, 标点模型版本.
+    :param spk_model_id: str, 说话人模型ID, 为空时不区分说话人.
+    :param spk_model_revision: str, 说话人模型版本.
+    :param num_workers: int, 工作进程数, 默认为CPU核数的一半.
+    :return: list, 与run_modelscope_recognition结构相同的识别结果; 选择了说话人模型但无法提取嵌入
+             (模型不可用或没有足够长的片段) 时, 在并行识别开始前改用run_modelscope_recognition整体识别.
+    :raises ValueError: 如果未选择VAD模型.
+    """
+    if not vad_model_id:
+        raise ValueError("Parallel recognition requires a VAD model.")
+
+    workers = num_workers or get_default_worker_count()
+    samples = get_decoded_pcm(audio_input_path)
+    segments = detect_speech_segments(
+        get_vad_pipeline(vad_model_id, vad_model_revision), pcm_to_float32(samples)
+    )
+    if not segments:
+        return []
+
+    model_selection = (
+        model_id, model_revision,
+        vad_model_id, vad_model_revision,
+        punc_model_id, punc_model_revision,
+        spk_model_id, spk_model_revision,
+    )
+    pool = _get_worker_pool(model_selection, workers)
+
+    def recognise_whole_file(reason: str) -> list:
+        # Clustering without any embedding would label everything as one speaker
+        logger.warning(f"{reason} for {audio_input_path}, falling back to non-parallel recognition")
+        return run_modelscope_recognition(audio_input_path, *model_selection)
+
+    if spk_model_id:
+        # Check speaker support up front, so no parallel pass is wasted on a file that
+        # has to be recognised as a whole anyway
+        longest_start, longest_end = max(segments, key=lambda segment: segment[1] - segment[0])
+        if (longest_end - longest_start) < MIN_EMBEDDING_SECONDS * 1000:
+            return recognise_whole_file("No segment is long enough for a speaker embedding")
+        probe_samples = pcm_to_float32(
+            samples[longest_start * MODEL_SAMPLE_RATE // 1000 : longest_end * MODEL_SAMPLE_RATE // 1000]
+        )
+        if not pool.submit(
+            _probe_speaker_embedding, (spk_model_id, spk_model_revision, probe_samples)
+        ).result():
+            return recognise_whole_file("Speaker embeddings are unavailable")
+
+    shards = []
+    for shard in shard_segments(segments, workers):
+        shards.append(
+            [
+                (
+                    start,
+                    end,
+                    pcm_to_float32(
+                        samples[start * MODEL_SAMPLE_RATE // 1000 : end * MODEL_SAMPLE_RATE // 1000]
+                    ),
+                )
+                for start, end in shard
+            ]
+        )
+    logger.info(
+        f"Parallel recognition of {audio_input_path}: {len(segments)} segments "
+        f"in {len(shards)} shards across {workers} workers"
+    )
+
+    # Executor.map preserves shard order, so results stay in time order
+    segment_results = [
+        result
+        for shard_results in pool.map(_recognise_shard, [(model_selection, shard) for shard in shards])
+        for result in shard_results
+    ]
+
+    if spk_model_id:
+        embeddings = [r["embedding"] for r in segment_results]
+        if all(embedding is None for embedding in embeddings):
+            return recognise_whole_file("No speaker embeddings were produced")
+        speakers = assign_global_speakers(embeddings)
+    else:
+        speakers = [None] * len(segment_results)
+
+    sentence_info = []
+    for result, speaker in zip(segment_results, speakers):
+        if not result["text"]:
+            continue
+        sentence = {"text": result["text"], "start": result["start"], "end": result["end"]}
+        if speaker is not None:
+            sentence["spk"] = speaker
+        sentence_info.append(sentence)
+
+    return [
+        {
+            "text": join_recognised_texts([s["text"] for s in sentence_info]),
+            "sentence_info": sentence_info,
+        }
+    ]
+
+
+def run_modelscope_recognition_channel_split(
+    audio_input_path: str,
+    model_id: str,
+    model_revision: str,
+    vad_model_id: str,
+    vad_model_revision: str,
+    punc_model_id: str,
+    punc_model_revision: str,
+    spk_model_id: str = None,
+    spk_model_revision: str = None,
+    num_workers: int = None,
+) -> list:
+    """
+    双声道录音按声道区分说话人: 两个声道并行独立识别, 以声道序号作为说话人,
+    再按时间戳交错合并。跳过说话人模型, 结果可复现。
+
+    :param audio_input_path: str, 输入音频文件的路径 (须为双声道).
+    :param model_id: str, 主模型ID.
+    :param model_revision: str, 主模型版本.
+    :param vad_model_id: str, VAD模型ID (必需, 用于得到交错合并所需的句子时间).
+    :param vad_model_revision: str, VAD模型版本.
+    :param punc_model_id: str, 标点模型ID.
+    :param punc_model_revision: str, 标点模型版本.
+    :param spk_model_id: str, 忽略 (保留以便与其他识别函数参数一致).
+    :param spk_model_revision: str, 忽略.
+    :param num_workers: int, 工作进程数, 默认与并行识别相同 (以便复用同一进程池).
+    :return: list, 与run_modelscope_recognition结构相同的识别结果.
+    :raises ValueError: 如果未选择VAD模型或音频不是双声道.
+    """
+    if not vad_model_id:
+        raise ValueError("Channel-split recognition requires a VAD model.")
+    channel_count = get_audio_channel_count(audio_input_path)
+    if channel_count != 2:
+        raise ValueError(
+            f"Channel-split recognition requires stereo audio, got {channel_count} channel(s)."
+        )
+
+    model_selection = (
+        model_id, model_revision,
+        vad_model_id, vad_model_revision,
+        punc_model_id, punc_model_revision,
+        None, None,
+    )
+    pool = _get_worker_pool(model_selection, max(channel_count, num_workers or get_default_worker_count()))
+    channel_samples = [
+        pcm_to_float32(get_decoded_pcm(audio_input_path, channel))
+        for channel in range(channel_count)
+    ]
+    logger.info(f"Channel-split recognition of {audio_input_path}: {channel_count} channels")
+
+    sentence_info = []
+    channel_tasks = [(model_selection, samples) for samples in channel_samples]
+    for channel, sentences in enumerate(pool.map(_recognise_channel, channel_tasks)):
+        for sentence in sentences:
+            if sentence["text"]:
+                sentence_info.append({**sentence, "spk": channel})
+    # Every sentence carries its VAD start time, so sorting interleaves the two
+    # speakers; a tie goes to the lower channel
+    sentence_info.sort(key=lambda sentence: (sentence["start"], sentence["spk"]))
+
+    return [
+        {
+            "text": join_recognised_texts([s["text"] for s in sentence_info]),
+            "sentence_info": sentence_info,
+        }
+    ]
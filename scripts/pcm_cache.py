@@ -0,0 +1,190 @@
+import sys
+import os
+import time
+import threading
+import numpy as np
+
+# Ensure the project root is in sys.path for consistent imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils import load_config_section, setup_logger, compute_file_hash
+from scripts.audio_io import (
+    MODEL_SAMPLE_RATE,
+    iter_audio_blocks,
+    open_native_wav,
+    pcm_to_float32,
+)
+
+logger = setup_logger("PCM_CACHE")
+
+PCM_CACHE_DIR = os.path.join("cache", "pcm")
+PCM_CACHE_SUFFIX = ".f32"  # Raw 16 kHz mono little-endian float32 samples
+DEFAULT_PCM_CACHE_MAX_MB = 2048
+DEFAULT_PCM_CACHE_MAX_AGE_HOURS = 72
+PCM_DECODE_BLOCK_SECONDS = 30
+
+_decode_lock = threading.Lock()
+
+
+def get_pcm_cache_settings() -> tuple[int, float]:
+    """
+    从config.ini的MODELSCOPE区域读取解码缓存设置。
+
+    :return: tuple[int, float], (最大占用字节数, 最长保留秒数).
+    """
+    try:
+        modelscope_config = load_config_section("MODELSCOPE")
+        max_mb = int(modelscope_config.get("pcm_cache_max_mb", DEFAULT_PCM_CACHE_MAX_MB))
+        max_age_hours = float(
+            modelscope_config.get("pcm_cache_max_age_hours", DEFAULT_PCM_CACHE_MAX_AGE_HOURS)
+        )
+    except ValueError as e:
+        logger.warning(f"Invalid PCM cache settings, using defaults: {e}")
+        max_mb, max_age_hours = DEFAULT_PCM_CACHE_MAX_MB, DEFAULT_PCM_CACHE_MAX_AGE_HOURS
+    return max_mb * 1024 * 1024, max_age_hours * 3600
+
+
+def _pcm_file_path(content_hash: str, channel: int = None) -> str:
+    channel_suffix = f".c{channel}" if channel is not None else ""
+    return os.path.join(PCM_CACHE_DIR, content_hash + channel_suffix + PCM_CACHE_SUFFIX)
+
+
+def _open_pcm_memmap(pcm_path: str) -> np.ndarray:
+    """以只读内存映射方式打开PCM缓存文件。"""
+    if os.path.getsize(pcm_path) == 0:
+        return np.zeros(0, dtype=np.float32)
+    return np.memmap(pcm_path, dtype="<f4", mode="r")
+
+
+def find_cached_pcm(audio_path: str, channel: int = None):
+    """
+    查找无需解码即可使用的采样 (原生格式WAV或已有的PCM缓存)。
+
+    :param audio_path: str, 音频文件路径.
+    :param channel: int, 指定声道 (从0开始), 为None时为混合后的单声道.
+    :return: np.memmap 或 None, 命中时返回只读内存映射数组 (int16或float32).
+    """
+    native_samples = open_native_wav(audio_path) if channel is None else None
+    if native_samples is not None:
+        logger.info(f"Audio path for {audio_path}: native WAV fast path (memmap)")
+        return native_samples
+
+    pcm_path = _pcm_file_path(compute_file_hash(audio_path), channel)
+    if not os.path.exists(pcm_path):
+        return None
+    os.utime(pcm_path)  # mtime doubles as the LRU timestamp
+    logger.info(f"Audio path for {audio_path}: decoded PCM cache hit")
+    return _open_pcm_memmap(pcm_path)
+
+
+def get_decoded_pcm(audio_path: str, channel: int = None) -> np.ndarray:
+    """
+    获取音频的16 kHz单声道采样, 每份音频内容只解码一次。
+
+    已是16 kHz单声道16位PCM的WAV直接内存映射 (int16), 不解码也不重采样;
+    其余格式解码为float32后按内容哈希写入cache目录, 之后以内存映射方式读取。
+    解码过程分块写盘, 内存占用与音频时长无关。使用方需用pcm_to_float32转换。
+
+    :param audio_path: str, 音频文件路径.
+    :param channel: int, 只解码指定声道 (从0开始), 为None时混合为单声道.
+    :return: np.memmap, 只读内存映射数组 (int16或float32).
+    """
+    cached = find_cached_pcm(audio_path, channel)
+    if cached is not None:
+        return cached
+
+    with _decode_lock:
+        pcm_path = _pcm_file_path(compute_file_hash(audio_path), channel)
+        if not os.path.exists(pcm_path):
+            os.makedirs(PCM_CACHE_DIR, exist_ok=True)
+            temp_path = f"{pcm_path}.{os.getpid()}.tmp"
+            start = time.perf_counter()
+            try:
+                with open(temp_path, "wb") as f:
+                    for block in iter_audio_blocks(
+                        audio_path, PCM_DECODE_BLOCK_SECONDS, channel
+                    ):
+                        f.write(block.astype("<f4", copy=False).tobytes())
+                os.replace(temp_path, pcm_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            logger.info(
+                f"Audio path for {audio_path}: decoded to PCM cache in "
+                f"{time.perf_counter() - start:.1f}s"
+            )
+            max_bytes, max_age_seconds = get_pcm_cache_settings()
+            evict_pcm_cache(max_bytes, max_age_seconds, keep_path=pcm_path)
+
+    return _open_pcm_memmap(pcm_path)
+
+
+def iter_pcm_blocks(samples: np.ndarray, block_seconds: float):
+    """
+    将内存映射的采样数组按固定时长切块, 仅在访问时读入并转换对应的块。
+
+    :param samples: np.ndarray, 16 kHz单声道采样 (int16或float32, 可为np.memmap).
+    :param block_seconds: float, 每块的时长 (秒).
+    :return: 生成器, 逐块产生float32数组.
+    """
+    block_samples = max(1, int(block_seconds * MODEL_SAMPLE_RATE))
+    for start in range(0, len(samples), block_samples):
+        yield pcm_to_float32(samples[start : start + block_samples])
+
+
+def _list_pcm_entries() -> list[tuple[str, float, int]]:
+    """:return: list, [(路径, 修改时间, 字节数), ...]."""
+    if not os.path.isdir(PCM_CACHE_DIR):
+        return []
+    entries = []
+    for filename in os.listdir(PCM_CACHE_DIR):
+        if not filename.endswith(PCM_CACHE_SUFFIX):
+            continue
+        file_path = os.path.join(PCM_CACHE_DIR, filename)
+        try:
+            file_stat = os.stat(file_path)
+        except OSError:
+            continue
+        entries.append((file_path, file_stat.st_mtime, file_stat.st_size))
+    return entries
+
+
+def evict_pcm_cache(max_bytes: int, max_age_seconds: float, keep_path: str = None):
+    """
+    删除超过保留时长的解码缓存, 再按LRU删除直到总占用不超过上限。
+
+    :param max_bytes: int, 最大占用字节数.
+    :param max_age_seconds: float, 最长保留秒数, 不大于0时不按时长淘汰.
+    :param keep_path: str, 不参与淘汰的文件 (刚写入的条目).
+    """
+    now = time.time()
+    entries = sorted(_list_pcm_entries(), key=lambda entry: entry[1])
+    total_bytes = sum(entry[2] for entry in entries)
+    for file_path, mtime, size in entries:
+        if file_path == keep_path:
+            continue
+        expired = max_age_seconds > 0 and now - mtime > max_age_seconds
+        if not expired and total_bytes <= max_bytes:
+            continue
+        try:
+            os.remove(file_path)
+            total_bytes -= size
+        except OSError as e:
+            # On Windows a file that is still memory-mapped cannot be removed
+            logger.warning(f"Failed to evict PCM cache entry {file_path}: {e}")
+
+
+def get_pcm_cache_stats() -> dict:
+    """
+    返回解码缓存的统计信息。
+
+    :return: dict, 包含条目数、占用大小与上限.
+    """
+    entries = _list_pcm_entries()
+    max_bytes, max_age_seconds = get_pcm_cache_settings()
+    return {
+        "entries": len(entries),
+        "size_mb": round(sum(entry[2] for entry in entries) / 1024 / 1024, 2),
+        "max_mb": round(max_bytes / 1024 / 1024, 1),
+        "max_age_hours": round(max_age_seconds / 3600, 1),
+    }
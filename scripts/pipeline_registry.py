@@ -0,0 +1,262 @@
+import sys
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# Ensure the project root is in sys.path for consistent imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils import load_config_section, setup_logger
+
+logger = setup_logger("PIPELINE_REGISTRY")
+
+DEFAULT_MEMORY_BUDGET_MB = 6144
+DEFAULT_IDLE_TTL_SECONDS = 1800
+IDLE_SWEEP_INTERVAL_SECONDS = 60
+
+
+def _estimate_module_bytes(obj, seen: set) -> int:
+    """
+    估算对象中所有PyTorch模块参数与缓冲区占用的字节数。
+
+    :param obj: 任意对象 (pipeline、AutoModel、nn.Module等).
+    :param seen: set, 已统计过的对象id, 避免重复计算共享子模块.
+    :return: int, 估算的字节数.
+    """
+    if obj is None or id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if hasattr(obj, "parameters") and hasattr(obj, "buffers"):
+        try:
+            total = sum(p.numel() * p.element_size() for p in obj.parameters())
+            total += sum(b.numel() * b.element_size() for b in obj.buffers())
+            return total
+        except Exception:
+            return 0
+
+    total = 0
+    attributes = getattr(obj, "__dict__", None)
+    if isinstance(attributes, dict):
+        for value in attributes.values():
+            if hasattr(value, "__dict__") or hasattr(value, "parameters"):
+                total += _estimate_module_bytes(value, seen)
+    return total
+
+
+def estimate_pipeline_bytes(inference_pipeline) -> int:
+    """
+    估算一个ModelScope推理管道 (含VAD/标点/说话人子模型) 的显存/内存占用。
+
+    :param inference_pipeline: ModelScope pipeline 实例.
+    :return: int, 估算的字节数, 无法估算时返回0.
+    """
+    return _estimate_module_bytes(inference_pipeline, set())
+
+
+class PipelineRegistry:
+    """
+    进程级的ASR推理管道注册表。
+
+    以 (model_id, revision, vad, punc, spk) 完整元组为键缓存已加载的管道，
+    在内存预算内按LRU淘汰，并卸载超过空闲时长未使用的管道。
+    """
+
+    def __init__(
+        self,
+        memory_budget_bytes: int = DEFAULT_MEMORY_BUDGET_MB * 1024 * 1024,
+        idle_ttl_seconds: float = DEFAULT_IDLE_TTL_SECONDS,
+    ):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self._entries = OrderedDict()  # key -> {"pipeline", "bytes", "last_used"}
+        self._lock = threading.RLock()
+        self._load_locks = {}  # key -> threading.Lock held while that key's loader runs
+        self._sweeper = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_load_seconds = 0.0
+
+    def get(self, key: tuple, loader):
+        """
+        获取键对应的管道, 未命中时调用loader加载并登记。
+
+        加载期间只持有该键的加载锁: 同一键的并发请求等待这一次加载, 其他键 (包括已缓存的管道) 不受影响。
+
+        :param key: tuple, 管道的完整配置元组.
+        :param loader: callable, 无参函数, 返回新建的管道实例.
+        :return: 推理管道实例.
+        """
+        with self._lock:
+            inference_pipeline = self._lookup_locked(key)
+            if inference_pipeline is not None:
+                return inference_pipeline
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            try:
+                with self._lock:
+                    # Another thread may have loaded it while this one waited
+                    inference_pipeline = self._lookup_locked(key)
+                    if inference_pipeline is not None:
+                        return inference_pipeline
+                    self.misses += 1
+
+                start = time.perf_counter()
+                inference_pipeline = loader()
+                load_seconds = time.perf_counter() - start
+                pipeline_bytes = estimate_pipeline_bytes(inference_pipeline)
+                logger.info(
+                    f"Loaded ASR pipeline {key} in {load_seconds:.1f}s "
+                    f"(~{pipeline_bytes / 1024 / 1024:.0f} MB)"
+                )
+
+                with self._lock:
+                    self.total_load_seconds += load_seconds
+                    self._entries[key] = {
+                        "pipeline": inference_pipeline,
+                        "bytes": pipeline_bytes,
+                        "last_used": time.monotonic(),
+                        "load_seconds": load_seconds,
+                    }
+                    self._evict_over_budget_locked(keep_key=key)
+                    self._ensure_sweeper()
+                    return inference_pipeline
+            finally:
+                with self._lock:
+                    self._load_locks.pop(key, None)
+
+    def _lookup_locked(self, key: tuple):
+        """返回已缓存的管道并刷新其使用时间, 未缓存时返回None。"""
+        self._evict_idle_locked()
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        entry["last_used"] = time.monotonic()
+        self.hits += 1
+        return entry["pipeline"]
+
+    def _evict_over_budget_locked(self, keep_key: tuple):
+        """按LRU顺序淘汰管道, 直到总占用回到预算内 (刚加载的管道除外)。"""
+        while self.memory_bytes() > self.memory_budget_bytes and len(self._entries) > 1:
+            oldest_key = next(iter(self._entries))
+            if oldest_key == keep_key:
+                break
+            self._remove_locked(oldest_key, reason="memory budget")
+
+    def _evict_idle_locked(self):
+        """卸载空闲时间超过TTL的管道。"""
+        if self.idle_ttl_seconds <= 0:
+            return
+        now = time.monotonic()
+        expired = [
+            key
+            for key, entry in self._entries.items()
+            if now - entry["last_used"] > self.idle_ttl_seconds
+        ]
+        for key in expired:
+            self._remove_locked(key, reason="idle ttl")
+
+    def _remove_locked(self, key: tuple, reason: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.evictions += 1
+        logger.info(f"Unloaded ASR pipeline {key} ({reason})")
+        del entry
+        _release_accelerator_memory()
+
+    def _ensure_sweeper(self):
+        """启动后台线程, 定期卸载空闲管道 (即使没有新的请求)。"""
+        if self._sweeper is not None or self.idle_ttl_seconds <= 0:
+            return
+
+        def sweep_loop():
+            while True:
+                time.sleep(min(IDLE_SWEEP_INTERVAL_SECONDS, self.idle_ttl_seconds))
+                with self._lock:
+                    self._evict_idle_locked()
+
+        self._sweeper = threading.Thread(
+            target=sweep_loop, name="asr-pipeline-sweeper", daemon=True
+        )
+        self._sweeper.start()
+
+    def memory_bytes(self) -> int:
+        """:return: int, 当前已登记管道的估算总占用."""
+        return sum(entry["bytes"] for entry in self._entries.values())
+
+    def clear(self):
+        """卸载所有已缓存的管道。"""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove_locked(key, reason="cleared")
+
+    def stats(self) -> dict:
+        """
+        返回注册表的统计信息。
+
+        :return: dict, 包含命中/未命中次数、累计加载耗时、当前管道数和内存占用.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "total_load_seconds": round(self.total_load_seconds, 2),
+                "loaded_pipelines": len(self._entries),
+                "memory_mb": round(self.memory_bytes() / 1024 / 1024, 1),
+                "memory_budget_mb": round(self.memory_budget_bytes / 1024 / 1024, 1),
+            }
+
+
+def _release_accelerator_memory():
+    """在卸载管道后尽量归还GPU显存。"""
+    try:
+        import torch
+
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except Exception:
+        pass
+
+
+def _load_registry_settings() -> tuple[int, float]:
+    """
+    从config.ini的MODELSCOPE区域读取注册表的内存预算和空闲TTL。
+
+    :return: tuple[int, float], (内存预算字节数, 空闲TTL秒数).
+    """
+    try:
+        modelscope_config = load_config_section("MODELSCOPE")
+        budget_mb = int(
+            modelscope_config.get("pipeline_memory_budget_mb", DEFAULT_MEMORY_BUDGET_MB)
+        )
+        idle_ttl = float(
+            modelscope_config.get("pipeline_idle_ttl", DEFAULT_IDLE_TTL_SECONDS)
+        )
+    except (ValueError, KeyError) as e:
+        logger.warning(f"Invalid pipeline registry settings, using defaults: {e}")
+        budget_mb, idle_ttl = DEFAULT_MEMORY_BUDGET_MB, DEFAULT_IDLE_TTL_SECONDS
+    return budget_mb * 1024 * 1024, idle_ttl
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_pipeline_registry() -> PipelineRegistry:
+    """
+    获取进程级的管道注册表单例 (首次调用时根据配置创建)。
+
+    :return: PipelineRegistry, 注册表实例.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            budget_bytes, idle_ttl = _load_registry_settings()
+            _registry = PipelineRegistry(budget_bytes, idle_ttl)
+        return _registry
@@ -0,0 +1,218 @@
+import sys
+import os
+import time
+import asyncio
+import email.utils
+
+# Ensure the project root is in sys.path for consistent imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils import setup_logger
+
+logger = setup_logger("RATE_LIMITER")
+
+DEFAULT_RETRY_AFTER_SECONDS = 2.0
+MAX_RETRY_AFTER_SECONDS = 120.0
+
+# Limiters are only used on the async_llm event loop; readers get snapshots.
+_limiters = {}
+
+
+class TokenBucket:
+    """
+    按分钟配额匀速补充的令牌桶。令牌可以透支 (按实际用量修正预留量时),
+    透支部分随时间补回后才允许新的请求。
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+
+    def peek(self, now: float) -> float:
+        """不修改状态, 返回当前令牌数。"""
+        return min(self.capacity, self.level + (now - self.updated) * self.capacity / 60.0)
+
+    def wait_seconds(self, amount: float, now: float) -> float:
+        """返回取出amount个令牌前需要等待的秒数 (单次请求超过容量时按容量计)。"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60.0 / self.capacity
+
+    def take(self, amount: float):
+        self.level -= amount
+
+    def resize(self, per_minute: int):
+        """修改每分钟配额, 保留已消耗 (含透支) 的部分。"""
+        self._refill(time.monotonic())
+        self.capacity = float(per_minute)
+        self.level = min(self.level, self.capacity)
+
+
+def _resize_bucket(bucket, per_minute: int):
+    if per_minute <= 0:
+        return None
+    if bucket is None:
+        return TokenBucket(per_minute)
+    bucket.resize(per_minute)
+    return bucket
+
+
+def _get_limiter(model_name: str, rpm: int, tpm: int) -> dict:
+    limiter = _limiters.get(model_name)
+    if limiter is not None:
+        if (limiter["rpm"], limiter["tpm"]) != (rpm, tpm):
+            # Updated in place: requests queued on the lock, the counters and an
+            # active 429 pause all carry over to the new limits
+            limiter["requests"] = _resize_bucket(limiter["requests"], rpm)
+            limiter["tokens"] = _resize_bucket(limiter["tokens"], tpm)
+            limiter["rpm"], limiter["tpm"] = rpm, tpm
+    else:
+        limiter = {
+            "rpm": rpm,
+            "tpm": tpm,
+            "requests": TokenBucket(rpm) if rpm > 0 else None,
+            "tokens": TokenBucket(tpm) if tpm > 0 else None,
+            "lock": asyncio.Lock(),
+            "blocked_until": 0.0,
+            "queued": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "rate_limited": 0,
+        }
+        _limiters[model_name] = limiter
+    return limiter
+
+
+async def acquire(model_name: str, rpm: int, tpm: int, tokens: int) -> float:
+    """
+    按模型的RPM与TPM配额排队等待, 直到可以发送一次请求 (先到先得)。
+
+    :param model_name: str, 模型名称.
+    :param rpm: int, 每分钟请求数上限, 0表示不限制.
+    :param tpm: int, 每分钟token数上限, 0表示不限制.
+    :param tokens: int, 本次请求预留的token数 (提示加预计输出).
+    :return: float, 本次等待的秒数.
+    """
+    limiter = _get_limiter(model_name, rpm, tpm)
+    limiter["queued"] += 1
+    waited = 0.0
+    try:
+        async with limiter["lock"]:
+            while True:
+                now = time.monotonic()
+                delay = max(0.0, limiter["blocked_until"] - now)
+                if limiter["requests"]:
+                    delay = max(delay, limiter["requests"].wait_seconds(1, now))
+                if limiter["tokens"]:
+                    delay = max(delay, limiter["tokens"].wait_seconds(tokens, now))
+                if delay <= 0:
+                    break
+                waited += delay
+                await asyncio.sleep(delay)
+            if limiter["requests"]:
+                limiter["requests"].take(1)
+            if limiter["tokens"]:
+                limiter["tokens"].take(tokens)
+    finally:
+        limiter["queued"] -= 1
+    if waited > 0:
+        limiter["waits"] += 1
+        limiter["wait_seconds"] += waited
+        logger.info(f"Rate limit for {model_name}: waited {waited:.1f}s")
+    return waited
+
+
+def settle_tokens(model_name: str, reserved_tokens: int, actual_tokens: int):
+    """
+    请求结束后按实际用量修正预留的token数 (多退少补)。每次acquire之后都必须调用, 请求失败时也不例外,
+    否则预留的token不会归还.
+
+    :param model_name: str, 模型名称.
+    :param reserved_tokens: int, acquire时预留的token数.
+    :param actual_tokens: int, 实际消耗的token数.
+    """
+    limiter = _limiters.get(model_name)
+    if limiter and limiter["tokens"]:
+        limiter["tokens"].take(actual_tokens - reserved_tokens)
+
+
+def get_retry_after_seconds(error: Exception, attempt: int) -> float:
+    """
+    从429响应的 Retry-After / retry-after-ms 头读取等待时间, 缺失时按重试次数指数退避。
+
+    :param error: Exception, 带有response属性的限流错误.
+    :param attempt: int, 已重试的次数 (从0开始).
+    :return: float, 等待秒数.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    retry_after_ms = headers.get("retry-after-ms")
+    retry_after = headers.get("retry-after")
+    seconds = None
+    try:
+        if retry_after_ms is not None:
+            seconds = float(retry_after_ms) / 1000.0
+        elif retry_after is not None:
+            seconds = float(retry_after)
+    except ValueError:
+        # Retry-After may also be an HTTP date
+        try:
+            seconds = email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time()
+        except (TypeError, ValueError):
+            seconds = None
+    if seconds is None:
+        seconds = DEFAULT_RETRY_AFTER_SECONDS * 2 ** attempt
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER_SECONDS)
+
+
+def pause(model_name: str, seconds: float):
+    """
+    收到429后暂停该模型的所有请求 (排队中的请求在暂停结束后依次发送)。
+
+    :param model_name: str, 模型名称.
+    :param seconds: float, 暂停秒数.
+    """
+    limiter = _limiters.get(model_name)
+    if limiter is None:
+        limiter = _get_limiter(model_name, 0, 0)
+    limiter["rate_limited"] += 1
+    limiter["blocked_until"] = max(limiter["blocked_until"], time.monotonic() + seconds)
+    logger.warning(f"{model_name} returned 429, pausing requests for {seconds:.1f}s")
+
+
+def get_rate_limit_stats() -> list[dict]:
+    """
+    返回各模型令牌桶的当前状态, 用于判断吞吐是否受配额限制。
+
+    :return: list[dict], 每个模型包含 model、rpm、tpm、requests_available、tokens_available、
+             queued (排队中的请求数)、waits、wait_seconds、rate_limited (收到429的次数)
+             与 paused_seconds (剩余暂停时间).
+    """
+    now = time.monotonic()
+    report = []
+    for model_name, limiter in list(_limiters.items()):
+        report.append(
+            {
+                "model": model_name,
+                "rpm": limiter["rpm"] or None,
+                "tpm": limiter["tpm"] or None,
+                "requests_available": (
+                    round(limiter["requests"].peek(now), 1) if limiter["requests"] else None
+                ),
+                "tokens_available": (
+                    int(limiter["tokens"].peek(now)) if limiter["tokens"] else None
+                ),
+                "queued": limiter["queued"],
+                "waits": limiter["waits"],
+                "wait_seconds": round(limiter["wait_seconds"], 1),
+                "rate_limited": limiter["rate_limited"],
+                "paused_seconds": round(max(0.0, limiter["blocked_until"] - now), 1),
+            }
+        )
+    return report
@@ -0,0 +1,202 @@
+import sys
+import os
+import json
+import gzip
+import hashlib
+import threading
+
+# Ensure the project root is in sys.path for consistent imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils import load_config_section, setup_logger, compute_file_hash
+
+logger = setup_logger("RESULT_CACHE")
+
+RESULT_CACHE_DIR = os.path.join("cache", "asr_results")
+RESULT_CACHE_SUFFIX = ".json.gz"
+DEFAULT_RESULT_CACHE_MAX_MB = 512
+
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(stat_name: str):
+    with _stats_lock:
+        _stats[stat_name] += 1
+
+
+def get_result_cache_settings() -> tuple[bool, int]:
+    """
+    从config.ini的MODELSCOPE区域读取识别结果缓存设置。
+
+    :return: tuple[bool, int], (是否启用, 最大占用字节数).
+    """
+    try:
+        modelscope_config = load_config_section("MODELSCOPE")
+        enabled = modelscope_config.getboolean("result_cache_enabled", fallback=True)
+        max_mb = int(
+            modelscope_config.get("result_cache_max_mb", DEFAULT_RESULT_CACHE_MAX_MB)
+        )
+    except ValueError as e:
+        logger.warning(f"Invalid result cache settings, using defaults: {e}")
+        enabled, max_mb = True, DEFAULT_RESULT_CACHE_MAX_MB
+    return enabled, max_mb * 1024 * 1024
+
+
+def build_result_cache_key(audio_path: str, model_selection: tuple) -> str:
+    """
+    根据音频内容哈希和模型组合生成缓存键。
+
+    :param audio_path: str, 音频文件路径.
+    :param model_selection: tuple, 8项模型组合 (模型ID与版本).
+    :return: str, 缓存键 (十六进制字符串).
+    """
+    key_material = json.dumps(
+        [compute_file_hash(audio_path), list(model_selection)], ensure_ascii=False
+    )
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+
+def _cache_file_path(cache_key: str) -> str:
+    return os.path.join(RESULT_CACHE_DIR, cache_key + RESULT_CACHE_SUFFIX)
+
+
+def load_cached_result(cache_key: str):
+    """
+    读取缓存的原始识别结果, 命中时刷新其访问时间。
+
+    :param cache_key: str, 缓存键.
+    :return: list 或 None, 缓存的识别结果, 未命中时返回None.
+    """
+    file_path = _cache_file_path(cache_key)
+    try:
+        with gzip.open(file_path, "rt", encoding="utf-8") as f:
+            result = json.load(f)
+    except FileNotFoundError:
+        _count("misses")
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Discarding unreadable result cache entry {file_path}: {e}")
+        _count("misses")
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+        return None
+
+    os.utime(file_path)  # mtime doubles as the LRU timestamp
+    _count("hits")
+    return result
+
+
+def _to_json_compatible(value):
+    """将识别结果中的numpy标量/数组转换为JSON可序列化的类型。"""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def store_cached_result(cache_key: str, recognition_output: list, max_bytes: int):
+    """
+    以压缩JSON写入识别结果, 并按LRU淘汰超出容量的旧条目。
+
+    :param cache_key: str, 缓存键.
+    :param recognition_output: list, 原始识别结果.
+    :param max_bytes: int, 缓存目录的最大占用字节数.
+    """
+    os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+    file_path = _cache_file_path(cache_key)
+    temp_path = file_path + ".tmp"
+    try:
+        with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+            json.dump(
+                recognition_output,
+                f,
+                ensure_ascii=False,
+                separators=(",", ":"),
+                default=_to_json_compatible,
+            )
+        os.replace(temp_path, file_path)
+        _count("writes")
+    except (OSError, TypeError) as e:
+        logger.warning(f"Failed to write result cache entry {file_path}: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return
+    evict_result_cache(max_bytes)
+
+
+def _list_cache_entries() -> list[tuple[str, float, int]]:
+    """:return: list, [(路径, 修改时间, 字节数), ...]."""
+    if not os.path.isdir(RESULT_CACHE_DIR):
+        return []
+    entries = []
+    for filename in os.listdir(RESULT_CACHE_DIR):
+        if not filename.endswith(RESULT_CACHE_SUFFIX):
+            continue
+        file_path = os.path.join(RESULT_CACHE_DIR, filename)
+        try:
+            file_stat = os.stat(file_path)
+        except OSError:
+            continue
+        entries.append((file_path, file_stat.st_mtime, file_stat.st_size))
+    return entries
+
+
+def evict_result_cache(max_bytes: int):
+    """
+    按最近最少使用顺序删除缓存条目, 直到总占用不超过max_bytes。
+
+    :param max_bytes: int, 最大占用字节数.
+    """
+    entries = sorted(_list_cache_entries(), key=lambda entry: entry[1])
+    total_bytes = sum(entry[2] for entry in entries)
+    for file_path, _, size in entries:
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(file_path)
+            total_bytes -= size
+            _count("evictions")
+        except OSError as e:
+            logger.warning(f"Failed to evict result cache entry {file_path}: {e}")
+
+
+def clear_result_cache():
+    """删除所有识别结果缓存条目。"""
+    for file_path, _, _ in _list_cache_entries():
+        try:
+            os.remove(file_path)
+        except OSError as e:
+            logger.warning(f"Failed to remove result cache entry {file_path}: {e}")
+
+
+def get_result_cache_counters() -> dict:
+    """
+    返回本进程内的缓存计数 (不扫描缓存目录, 开销很小)。
+
+    :return: dict, 包含hits/misses/writes/evictions.
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def get_result_cache_stats() -> dict:
+    """
+    返回识别结果缓存的统计信息。
+
+    :return: dict, 包含条目数、占用大小和本进程内的命中/未命中次数.
+    """
+    entries = _list_cache_entries()
+    enabled, max_bytes = get_result_cache_settings()
+    with _stats_lock:
+        stats = dict(_stats)
+    stats.update(
+        {
+            "enabled": enabled,
+            "entries": len(entries),
+            "size_mb": round(sum(entry[2] for entry in entries) / 1024 / 1024, 2),
+            "max_mb": round(max_bytes / 1024 / 1024, 1),
+        }
+    )
+    return stats
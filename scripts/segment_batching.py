@@ -0,0 +1,233 @@
+import sys
+import os
+import time
+
+# Ensure the project root is in sys.path for consistent imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils import setup_logger
+from scripts.audio_io import MODEL_SAMPLE_RATE, pcm_to_float32
+from scripts.pcm_cache import get_decoded_pcm
+from scripts.modelscope_scripts import (
+    get_asr_pipeline,
+    get_punc_pipeline,
+    get_vad_pipeline,
+    detect_speech_segments,
+    join_recognised_texts,
+    punctuate_text,
+    run_modelscope_recognition,
+)
+
+logger = setup_logger("SEGMENT_BATCHING")
+
+DEFAULT_BATCH_SIZE_SECONDS = 300
+
+
+class SegmentBatcher:
+    """
+    跨文件的VAD片段批处理器。
+
+    收集多个待处理文件的语音片段, 按音频秒数预算打包成批次,
+    每个批次一次调用识别管道, 再将结果按片段归还给所属文件。
+    适合大量短音频 (语音备忘、短访谈) 在CPU上的批量转录。不区分说话人。
+    """
+
+    def __init__(self, model_selection: tuple, batch_size_s: float = DEFAULT_BATCH_SIZE_SECONDS):
+        """
+        :param model_selection: tuple, 8项模型组合 (须包含VAD模型, 说话人模型被忽略).
+        :param batch_size_s: float, 每个批次的音频总时长上限 (秒).
+        :raises ValueError: 如果未选择VAD模型.
+        """
+        model_id, model_rev, vad_id, vad_rev, punc_id, punc_rev, _, _ = model_selection
+        if not vad_id:
+            raise ValueError("Segment batching requires a VAD model.")
+        self.batch_size_s = batch_size_s
+        self._vad_pipeline = get_vad_pipeline(vad_id, vad_rev)
+        # Segments are already cut by VAD, so the batched recogniser skips it; FunASR only
+        # punctuates inside its VAD path, so punctuation runs separately on each segment
+        self._asr_pipeline = get_asr_pipeline(model_id, model_rev, None, None, None, None, None, None)
+        self._punc_pipeline = get_punc_pipeline(punc_id, punc_rev) if punc_id else None
+        self._pending = []  # [(audio_path, start_ms, end_ms, samples), ...]
+        self._files = []
+        self._errors = {}  # {audio_path: error message} for files that failed decoding or inference
+        self.stats = {"files": 0, "segments": 0, "batches": 0, "audio_seconds": 0.0, "wall_seconds": 0.0}
+
+    def add_file(self, audio_path: str):
+        """
+        对文件运行VAD并将其语音片段加入待处理队列。解码或VAD失败时只记录该文件的错误, 不影响其他文件。
+
+        :param audio_path: str, 音频文件路径.
+        """
+        self._files.append(audio_path)
+        try:
+            samples = pcm_to_float32(get_decoded_pcm(audio_path))
+            segments = detect_speech_segments(self._vad_pipeline, samples)
+        except Exception as e:
+            logger.error(f"Failed to prepare {audio_path} for batching: {e}")
+            self._errors[audio_path] = str(e)
+            return
+        for start_ms, end_ms in segments:
+            self._pending.append(
+                (
+                    audio_path,
+                    start_ms,
+                    end_ms,
+                    samples[start_ms * MODEL_SAMPLE_RATE // 1000 : end_ms * MODEL_SAMPLE_RATE // 1000],
+                )
+            )
+
+    @property
+    def pending_segments(self) -> int:
+        """:return: int, 待识别的片段数."""
+        return len(self._pending)
+
+    def _recognise_batch(self, batch: list[tuple]) -> list:
+        """
+        一次调用识别一个批次; 调用失败时逐个片段重试, 使错误只归属于出错片段所在的文件。
+
+        :return: list, 与batch一一对应的识别结果, 失败的片段为None.
+        """
+        try:
+            return list(self._asr_pipeline([segment[3] for segment in batch], batch_size=len(batch)) or [])
+        except Exception as e:
+            logger.warning(f"Batch of {len(batch)} segments failed, retrying one by one: {e}")
+        segment_results = []
+        for audio_path, start_ms, _, samples in batch:
+            try:
+                segment_result = self._asr_pipeline(samples) or [{}]
+                segment_results.append(segment_result[0])
+            except Exception as e:
+                logger.error(f"Recognition failed for {audio_path} at {start_ms}ms: {e}")
+                self._errors.setdefault(audio_path, str(e))
+                segment_results.append(None)
+        return segment_results
+
+    def _pack_batches(self) -> list[list[tuple]]:
+        """按时长排序后打包, 使同一批次内片段长度相近, 减少填充浪费。"""
+        budget_samples = self.batch_size_s * MODEL_SAMPLE_RATE
+        batches, current, current_samples = [], [], 0
+        for segment in sorted(self._pending, key=lambda item: len(item[3])):
+            if current and current_samples + len(segment[3]) > budget_samples:
+                batches.append(current)
+                current, current_samples = [], 0
+            current.append(segment)
+            current_samples += len(segment[3])
+        if current:
+            batches.append(current)
+        return batches
+
+    def run(self) -> tuple[dict, dict]:
+        """
+        识别所有待处理片段, 并按文件组装为与run_modelscope_recognition相同的结构。
+
+        :return: tuple[dict, dict], ({音频路径: [{"text": ..., "sentence_info": [...]}]},
+                 {失败的音频路径: 错误信息}); 失败的文件不出现在第一个字典中.
+        """
+        start = time.perf_counter()
+        sentences_by_file = {path: [] for path in self._files}
+        batches = self._pack_batches()
+        for batch in batches:
+            batch_result = self._recognise_batch(batch)
+            for (audio_path, start_ms, end_ms, _), segment_result in zip(batch, batch_result):
+                if segment_result is None:
+                    continue
+                text = segment_result.get("text", "")
+                if text and self._punc_pipeline is not None:
+                    text = punctuate_text(self._punc_pipeline, text)
+                if text:
+                    sentences_by_file[audio_path].append(
+                        {"text": text, "start": start_ms, "end": end_ms}
+                    )
+
+        results = {}
+        for audio_path, sentences in sentences_by_file.items():
+            if audio_path in self._errors:
+                continue
+            sentences.sort(key=lambda sentence: sentence["start"])
+            results[audio_path] = (
+                [{"text": join_recognised_texts([s["text"] for s in sentences]), "sentence_info": sentences}]
+                if sentences
+                else []
+            )
+
+        wall_seconds = time.perf_counter() - start
+        audio_seconds = sum(len(segment[3]) for segment in self._pending) / MODEL_SAMPLE_RATE
+        self.stats["files"] += len(self._files)
+        self.stats["segments"] += len(self._pending)
+        self.stats["batches"] += len(batches)
+        self.stats["audio_seconds"] += audio_seconds
+        self.stats["wall_seconds"] += wall_seconds
+        logger.info(
+            f"Batched {len(self._pending)} segments from {len(self._files)} files "
+            f"into {len(batches)} calls in {wall_seconds:.1f}s"
+        )
+        errors = self._errors
+        self._pending, self._files, self._errors = [], [], {}
+        return results, errors
+
+
+def transcribe_files_batched(
+    audio_paths: list[str], model_selection: tuple, batch_size_s: float = DEFAULT_BATCH_SIZE_SECONDS
+) -> tuple[dict, dict]:
+    """
+    使用跨文件片段批处理转录一组文件。
+
+    :param audio_paths: list[str], 音频文件路径列表.
+    :param model_selection: tuple, 8项模型组合.
+    :param batch_size_s: float, 每个批次的音频总时长上限 (秒).
+    :return: tuple[dict, dict, dict], ({路径: 识别结果}, {失败的路径: 错误信息}, 批处理统计).
+    """
+    batcher = SegmentBatcher(model_selection, batch_size_s)
+    for audio_path in audio_paths:
+        batcher.add_file(audio_path)
+    results, errors = batcher.run()
+    return results, errors, dict(batcher.stats)
+
+
+def benchmark_segment_batching(
+    audio_paths: list[str], model_selection: tuple, batch_size_s: float = DEFAULT_BATCH_SIZE_SECONDS
+) -> dict:
+    """
+    对同一组文件分别以逐文件识别 (run_modelscope_recognition, 即非批处理的实际路径) 和跨文件批处理方式识别,
+    比较吞吐量。两边使用相同的主模型、VAD与标点模型 (不区分说话人), 都计入VAD与标点的耗时,
+    都在模型加载和音频解码之后计时, 且逐文件识别跳过识别结果缓存。
+
+    :param audio_paths: list[str], 音频文件路径列表.
+    :param model_selection: tuple, 8项模型组合 (说话人模型被忽略).
+    :param batch_size_s: float, 批处理模式的批次时长上限 (秒).
+    :return: dict, {"unbatched": {...}, "batched": {...}}, 各含音频秒数、耗时、识别调用次数与每秒处理的音频秒数.
+    """
+    per_file_selection = tuple(model_selection[:6]) + (None, None)
+    batcher = SegmentBatcher(model_selection, batch_size_s)
+    get_asr_pipeline(*per_file_selection)
+    for audio_path in audio_paths:
+        get_decoded_pcm(audio_path)
+
+    start = time.perf_counter()
+    for audio_path in audio_paths:
+        run_modelscope_recognition(audio_path, *per_file_selection, use_cache=False)
+    unbatched_wall = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for audio_path in audio_paths:
+        batcher.add_file(audio_path)
+    segments = batcher.pending_segments
+    _, errors = batcher.run()
+    batched_wall = time.perf_counter() - start
+    if errors:
+        logger.warning(f"{len(errors)} files failed in the batched run: {errors}")
+    audio_seconds = batcher.stats["audio_seconds"]
+
+    def summarise(wall_seconds: float, calls: int) -> dict:
+        return {
+            "audio_seconds": round(audio_seconds, 1),
+            "wall_seconds": round(wall_seconds, 2),
+            "pipeline_calls": calls,
+            "audio_seconds_per_second": round(audio_seconds / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        }
+
+    logger.info(f"Benchmarked {len(audio_paths)} files ({segments} speech segments)")
+    return {
+        "unbatched": summarise(unbatched_wall, len(audio_paths)),
+        "batched": summarise(batched_wall, batcher.stats["batches"]),
+    }
@@ -0,0 +1,360 @@
+import sys
+import os
+import time
+import asyncio
+import hashlib
+
+# Ensure the project root is in sys.path for consistent imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils import setup_logger, ThinkTagStreamParser
+from scripts.text_chunking import chunk_by_turns
+from scripts.llm_scripts import acomplete_text, get_llm_chunk_settings, run_concurrently
+from scripts.token_budget import (
+    count_tokens,
+    expected_summary_tokens,
+    fit_chunk_chars,
+    plan_chunk_ctx,
+    plan_prompt,
+    resolve_num_ctx,
+)
+
+logger = setup_logger("SUMMARIZATION")
+
+MAP_INSTRUCTION = (
+    "【说明】以下只是一段较长转录文本的第{index}/{total}部分。请按照上述要求只归纳这一部分,"
+    "完整保留其中的关键事实、决策、行动项目、人名、时间和数字, 不要推测其他部分的内容。\n"
+)
+REDUCE_INSTRUCTION = (
+    "【说明】以下是同一段转录文本按先后顺序分段归纳得到的{count}份部分结果。"
+    "请将它们合并为一份完整的结果: 去除重复内容, 保持时间顺序, 并严格按照上述格式输出。\n"
+)
+PARTIAL_HEADER = "【第{index}部分】\n"
+ROLLING_FOLD_INSTRUCTION = (
+    "【说明】【已有结果】是同一段转录文本此前部分的归纳结果, 【新增转录】是紧接其后的新内容。"
+    "请将新增内容并入已有结果: 保留已有结果中的关键事实、决策和行动项目, 补充或更新新增的信息,"
+    "保持时间顺序, 并严格按照上述格式输出一份完整的结果。\n"
+)
+ROLLING_COMPACT_INSTRUCTION = (
+    "【说明】以下是一段持续增长的转录文本目前的归纳结果。请在不改变格式的前提下将其压缩到约{target}字以内:"
+    "合并重复内容, 删除次要细节, 完整保留决策、行动项目、负责人、时间和数字。\n"
+)
+EXISTING_HEADER = "【已有结果】\n"
+NEW_TEXT_HEADER = "【新增转录】\n"
+# The running summary may use this share of a chunk; past it (or every few folds
+# once it is over half of that) it is compacted so the state stays bounded.
+ROLLING_SUMMARY_SHARE = 0.35
+ROLLING_COMPACT_EVERY = 8
+
+
+def _build_map_body(chunk: str, index: int, total: int) -> str:
+    return MAP_INSTRUCTION.format(index=index, total=total) + chunk
+
+
+def _build_reduce_body(partials: list[str]) -> str:
+    body = "\n\n".join(
+        PARTIAL_HEADER.format(index=i + 1) + partial for i, partial in enumerate(partials)
+    )
+    return REDUCE_INSTRUCTION.format(count=len(partials)) + body
+
+
+def _build_fold_body(summary: str, new_text: str) -> str:
+    if not summary:
+        return new_text
+    return ROLLING_FOLD_INSTRUCTION + EXISTING_HEADER + summary + "\n\n" + NEW_TEXT_HEADER + new_text
+
+
+def _build_compact_body(summary: str, target_chars: int) -> str:
+    return ROLLING_COMPACT_INSTRUCTION.format(target=target_chars) + summary
+
+
+async def _complete_planned(
+    template: str,
+    body: str,
+    use_cache: bool,
+    parser: ThinkTagStreamParser,
+    expected_output_tokens: int = None,
+    job_num_ctx: int = None,
+) -> str:
+    """使用任务的num_ctx (该请求放不下时取更大的值) 调用模型, 输出逐块送入parser, 返回原始输出。"""
+    if expected_output_tokens is None:
+        expected_output_tokens = expected_summary_tokens(count_tokens(body))
+    plan = await asyncio.to_thread(plan_prompt, template, body, expected_output_tokens)
+    output = await acomplete_text(
+        body, resolve_num_ctx(job_num_ctx, plan), use_cache, on_chunk=parser.feed, system=template
+    )
+    parser.finish()
+    return output
+
+
+def _group_partials(partials: list[str], max_chars: int) -> list[list[str]]:
+    """按字符预算将部分结果分组, 每组至少两份, 保证每一轮归并都能减少结果数量。"""
+    groups, current, current_chars = [], [], 0
+    for partial in partials:
+        if len(current) >= 2 and current_chars + len(partial) > max_chars:
+            groups.append(current)
+            current, current_chars = [], 0
+        current.append(partial)
+        current_chars += len(partial)
+    if current:
+        if len(current) == 1 and groups:
+            groups[-1].extend(current)
+        else:
+            groups.append(current)
+    return groups
+
+
+def summarize_text(
+    text: str,
+    prompt_template: str,
+    chunk_chars: int = None,
+    max_concurrency: int = None,
+    progress_callback=None,
+    use_cache: bool = True,
+    live_callback=None,
+    num_ctx: int = None,
+) -> tuple[str, str, dict]:
+    """
+    使用map-reduce方式归纳可能超出模型上下文的长文本。
+
+    预估的提示与输出能放入模型上下文时直接调用一次模型; 否则在说话人段落边界处分块,
+    并发归纳各块 (map), 再按同一模板逐层合并部分结果 (reduce), 直到得到一份结果。
+
+    :param text: str, 待归纳文本.
+    :param prompt_template: str, 归纳模板 (summary_prompt 或 meeting_minutes_prompt).
+    :param chunk_chars: int, 每块最大字符数, 为None时使用当前后端的配置.
+    :param max_concurrency: int, 并发请求数, 为None时使用当前后端的配置.
+    :param progress_callback: callable, 以 (阶段说明, 请求数) 调用, 用于界面展示进度.
+    :param use_cache: bool, 为False时所有请求绕过模型输出缓存.
+    :param live_callback: callable, 生成过程中以当前阶段已生成的正文定期调用,
+                          在调用线程中执行, 可直接更新界面.
+    :param num_ctx: int, 本次所有请求使用的Ollama上下文大小, 为None时按最大一块确定 (见 plan_job_ctx).
+    :return: tuple[str, str, dict], (归纳结果, 各次调用中提取的思考内容, 统计信息).
+             统计信息包含 requests、first_visible_seconds (自开始至出现第一个可见字的秒数)
+             与 total_seconds.
+    """
+    configured_chunk_chars, configured_concurrency = get_llm_chunk_settings()
+    chunk_chars = chunk_chars or configured_chunk_chars
+    max_concurrency = max_concurrency or configured_concurrency
+    thoughts = []
+    job_start = time.perf_counter()
+    stats = {"requests": 0, "first_visible_seconds": None, "total_seconds": 0.0}
+
+    def run_stage(label: str, bodies: list[str]) -> list[str]:
+        if progress_callback:
+            progress_callback(label, len(bodies))
+        parsers = [ThinkTagStreamParser() for _ in bodies]
+
+        def render_live():
+            live_callback(
+                "\n\n".join(p.answer.strip() for p in parsers if p.answer.strip())
+            )
+
+        run_concurrently(
+            lambda index: _complete_planned(
+                prompt_template, bodies[index], use_cache, parsers[index], job_num_ctx=job_num_ctx
+            ),
+            list(range(len(bodies))),
+            max_concurrency,
+            poll_callback=render_live if live_callback else None,
+        )
+        stats["requests"] += len(bodies)
+        visible_times = [p.first_visible_at for p in parsers if p.first_visible_at is not None]
+        if visible_times and stats["first_visible_seconds"] is None:
+            stats["first_visible_seconds"] = round(min(visible_times) - job_start, 2)
+
+        outputs = []
+        for parser in parsers:
+            cleaned, thought = parser.get_results()
+            outputs.append(cleaned)
+            if thought:
+                thoughts.append(thought)
+        return outputs
+
+    def finish(summary: str) -> tuple[str, str, dict]:
+        stats["total_seconds"] = round(time.perf_counter() - job_start, 2)
+        if live_callback:
+            live_callback(summary)
+        return summary, "\n\n---\n\n".join(thoughts), stats
+
+    plan = plan_prompt(prompt_template, text, expected_summary_tokens(count_tokens(text)))
+    if not plan["needs_chunking"]:
+        job_num_ctx = num_ctx or plan["num_ctx"]
+        return finish(run_stage("归纳全文", [text])[0])
+
+    chunk_chars = fit_chunk_chars(prompt_template, text, chunk_chars, expected_summary_tokens)
+    # Map and reduce bodies are both capped at chunk_chars, so one context covers every request
+    job_num_ctx = num_ctx or plan_chunk_ctx(prompt_template, chunk_chars, expected_summary_tokens)
+    chunks = chunk_by_turns(text, chunk_chars)
+    logger.info(
+        f"Map-reduce summarisation: ~{plan['prompt_tokens']} prompt tokens exceed the "
+        f"{plan['context_limit']} token context, {len(chunks)} chunks, concurrency {max_concurrency}"
+    )
+    partials = run_stage(
+        f"分段归纳 ({len(chunks)} 段)",
+        [_build_map_body(chunk, i + 1, len(chunks)) for i, chunk in enumerate(chunks)],
+    )
+
+    level = 1
+    while len(partials) > 1:
+        groups = _group_partials(partials, chunk_chars)
+        partials = run_stage(
+            f"合并第{level}轮 ({len(groups)} 组)",
+            [_build_reduce_body(group) for group in groups],
+        )
+        level += 1
+
+    return finish(partials[0])
+
+
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def new_rolling_state(prompt_template: str) -> dict:
+    """
+    创建空的滚动归纳状态。状态只包含字符串与数字, 可以保存在session_state或JSON文件中。
+
+    :param prompt_template: str, 归纳模板 (summary_prompt 或 meeting_minutes_prompt).
+    :return: dict, 包含 template_hash、summary (当前结果)、source_chars 与 source_hash
+             (已并入的转录文本长度与哈希)、folds、folds_since_compaction 与 compactions.
+    """
+    return {
+        "template_hash": _hash_text(prompt_template),
+        "summary": "",
+        "source_chars": 0,
+        "source_hash": _hash_text(""),
+        "folds": 0,
+        "folds_since_compaction": 0,
+        "compactions": 0,
+    }
+
+
+def get_new_text(state: dict, full_text: str, prompt_template: str):
+    """
+    对持续增长的转录文本, 取出尚未并入滚动归纳的新增部分。
+
+    :param state: dict, 滚动归纳状态 (new_rolling_state).
+    :param full_text: str, 目前完整的转录文本.
+    :param prompt_template: str, 归纳模板.
+    :return: str 或 None, 新增文本; 模板已更换或已并入的部分被修改过时返回None (需重新开始).
+    """
+    if state.get("template_hash") != _hash_text(prompt_template):
+        return None
+    consumed = state.get("source_chars", 0)
+    if len(full_text) < consumed or _hash_text(full_text[:consumed]) != state.get("source_hash"):
+        return None
+    return full_text[consumed:]
+
+
+def update_rolling_summary(
+    state: dict,
+    full_text: str,
+    prompt_template: str,
+    chunk_chars: int = None,
+    use_cache: bool = True,
+    live_callback=None,
+    num_ctx: int = None,
+) -> tuple[dict, str, dict]:
+    """
+    将持续增长的转录文本中尚未处理的新增部分并入滚动归纳结果, 每次更新的开销与新增文本长度成正比。
+    模板已更换或已处理的部分被修改过时, 从空状态重新开始归纳全文。
+
+    新增文本在说话人段落边界处分块, 每块与当前结果一起发送, 由模型按同一模板输出更新后的完整结果;
+    结果超过分块大小的一定比例 (或已连续并入多次) 时按同一格式压缩, 使状态大小保持有界。
+    输出格式与 summarize_text 相同。
+
+    :param state: dict, 滚动归纳状态 (new_rolling_state), 为None时从空状态开始; 不会被修改.
+    :param full_text: str, 目前完整的转录文本 (此前处理过的文本加上新增部分).
+    :param prompt_template: str, 归纳模板.
+    :param chunk_chars: int, 每块最大字符数, 为None时使用当前后端的配置.
+    :param use_cache: bool, 为False时所有请求绕过模型输出缓存.
+    :param live_callback: callable, 生成过程中以当前请求已生成的正文定期调用, 在调用线程中执行.
+    :param num_ctx: int, 本次所有请求使用的Ollama上下文大小, 为None时按一整块估算 (见 plan_chunk_ctx).
+    :return: tuple[dict, str, dict], (新的状态, 思考内容, 统计信息).
+             统计信息包含 requests、new_chars、restarted (已有状态是否因失效而重新开始)、folds、compactions、
+             first_visible_seconds 与 total_seconds.
+    :raises LLMRequestError: 如果模型请求失败 (此时不返回部分更新的状态).
+    """
+    chunk_chars = chunk_chars or get_llm_chunk_settings()[0]
+    max_summary_chars = int(chunk_chars * ROLLING_SUMMARY_SHARE)
+    # A fold sends the summary plus new text (about one chunk) and rewrites the whole summary
+    summary_tokens_cap = count_tokens("字" * max_summary_chars)
+    job_num_ctx = num_ctx or plan_chunk_ctx(
+        prompt_template, chunk_chars, lambda tokens: summary_tokens_cap + expected_summary_tokens(tokens)
+    )
+    new_text = get_new_text(state, full_text, prompt_template) if state else None
+    restarted = bool(state) and new_text is None
+    if new_text is None:
+        state, new_text = new_rolling_state(prompt_template), full_text
+    state = dict(state)
+    thoughts = []
+    job_start = time.perf_counter()
+    stats = {
+        "requests": 0,
+        "new_chars": len(new_text),
+        "restarted": restarted,
+        "folds": 0,
+        "compactions": 0,
+        "first_visible_seconds": None,
+        "total_seconds": 0.0,
+    }
+
+    def run_request(body: str, expected_output_tokens: int) -> str:
+        parser = ThinkTagStreamParser()
+        run_concurrently(
+            lambda _: _complete_planned(
+                prompt_template, body, use_cache, parser, expected_output_tokens, job_num_ctx
+            ),
+            [0],
+            1,
+            poll_callback=(lambda: live_callback(parser.answer.strip())) if live_callback else None,
+        )
+        stats["requests"] += 1
+        if parser.first_visible_at is not None and stats["first_visible_seconds"] is None:
+            stats["first_visible_seconds"] = round(parser.first_visible_at - job_start, 2)
+        cleaned, thought = parser.get_results()
+        if thought:
+            thoughts.append(thought)
+        return cleaned.strip()
+
+    def compact():
+        target_chars = max_summary_chars // 2
+        state["summary"] = run_request(
+            _build_compact_body(state["summary"], target_chars),
+            count_tokens(state["summary"][:target_chars]) + 64,
+        )
+        state["folds_since_compaction"] = 0
+        state["compactions"] += 1
+        stats["compactions"] += 1
+
+    if new_text.strip():
+        fold_chars = fit_chunk_chars(
+            prompt_template, new_text, max(chunk_chars - max_summary_chars, 200), expected_summary_tokens
+        )
+        for chunk in chunk_by_turns(new_text, fold_chars):
+            summary_tokens = count_tokens(state["summary"])
+            state["summary"] = run_request(
+                _build_fold_body(state["summary"], chunk),
+                summary_tokens + expected_summary_tokens(count_tokens(chunk)),
+            )
+            state["folds"] += 1
+            state["folds_since_compaction"] += 1
+            stats["folds"] += 1
+            if len(state["summary"]) > max_summary_chars or (
+                state["folds_since_compaction"] >= ROLLING_COMPACT_EVERY
+                and len(state["summary"]) > max_summary_chars // 2
+            ):
+                compact()
+
+    # The consumed prefix is tracked by hash so later updates can detect edits to it
+    state["source_chars"] = len(full_text)
+    state["source_hash"] = _hash_text(full_text)
+    stats["total_seconds"] = round(time.perf_counter() - job_start, 2)
+    logger.info(
+        f"Rolling summary: folded {len(new_text)} new chars in {stats['folds']} folds, "
+        f"{stats['compactions']} compactions, summary now {len(state['summary'])} chars"
+    )
+    if live_callback:
+        live_callback(state["summary"])
+    return state, "\n\n---\n\n".join(thoughts), stats
@@ -0,0 +1,111 @@
+import re
+
+# Speaker blocks produced by organize_recognition_results: "说话人N: ..."
+SPEAKER_TURN_PATTERN = re.compile(r"^说话人\d+\s*[:：]", re.MULTILINE)
+SENTENCE_END_PATTERN = re.compile(r"(?<=[。！？!?；;…])")
+TURN_SEPARATOR = "\n\n"
+
+
+def split_speaker_turns(text: str) -> list[str]:
+    """
+    将转录文本按说话人段落切分。
+
+    没有说话人标记时按空行切分, 仍只有一段时按行切分。
+
+    :param text: str, 转录文本.
+    :return: list[str], 去除首尾空白后的段落列表 (不含空段落).
+    """
+    if not text or not text.strip():
+        return []
+
+    starts = [match.start() for match in SPEAKER_TURN_PATTERN.finditer(text)]
+    if starts:
+        if starts[0] != 0:
+            starts.insert(0, 0)  # Keep any preamble before the first speaker
+        pieces = [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)])]
+    else:
+        pieces = re.split(r"\n\s*\n", text)
+        if len(pieces) == 1:
+            pieces = text.splitlines()
+    return [piece.strip() for piece in pieces if piece.strip()]
+
+
+def _split_oversized_turn(turn: str, max_chars: int) -> list[str]:
+    """将超过max_chars的段落按句末标点拆开, 单句仍过长时按长度硬切。"""
+    pieces, current = [], ""
+    for sentence in SENTENCE_END_PATTERN.split(turn):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + len(sentence) > max_chars:
+            pieces.append(current)
+            current = ""
+        current += sentence
+    if current:
+        pieces.append(current)
+    return [piece.strip() for piece in pieces if piece.strip()]
+
+
+def _match_anchor(pieces: list[str], start: int, anchors) -> int:
+    """返回从start开始恰好组成某个已知块的段落数 (取最长的匹配), 没有匹配时返回0。"""
+    best = 0
+    for anchor in anchors:
+        if not anchor.startswith(pieces[start]):
+            continue
+        joined = pieces[start]
+        end = start + 1
+        while len(joined) < len(anchor) and end < len(pieces):
+            joined += TURN_SEPARATOR + pieces[end]
+            end += 1
+        if joined == anchor:
+            best = max(best, end - start)
+    return best
+
+
+def chunk_by_turns(text: str, max_chars: int, anchors=None) -> list[str]:
+    """
+    在说话人段落边界处将文本打包成不超过max_chars字符的块。
+
+    单个段落超过上限时才在段落内部按句子拆分。块内段落以空行连接,
+    因此 TURN_SEPARATOR.join(chunks) 可还原出原文的段落结构。
+
+    提供anchors (上次分块得到的块) 时, 某位置起的段落恰好组成一个已知块就直接沿用,
+    使文本局部修改后, 未修改部分的分块边界与上次一致.
+
+    :param text: str, 转录文本.
+    :param max_chars: int, 每块的最大字符数.
+    :param anchors: iterable[str], 已知块, 为None时按长度打包.
+    :return: list[str], 文本块列表.
+    """
+    pieces = []
+    for turn in split_speaker_turns(text):
+        pieces.extend([turn] if len(turn) <= max_chars else _split_oversized_turn(turn, max_chars))
+    anchors = [anchor for anchor in anchors or () if anchor and len(anchor) <= max_chars]
+
+    chunks, current = [], []
+    current_chars = 0
+    index = 0
+    while index < len(pieces):
+        anchored = _match_anchor(pieces, index, anchors) if anchors else 0
+        if anchored:
+            if current:
+                chunks.append(TURN_SEPARATOR.join(current))
+                current, current_chars = [], 0
+            chunks.append(TURN_SEPARATOR.join(pieces[index : index + anchored]))
+            index += anchored
+            continue
+        piece = pieces[index]
+        added_chars = len(piece) + (len(TURN_SEPARATOR) if current else 0)
+        if current and current_chars + added_chars > max_chars:
+            chunks.append(TURN_SEPARATOR.join(current))
+            current, current_chars = [], 0
+            added_chars = len(piece)
+        current.append(piece)
+        current_chars += added_chars
+        index += 1
+    if current:
+        chunks.append(TURN_SEPARATOR.join(current))
+    return chunks
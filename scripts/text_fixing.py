@@ -0,0 +1,418 @@
+import sys
+import os
+import json
+import time
+import asyncio
+import hashlib
+import difflib
+import threading
+from collections import OrderedDict
+
+# Ensure the project root is in sys.path for consistent imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils import setup_logger, ThinkTagStreamParser
+from scripts.text_chunking import TURN_SEPARATOR, chunk_by_turns, split_speaker_turns
+from scripts.llm_scripts import (
+    acomplete_text,
+    get_llm_chunk_settings,
+    get_llm_model_identity,
+    run_concurrently,
+)
+from scripts.token_budget import (
+    count_tokens,
+    expected_edit_tokens,
+    expected_rewrite_tokens,
+    fit_chunk_chars,
+    plan_job_ctx,
+    plan_prompt,
+    resolve_num_ctx,
+)
+
+logger = setup_logger("TEXT_FIXING")
+
+DEFAULT_OVERLAP_CHARS = 300
+CONTEXT_HEADER = "【上文 (仅供理解语境, 请勿修正或输出)】\n"
+BODY_HEADER = "【待修正文本】\n"
+
+FIX_MODE_REWRITE = "rewrite"  # The model outputs the whole fixed text
+FIX_MODE_EDITS = "edits"  # The model outputs only (original, replacement) pairs
+FIX_MODES = [FIX_MODE_REWRITE, FIX_MODE_EDITS]
+EDIT_LIST_INSTRUCTION = (
+    "\n\n【输出格式】不要输出修正后的全文, 只输出需要修改的地方。"
+    "输出一个JSON数组, 每一项为 [原文片段, 修改后片段]: 原文片段必须从【待修正文本】中逐字复制,"
+    "长度足以在文中唯一定位 (通常8到30个字), 各项按在文中出现的顺序排列; 无需修改时输出 []。"
+    '除JSON数组外不要输出其他内容。示例: [["今天天汽很好", "今天天气很好"], ["在三楼会以室开会", "在三楼会议室开会"]]'
+)
+EDIT_FUZZY_THRESHOLD = 0.85
+FIX_MEMO_MAX_ENTRIES = 512
+
+# Fixed chunks from earlier runs in this process, keyed by chunk content hash
+# within a (template, model, fix mode) scope; least recently used first.
+_fix_memo = OrderedDict()
+_fix_memo_lock = threading.Lock()
+
+
+def _memo_scope(prompt_template: str, fix_mode: str) -> str:
+    scope_material = json.dumps(
+        [prompt_template, get_llm_model_identity(), fix_mode], ensure_ascii=False
+    )
+    return hashlib.sha256(scope_material.encode("utf-8")).hexdigest()
+
+
+def _memo_key(scope: str, chunk: str) -> str:
+    return hashlib.sha256((scope + chunk).encode("utf-8")).hexdigest()
+
+
+def _memo_get(key: str):
+    with _fix_memo_lock:
+        entry = _fix_memo.get(key)
+        if entry is not None:
+            _fix_memo.move_to_end(key)
+        return entry
+
+
+def _memo_put(key: str, scope: str, chunk: str, text: str, thoughts: str, mode: str):
+    with _fix_memo_lock:
+        _fix_memo[key] = {"scope": scope, "chunk": chunk, "text": text, "thoughts": thoughts, "mode": mode}
+        _fix_memo.move_to_end(key)
+        while len(_fix_memo) > FIX_MEMO_MAX_ENTRIES:
+            _fix_memo.popitem(last=False)
+
+
+def _memo_anchors(scope: str) -> list[str]:
+    with _fix_memo_lock:
+        return [entry["chunk"] for entry in _fix_memo.values() if entry["scope"] == scope]
+
+
+def clear_fix_memo():
+    """清空分块修正结果的记忆 (下次修正时所有块都重新生成)。"""
+    with _fix_memo_lock:
+        _fix_memo.clear()
+
+
+def _tail_overlap(previous_chunk: str, overlap_chars: int) -> str:
+    """取上一块末尾的段落作为语境, 过长时只保留末尾overlap_chars个字符。"""
+    last_turn = split_speaker_turns(previous_chunk)[-1]
+    return last_turn[-overlap_chars:]
+
+
+def _build_fix_body(chunk: str, context: str) -> str:
+    if not context:
+        return chunk
+    return CONTEXT_HEADER + context + "\n" + BODY_HEADER + chunk
+
+
+def _build_edit_body(chunk: str, context: str) -> str:
+    context_part = CONTEXT_HEADER + context + "\n" if context else ""
+    return context_part + BODY_HEADER + chunk
+
+
+def parse_edit_list(output: str):
+    """
+    解析模型输出的修改列表 (允许包含代码块标记等多余文字)。
+
+    :param output: str, 去除思考内容后的模型输出.
+    :return: list[tuple[str, str]] 或 None, [(原文片段, 修改后片段), ...]; 无法解析时返回None.
+    """
+    start, end = output.find("["), output.rfind("]")
+    if start < 0 or end < start:
+        return None
+    try:
+        items = json.loads(output[start : end + 1])
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(items, list):
+        return None
+    edits = []
+    for item in items:
+        if not (isinstance(item, list) and len(item) == 2 and all(isinstance(x, str) for x in item)):
+            return None
+        edits.append((item[0], item[1]))
+    return edits
+
+
+def _anchor_edit(text: str, original: str, cursor: int):
+    """在文本中定位原文片段: 优先从cursor之后精确匹配, 其次全文精确匹配, 最后按相似度模糊匹配。"""
+    position = text.find(original, cursor)
+    if position < 0:
+        position = text.find(original)
+    if position >= 0:
+        return position, position + len(original)
+
+    matcher = difflib.SequenceMatcher(None, text, original, autojunk=False)
+    match = matcher.find_longest_match(0, len(text), 0, len(original))
+    if match.size == 0:
+        return None
+    best_span, best_ratio = None, 0.0
+    start = max(0, match.a - match.b)
+    for length_delta in (-2, -1, 0, 1, 2):
+        end = min(len(text), start + len(original) + length_delta)
+        ratio = difflib.SequenceMatcher(None, text[start:end], original, autojunk=False).ratio()
+        if ratio > best_ratio:
+            best_span, best_ratio = (start, end), ratio
+    return best_span if best_ratio >= EDIT_FUZZY_THRESHOLD else None
+
+
+def apply_edits(text: str, edits: list[tuple[str, str]]):
+    """
+    将修改列表应用到文本上。任一修改无法定位或修改之间相互重叠时返回None (调用方应改用全文改写)。
+
+    :param text: str, 原文.
+    :param edits: list[tuple[str, str]], [(原文片段, 修改后片段), ...].
+    :return: str 或 None, 修改后的文本.
+    """
+    spans, cursor = [], 0
+    for original, replacement in edits:
+        if not original:
+            return None
+        if original == replacement:
+            continue
+        span = _anchor_edit(text, original, cursor)
+        if span is None:
+            return None
+        spans.append((span, replacement))
+        cursor = span[1]
+
+    spans.sort()
+    for (previous_span, _), (next_span, _) in zip(spans, spans[1:]):
+        if next_span[0] < previous_span[1]:
+            return None
+
+    pieces, position = [], 0
+    for (start, end), replacement in spans:
+        pieces.append(text[position:start])
+        pieces.append(replacement)
+        position = end
+    pieces.append(text[position:])
+    return "".join(pieces)
+
+
+def _strip_overlap(fixed_chunk: str, context: str) -> str:
+    """
+    去除模型仍然输出的语境部分。只去除与语境完全相同的回显 (含说话人标记),
+    内容相似的段落可能是真实的段落 (如两人都说"好的。"), 一律保留。
+    """
+    fixed_chunk = fixed_chunk.strip()
+    if not context:
+        return fixed_chunk
+
+    if BODY_HEADER.strip() in fixed_chunk:
+        # Model echoed both blocks; keep what follows the body marker
+        return fixed_chunk.split(BODY_HEADER.strip(), 1)[1].strip()
+    if fixed_chunk.startswith(CONTEXT_HEADER.strip()):
+        fixed_chunk = fixed_chunk[len(CONTEXT_HEADER.strip()):].lstrip()
+
+    turns = split_speaker_turns(fixed_chunk)
+    if len(turns) > 1 and turns[0] == context.strip():
+        turns = turns[1:]
+    return TURN_SEPARATOR.join(turns)
+
+
+def fix_text_chunked(
+    text: str,
+    prompt_template: str,
+    chunk_chars: int = None,
+    max_concurrency: int = None,
+    overlap_chars: int = DEFAULT_OVERLAP_CHARS,
+    use_cache: bool = True,
+    live_callback=None,
+    fix_mode: str = FIX_MODE_REWRITE,
+    num_ctx: int = None,
+) -> tuple[str, str, list[dict]]:
+    """
+    分块并发修正转录文本, 再按原顺序拼接。
+
+    文本超过分块大小或预估超出模型上下文时, 在说话人段落边界处分块 (块大小按token预算收紧),
+    每块附带上一块末尾的一小段作为语境 (不要求修正),
+    拼接时去除模型重复输出的语境部分。支持Ollama与OpenAI兼容两种后端。
+
+    修改列表模式 (FIX_MODE_EDITS) 下模型只输出 [原文片段, 修改后片段] 列表并在本地应用,
+    输出token数与修改量而非文本长度成正比; 某块的列表无法解析或定位时, 该块改用全文改写。
+
+    每块的修正结果按 块内容+模板+模型+修正方式 记忆在本进程中; 修改部分文本后再次修正时,
+    分块边界尽量沿用上次的结果, 只有内容变化的块会重新请求模型, 其余块直接复用。
+
+    :param text: str, 待修正文本.
+    :param prompt_template: str, 修正模板 (fix_typo_prompt).
+    :param chunk_chars: int, 每块最大字符数, 为None时使用当前后端的配置.
+    :param max_concurrency: int, 并发请求数, 为None时使用当前后端的配置.
+    :param overlap_chars: int, 作为语境附带的上一块末尾字符数, 为0时不附带.
+    :param use_cache: bool, 为False时所有请求绕过模型输出缓存, 且不复用已记忆的分块结果.
+    :param live_callback: callable, 生成过程中以目前已生成的正文 (按块顺序拼接) 定期调用,
+                          在调用线程中执行, 可直接更新界面.
+    :param fix_mode: str, FIX_MODE_REWRITE (全文改写) 或 FIX_MODE_EDITS (修改列表).
+    :param num_ctx: int, 本次所有请求使用的Ollama上下文大小, 为None时按最大一块确定 (见 plan_job_ctx).
+    :return: tuple[str, str, list[dict]], (修正后的文本, 思考内容, 每块的统计信息).
+             统计信息包含 index、chars、seconds、first_visible_seconds
+             (自开始至该块出现第一个可见字的秒数, 无输出时为None)、output_tokens (该块模型输出的token数)
+             、mode (rewrite、edits 或 edits_fallback) 与 reused (是否复用了上次的结果).
+    """
+    configured_chunk_chars, configured_concurrency = get_llm_chunk_settings()
+    chunk_chars = chunk_chars or configured_chunk_chars
+    max_concurrency = max_concurrency or configured_concurrency
+
+    memo_scope = _memo_scope(prompt_template, fix_mode)
+    plan = plan_prompt(prompt_template, text, expected_rewrite_tokens(count_tokens(text)))
+    if plan["needs_chunking"] or len(text) > chunk_chars:
+        chunk_chars = fit_chunk_chars(prompt_template, text, chunk_chars, expected_rewrite_tokens)
+        chunks = chunk_by_turns(text, chunk_chars, anchors=_memo_anchors(memo_scope) if use_cache else None)
+    else:
+        chunks = [text]
+    contexts = [""] + [
+        _tail_overlap(previous, overlap_chars) if overlap_chars > 0 else ""
+        for previous in chunks[:-1]
+    ]
+
+    # One num_ctx for every request of the job (rewrite, edit list and fallback alike),
+    # sized for a full rewrite of the largest chunk, so Ollama never reloads mid-job
+    job_num_ctx = num_ctx or plan_job_ctx(
+        prompt_template,
+        [context + chunk for context, chunk in zip(contexts, chunks)],
+        expected_rewrite_tokens,
+    )
+
+    parsers = [ThinkTagStreamParser() for _ in chunks]
+    finished_texts = [None] * len(chunks)
+    job_start = time.perf_counter()
+
+    async def rewrite_chunk(index: int) -> str:
+        # plan_prompt reads config.ini and may persist template token counts, so it runs off the loop
+        chunk_plan = await asyncio.to_thread(
+            plan_prompt,
+            prompt_template,
+            contexts[index] + chunks[index],
+            expected_rewrite_tokens(count_tokens(chunks[index])),
+        )
+        output = await acomplete_text(
+            _build_fix_body(chunks[index], contexts[index]),
+            resolve_num_ctx(job_num_ctx, chunk_plan),
+            use_cache,
+            on_chunk=parsers[index].feed,
+            system=prompt_template,
+        )
+        parsers[index].finish()
+        return output
+
+    async def edit_chunk(index: int):
+        edit_template = prompt_template + EDIT_LIST_INSTRUCTION
+        edit_parser = ThinkTagStreamParser()
+        chunk_plan = await asyncio.to_thread(
+            plan_prompt,
+            edit_template,
+            contexts[index] + chunks[index],
+            expected_edit_tokens(count_tokens(chunks[index])),
+        )
+        output = await acomplete_text(
+            _build_edit_body(chunks[index], contexts[index]),
+            resolve_num_ctx(job_num_ctx, chunk_plan),
+            use_cache,
+            on_chunk=edit_parser.feed,
+            system=edit_template,
+        )
+        edit_parser.finish()
+        cleaned, thoughts = edit_parser.get_results()
+        edits = parse_edit_list(cleaned)
+        fixed = apply_edits(chunks[index], edits) if edits is not None else None
+        return output, fixed, thoughts
+
+    async def fix_one(index: int) -> dict:
+        start = time.perf_counter()
+        memo_key = _memo_key(memo_scope, chunks[index])
+        memo_entry = _memo_get(memo_key) if use_cache else None
+        if memo_entry is not None:
+            finished_texts[index] = memo_entry["text"]
+            return {
+                "index": index,
+                "chars": len(chunks[index]),
+                "seconds": time.perf_counter() - start,
+                "first_visible_seconds": time.perf_counter() - job_start,
+                "output_tokens": 0,
+                "mode": memo_entry["mode"],
+                "reused": True,
+                "text": memo_entry["text"],
+                "thoughts": memo_entry["thoughts"],
+            }
+
+        mode, output_tokens, first_visible_at = FIX_MODE_REWRITE, 0, None
+        text, thoughts = None, ""
+        if fix_mode == FIX_MODE_EDITS:
+            output, fixed, thoughts = await edit_chunk(index)
+            output_tokens += count_tokens(output)
+            if fixed is not None:
+                mode, text = FIX_MODE_EDITS, fixed
+                first_visible_at = time.perf_counter()
+                finished_texts[index] = fixed
+            else:
+                mode = "edits_fallback"
+                logger.info(f"Edit list for chunk {index + 1} could not be applied, rewriting it")
+        if text is None:
+            output_tokens += count_tokens(await rewrite_chunk(index))
+            cleaned, thoughts = parsers[index].get_results()
+            first_visible_at = parsers[index].first_visible_at
+            text = _strip_overlap(cleaned, contexts[index])
+        # A failed request raises LLMRequestError before reaching here, so only real fixes are memoised.
+        # The text is memoised after _strip_overlap, which only removes an exact echo of the context.
+        if text:
+            _memo_put(memo_key, memo_scope, chunks[index], text, thoughts, mode)
+        return {
+            "index": index,
+            "chars": len(chunks[index]),
+            "seconds": time.perf_counter() - start,
+            "first_visible_seconds": (
+                first_visible_at - job_start if first_visible_at is not None else None
+            ),
+            "output_tokens": output_tokens,
+            "mode": mode,
+            "reused": False,
+            "text": text,
+            "thoughts": thoughts,
+        }
+
+    def render_live():
+        # Chunks still streaming are shown in order as they grow; in edit-list mode a
+        # chunk shows its original text until its edits have been applied
+        live_texts = []
+        for index, parser in enumerate(parsers):
+            if finished_texts[index] is not None:
+                live_texts.append(finished_texts[index])
+            elif parser.answer.strip():
+                live_texts.append(parser.answer.strip())
+            elif fix_mode == FIX_MODE_EDITS:
+                live_texts.append(chunks[index])
+        live_callback(TURN_SEPARATOR.join(live_texts))
+
+    results = run_concurrently(
+        fix_one,
+        list(range(len(chunks))),
+        max_concurrency,
+        poll_callback=render_live if live_callback else None,
+    )
+    logger.info(
+        f"Fixed {len(text)} chars in {len(chunks)} chunks in {time.perf_counter() - job_start:.1f}s "
+        f"(concurrency {max_concurrency}, mode {fix_mode}, "
+        f"{sum(1 for result in results if result['reused'])} reused, "
+        f"{sum(result['output_tokens'] for result in results)} output tokens)"
+    )
+
+    fixed_text = TURN_SEPARATOR.join(result["text"] for result in results if result["text"])
+    thoughts = "\n\n---\n\n".join(result["thoughts"] for result in results if result["thoughts"])
+    chunk_stats = [
+        {
+            "index": result["index"],
+            "chars": result["chars"],
+            "seconds": round(result["seconds"], 2),
+            "first_visible_seconds": (
+                round(result["first_visible_seconds"], 2)
+                if result["first_visible_seconds"] is not None
+                else None
+            ),
+            "output_tokens": result["output_tokens"],
+            "mode": result["mode"],
+            "reused": result["reused"],
+        }
+        for result in results
+    ]
+    if live_callback:
+        live_callback(fixed_text)
+    return fixed_text, thoughts, chunk_stats
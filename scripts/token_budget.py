@@ -0,0 +1,297 @@
+import sys
+import os
+import re
+import json
+import hashlib
+import threading
+
+# Ensure the project root is in sys.path for consistent imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils import load_config_section, setup_logger
+
+logger = setup_logger("TOKEN_BUDGET")
+
+TOKEN_COUNT_CACHE_PATH = os.path.join("cache", "prompt_token_counts.json")
+HEURISTIC_COUNTER_NAME = "heuristic"
+
+# Heuristic rates, deliberately on the high side so plans err towards a
+# slightly larger context rather than silent truncation.
+CJK_TOKENS_PER_CHAR = 1.0
+LATIN_CHARS_PER_TOKEN = 4.0
+DIGITS_PER_TOKEN = 2.0
+
+# Ollama reloads the model whenever num_ctx changes, so plans snap to a few
+# power-of-two sizes instead of an exact value per request.
+OLLAMA_CTX_STEPS = (2048, 4096, 8192, 16384, 32768, 65536, 131072)
+DEFAULT_OLLAMA_MAX_CTX = 32768
+DEFAULT_OPENAI_CONTEXT_WINDOW = 32768
+CTX_SAFETY_MARGIN = 1.1
+MIN_CHUNK_CHARS = 200
+
+_CJK_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]")
+_LATIN_PATTERN = re.compile(r"[A-Za-z]+")
+_DIGIT_PATTERN = re.compile(r"\d+")
+_SPACE_PATTERN = re.compile(r"\s")
+
+_token_counter = None
+_token_counter_name = HEURISTIC_COUNTER_NAME
+_template_counts = None
+_template_counts_lock = threading.Lock()
+
+
+def estimate_tokens_heuristic(text: str) -> int:
+    """
+    不依赖分词器, 按字符类别快速估算token数量。
+
+    中日韩字符约每字一个token, 拉丁字母约每4个字符一个token,
+    数字约每2位一个token, 其余标点与符号每个一个token, 空白不计。
+
+    :param text: str, 文本.
+    :return: int, 估算的token数量.
+    """
+    if not text:
+        return 0
+    cjk_chars = len(_CJK_PATTERN.findall(text))
+    latin_chars = sum(len(word) for word in _LATIN_PATTERN.findall(text))
+    digit_chars = sum(len(number) for number in _DIGIT_PATTERN.findall(text))
+    space_chars = len(_SPACE_PATTERN.findall(text))
+    other_chars = len(text) - cjk_chars - latin_chars - digit_chars - space_chars
+    estimate = (
+        cjk_chars * CJK_TOKENS_PER_CHAR
+        + latin_chars / LATIN_CHARS_PER_TOKEN
+        + digit_chars / DIGITS_PER_TOKEN
+        + other_chars
+    )
+    return int(estimate) + 1
+
+
+def set_token_counter(counter, name: str):
+    """
+    注册精确的token计数函数 (例如所用模型的分词器), 替换启发式估算。
+
+    :param counter: callable, 接收文本并返回token数量; 为None时恢复启发式估算.
+    :param name: str, 计数器名称, 用于区分模板token数缓存.
+    """
+    global _token_counter, _token_counter_name
+    _token_counter = counter
+    _token_counter_name = name if counter else HEURISTIC_COUNTER_NAME
+    logger.info(f"Token counter set to '{_token_counter_name}'")
+
+
+def use_tiktoken_encoding(encoding_name: str = "cl100k_base"):
+    """
+    使用tiktoken编码作为精确计数器 (需要安装tiktoken, 适用于OpenAI系列模型)。
+
+    :param encoding_name: str, tiktoken编码名称.
+    :raises ImportError: 如果未安装tiktoken.
+    """
+    import tiktoken
+
+    encoding = tiktoken.get_encoding(encoding_name)
+    set_token_counter(lambda text: len(encoding.encode(text)), f"tiktoken:{encoding_name}")
+
+
+def count_tokens(text: str) -> int:
+    """
+    计算文本的token数量: 已注册精确计数器时使用之, 否则使用启发式估算。
+
+    :param text: str, 文本.
+    :return: int, token数量.
+    """
+    if _token_counter is not None:
+        try:
+            return int(_token_counter(text))
+        except Exception as e:
+            logger.warning(f"Token counter '{_token_counter_name}' failed, using heuristic: {e}")
+    return estimate_tokens_heuristic(text)
+
+
+def _load_template_counts() -> dict:
+    global _template_counts
+    if _template_counts is None:
+        try:
+            with open(TOKEN_COUNT_CACHE_PATH, "r", encoding="utf-8") as f:
+                _template_counts = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            _template_counts = {}
+    return _template_counts
+
+
+def count_template_tokens(template: str) -> int:
+    """
+    计算提示词模板的token数量, 结果按 (计数器, 模板内容哈希) 缓存到磁盘,
+    模板不变时重复运行不会重新计数。
+
+    :param template: str, 模板内容.
+    :return: int, token数量.
+    """
+    cache_key = f"{_token_counter_name}:{hashlib.sha1(template.encode('utf-8')).hexdigest()}"
+    with _template_counts_lock:
+        template_counts = _load_template_counts()
+        if cache_key in template_counts:
+            return template_counts[cache_key]
+
+    token_count = count_tokens(template)
+    with _template_counts_lock:
+        template_counts[cache_key] = token_count
+        try:
+            os.makedirs(os.path.dirname(TOKEN_COUNT_CACHE_PATH), exist_ok=True)
+            with open(TOKEN_COUNT_CACHE_PATH, "w", encoding="utf-8") as f:
+                json.dump(template_counts, f)
+        except OSError as e:
+            logger.warning(f"Failed to persist template token counts: {e}")
+    return token_count
+
+
+def get_context_limits(llm_mode: str) -> tuple[int, int, bool]:
+    """
+    读取当前后端的上下文限制。
+
+    :param llm_mode: str, "Ollama" 或 "OpenAI".
+    :return: tuple[int, int, bool], (最大上下文token数, 单次最大输出token数, 是否动态选择num_ctx).
+             Ollama的最大输出不设上限时为0.
+    """
+    if llm_mode == "Ollama":
+        ollama_config = load_config_section("OLLAMA")
+        configured_ctx = int(ollama_config.get("max_tokens", 4096))
+        max_ctx = int(ollama_config.get("max_ctx", max(DEFAULT_OLLAMA_MAX_CTX, configured_ctx)))
+        dynamic_ctx = ollama_config.getboolean("dynamic_ctx", fallback=True)
+        return (max_ctx if dynamic_ctx else configured_ctx), 0, dynamic_ctx
+
+    openai_config = load_config_section("OPENAI")
+    context_window = int(openai_config.get("context_window", DEFAULT_OPENAI_CONTEXT_WINDOW))
+    max_output = int(openai_config.get("max_tokens", 2560))
+    return context_window, max_output, False
+
+
+def _snap_ollama_ctx(required_tokens: int, max_ctx: int) -> int:
+    for step in OLLAMA_CTX_STEPS:
+        if step >= required_tokens:
+            return min(step, max_ctx)
+    return max_ctx
+
+
+def _needs_chunking(prompt_tokens: int, expected_output_tokens: int, limits: tuple) -> bool:
+    context_limit, max_output, _ = limits
+    required_tokens = int((prompt_tokens + expected_output_tokens) * CTX_SAFETY_MARGIN)
+    return required_tokens > context_limit or (
+        max_output > 0 and expected_output_tokens > max_output
+    )
+
+
+def plan_prompt(
+    template: str, text: str, expected_output_tokens: int, llm_mode: str = None
+) -> dict:
+    """
+    在发送前估算提示与输出所需的token数, 并确定上下文大小与是否需要分块。
+
+    :param template: str, 提示词模板 (token数会被缓存).
+    :param text: str, 拼接在模板之后的正文.
+    :param expected_output_tokens: int, 预计输出的token数.
+    :param llm_mode: str, LLM模式, 为None时使用当前配置的模式.
+    :return: dict, 包含 prompt_tokens、expected_output_tokens、required_tokens、
+             num_ctx (仅Ollama动态模式, 否则为None)、context_limit 与 needs_chunking.
+    """
+    if llm_mode is None:
+        llm_mode = load_config_section("SYSTEM").get("llm_mode", "Ollama")
+    limits = get_context_limits(llm_mode)
+    context_limit, _, dynamic_ctx = limits
+
+    prompt_tokens = count_template_tokens(template) + count_tokens(text) + 1
+    required_tokens = int((prompt_tokens + expected_output_tokens) * CTX_SAFETY_MARGIN)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "expected_output_tokens": expected_output_tokens,
+        "required_tokens": required_tokens,
+        "num_ctx": _snap_ollama_ctx(required_tokens, context_limit) if dynamic_ctx else None,
+        "context_limit": context_limit,
+        "needs_chunking": _needs_chunking(prompt_tokens, expected_output_tokens, limits),
+    }
+
+
+def plan_job_ctx(template: str, bodies: list[str], output_estimator, llm_mode: str = None):
+    """
+    为一次任务 (如一次修正或归纳) 的所有请求确定同一个num_ctx: 取最大一块的取整值。
+    Ollama在num_ctx变化时会重新加载模型, 同一任务内的请求使用同一个值才能保持模型常驻并复用提示缓存。
+
+    :param template: str, 提示词模板.
+    :param bodies: list[str], 各请求的正文.
+    :param output_estimator: callable, 由正文token数估算输出token数.
+    :param llm_mode: str, LLM模式, 为None时使用当前配置的模式.
+    :return: int 或 None, 任务使用的num_ctx; 非Ollama动态模式时为None (使用配置值).
+    """
+    values = [
+        plan_prompt(template, body, output_estimator(count_tokens(body)), llm_mode)["num_ctx"]
+        for body in bodies
+    ]
+    values = [value for value in values if value]
+    return max(values) if values else None
+
+
+def plan_chunk_ctx(template: str, chunk_chars: int, output_estimator, llm_mode: str = None):
+    """
+    在文本尚未确定时 (如转录进行中预热模型), 按一整块中文正文估算任务的num_ctx。
+
+    :param template: str, 提示词模板.
+    :param chunk_chars: int, 每块最大字符数.
+    :param output_estimator: callable, 由正文token数估算输出token数.
+    :param llm_mode: str, LLM模式, 为None时使用当前配置的模式.
+    :return: int 或 None, 见 plan_job_ctx.
+    """
+    return plan_job_ctx(template, ["字" * chunk_chars], output_estimator, llm_mode)
+
+
+def resolve_num_ctx(job_num_ctx, plan: dict):
+    """
+    单个请求实际使用的num_ctx: 任务的num_ctx, 仅当该请求放不下时才取更大的值。
+
+    :param job_num_ctx: int 或 None, 任务的num_ctx (plan_job_ctx).
+    :param plan: dict, 该请求的plan_prompt结果.
+    :return: int 或 None, num_ctx.
+    """
+    values = [value for value in (job_num_ctx, plan["num_ctx"]) if value]
+    return max(values) if values else None
+
+
+def fit_chunk_chars(
+    template: str, text: str, chunk_chars: int, output_estimator, llm_mode: str = None
+) -> int:
+    """
+    在配置的分块大小基础上, 按文本实际的每字符token数缩小分块, 使每块的提示与输出都能放入上下文。
+
+    :param template: str, 提示词模板.
+    :param text: str, 待分块的全文 (用于估算每字符token数).
+    :param chunk_chars: int, 配置的分块字符数 (上限).
+    :param output_estimator: callable, 由正文token数估算输出token数 (如expected_rewrite_tokens).
+    :param llm_mode: str, LLM模式, 为None时使用当前配置的模式.
+    :return: int, 可用的分块字符数.
+    """
+    if llm_mode is None:
+        llm_mode = load_config_section("SYSTEM").get("llm_mode", "Ollama")
+    limits = get_context_limits(llm_mode)
+    template_tokens = count_template_tokens(template)
+    tokens_per_char = max(count_tokens(text), 1) / max(len(text), 1)
+
+    size = chunk_chars
+    while size > MIN_CHUNK_CHARS:
+        text_tokens = int(size * tokens_per_char)
+        if not _needs_chunking(template_tokens + text_tokens, output_estimator(text_tokens), limits):
+            break
+        size = int(size * 0.8)
+    return max(size, MIN_CHUNK_CHARS)
+
+
+def expected_summary_tokens(text_tokens: int) -> int:
+    """归纳输出的预计token数: 约为正文的四分之一, 限制在256到2048之间。"""
+    return min(2048, max(256, text_tokens // 4))
+
+
+def expected_rewrite_tokens(text_tokens: int) -> int:
+    """全文改写 (修正) 输出的预计token数: 略多于正文。"""
+    return int(text_tokens * 1.1) + 64
+
+
+def expected_edit_tokens(text_tokens: int) -> int:
+    """修改列表 (只输出需要修改之处) 的预计token数: 约为正文的四分之一。"""
+    return text_tokens // 4 + 128
@@ -0,0 +1,220 @@
+import sys
+import os
+import re
+import math
+import time
+from collections import Counter
+from functools import lru_cache
+
+# Ensure the project root is in sys.path for consistent imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.utils import setup_logger, ThinkTagStreamParser
+from scripts.text_chunking import SPEAKER_TURN_PATTERN, chunk_by_turns
+from scripts.llm_scripts import complete_text, get_llm_chunk_settings
+from scripts.token_budget import count_tokens, expected_summary_tokens, plan_prompt
+
+logger = setup_logger("TRANSCRIPT_INDEX")
+
+DEFAULT_SEGMENT_CHARS = 300
+DEFAULT_TOP_K = 6
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+QA_SYSTEM_PROMPT = (
+    "你是一名会议记录助理。下面给出的是一段较长转录文本中与问题最相关的若干片段 (按原文顺序排列, 并非全文)。"
+    "请只根据这些片段回答问题: 指明是谁在什么语境下说的, 保留关键的决策、人名、时间和数字;"
+    "片段中没有相关信息时直接说明未找到, 不要推测。"
+)
+SEGMENT_HEADER = "【片段{index}】\n"
+QUESTION_HEADER = "【问题】\n"
+
+# Function characters and filler words that occur in nearly every segment (and in most
+# questions); indexing them would let any question match the whole transcript.
+STOPWORD_CHARS = frozenset("的了是在和与及或就都也还又而着过吗呢吧啊呀哦嗯么个这那我你他她它们有不要会能说对把被让给从到为以之其等很太更最")
+STOPWORD_BIGRAMS = frozenset(
+    ["什么", "怎么", "我们", "你们", "他们", "这个", "那个", "一下", "就是", "然后", "这样", "那样", "时候", "哪些", "如何"]
+)
+
+# CJK runs are indexed as character unigrams plus bigrams, so no word segmenter is needed
+_CJK_RUN_PATTERN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+")
+_WORD_PATTERN = re.compile(r"[A-Za-z]+|\d+")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    面向中日韩文本的检索分词: 中日韩字符取单字与相邻两字, 英文单词转为小写, 数字整体保留, 其余符号忽略。
+    停用字 (STOPWORD_CHARS, 如 "的"、"是") 不作为单字词项, 常见虚词 (STOPWORD_BIGRAMS) 不作为两字词项。
+
+    :param text: str, 文本.
+    :return: list[str], 词项列表.
+    """
+    terms = []
+    for match in _CJK_RUN_PATTERN.finditer(text):
+        run = match.group()
+        terms.extend(char for char in run if char not in STOPWORD_CHARS)
+        terms.extend(
+            bigram
+            for bigram in (run[i : i + 2] for i in range(len(run) - 1))
+            if bigram not in STOPWORD_BIGRAMS
+        )
+    terms.extend(word.lower() for word in _WORD_PATTERN.findall(text))
+    return terms
+
+
+class TranscriptIndex:
+    """
+    转录文本片段上的BM25检索索引 (仅在内存中)。
+
+    片段为连续的说话人段落 (见 chunk_by_turns), 长段落在句子边界处拆开;
+    说话人标记不参与检索。
+    """
+
+    def __init__(self, segments: list[str], k1: float = BM25_K1, b: float = BM25_B):
+        self.segments = segments
+        self.k1 = k1
+        self.b = b
+        self.lengths = []
+        self.postings = {}
+        for index, segment in enumerate(segments):
+            terms = tokenize(SPEAKER_TURN_PATTERN.sub("", segment))
+            self.lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                self.postings.setdefault(term, []).append((index, frequency))
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    @classmethod
+    def from_text(cls, text: str, segment_chars: int = DEFAULT_SEGMENT_CHARS) -> "TranscriptIndex":
+        """
+        按说话人段落切分转录文本并建立索引。
+
+        :param text: str, 转录文本 (organize_recognition_results 输出的按说话人组织的文本).
+        :param segment_chars: int, 每个片段的最大字符数; 较短的相邻段落会合并到同一片段.
+        :return: TranscriptIndex, 索引.
+        """
+        return cls(chunk_by_turns(text, segment_chars))
+
+    def _idf(self, term: str) -> float:
+        document_frequency = len(self.postings.get(term, ()))
+        total = len(self.segments)
+        return math.log(1 + (total - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def search(self, query: str, top_k: int = DEFAULT_TOP_K) -> list[dict]:
+        """
+        检索与查询最相关的片段。
+
+        :param query: str, 查询或问题.
+        :param top_k: int, 返回的片段数上限.
+        :return: list[dict], 按相关度从高到低排列, 每项包含 index (片段序号)、score 与 text;
+                 不含任何查询词的片段不会返回.
+        """
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf(term)
+            for index, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[index] / (self.average_length or 1))
+                scores[index] = scores.get(index, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+        return [
+            {"index": index, "score": round(score, 3), "text": self.segments[index]}
+            for index, score in ranked
+        ]
+
+
+@lru_cache(maxsize=4)
+def get_transcript_index(text: str, segment_chars: int = DEFAULT_SEGMENT_CHARS) -> TranscriptIndex:
+    """
+    获取转录文本的索引 (同一文本的重复提问复用已建立的索引)。
+
+    :param text: str, 转录文本.
+    :param segment_chars: int, 每个片段的最大字符数.
+    :return: TranscriptIndex, 索引.
+    """
+    start = time.perf_counter()
+    index = TranscriptIndex.from_text(text, segment_chars)
+    logger.info(
+        f"Indexed {len(text)} chars as {len(index.segments)} segments "
+        f"({len(index.postings)} terms) in {time.perf_counter() - start:.2f}s"
+    )
+    return index
+
+
+def _build_qa_body(segments: list[dict], question: str) -> str:
+    context = "\n\n".join(
+        SEGMENT_HEADER.format(index=segment["index"] + 1) + segment["text"] for segment in segments
+    )
+    return context + "\n\n" + QUESTION_HEADER + question
+
+
+def answer_question(
+    text: str,
+    question: str,
+    top_k: int = DEFAULT_TOP_K,
+    segment_chars: int = DEFAULT_SEGMENT_CHARS,
+    use_cache: bool = True,
+    live_callback=None,
+) -> tuple[str, str, dict]:
+    """
+    针对转录文本回答问题: 用BM25只选出最相关的片段发送给模型, 而不是整篇转录。
+
+    所选片段按原文顺序排列; 超出当前后端分块大小时舍弃相关度最低的片段。
+
+    :param text: str, 转录文本.
+    :param question: str, 问题 (如 "关于预算最后是怎么决定的").
+    :param top_k: int, 最多使用的片段数.
+    :param segment_chars: int, 每个片段的最大字符数.
+    :param use_cache: bool, 为False时本次请求绕过模型输出缓存.
+    :param live_callback: callable, 以目前已生成的回答调用, 在调用线程中执行, 可直接更新界面.
+    :return: tuple[str, str, dict], (回答, 思考内容, 统计信息).
+             统计信息包含 segments (所用片段, 同search的返回值)、total_segments、prompt_chars、
+             transcript_chars、first_visible_seconds 与 total_seconds.
+    :raises LLMRequestError: 如果模型请求失败.
+    """
+    job_start = time.perf_counter()
+    index = get_transcript_index(text, segment_chars)
+    chunk_chars, _ = get_llm_chunk_settings()
+
+    selected, selected_chars = [], 0
+    for segment in index.search(question, top_k):
+        if selected and selected_chars + len(segment["text"]) > chunk_chars:
+            break
+        selected.append(segment)
+        selected_chars += len(segment["text"])
+    selected.sort(key=lambda segment: segment["index"])
+
+    stats = {
+        "segments": selected,
+        "total_segments": len(index.segments),
+        "prompt_chars": 0,
+        "transcript_chars": len(text),
+        "first_visible_seconds": None,
+        "total_seconds": 0.0,
+    }
+    if not selected:
+        stats["total_seconds"] = round(time.perf_counter() - job_start, 2)
+        return "转录文本中没有找到与问题相关的内容。", "", stats
+
+    body = _build_qa_body(selected, question)
+    stats["prompt_chars"] = len(QA_SYSTEM_PROMPT) + len(body)
+    plan = plan_prompt(QA_SYSTEM_PROMPT, body, expected_summary_tokens(count_tokens(body)))
+    parser = ThinkTagStreamParser()
+
+    def on_chunk(chunk: str):
+        parser.feed(chunk)
+        if live_callback:
+            live_callback(parser.answer.strip())
+
+    complete_text(body, plan["num_ctx"], use_cache, on_chunk=on_chunk, system=QA_SYSTEM_PROMPT)
+    parser.finish()
+    answer, thoughts = parser.get_results()
+    if parser.first_visible_at is not None:
+        stats["first_visible_seconds"] = round(parser.first_visible_at - job_start, 2)
+    stats["total_seconds"] = round(time.perf_counter() - job_start, 2)
+    logger.info(
+        f"Answered from {len(selected)}/{len(index.segments)} segments: "
+        f"{stats['prompt_chars']} prompt chars vs {len(text)} transcript chars"
+    )
+    return answer.strip(), thoughts, stats
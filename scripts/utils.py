@@ -5,6 +5,9 @@ import configparser
 import logging
 import os
 import re
+import time
+import hashlib
+import threading
 
 # Define constants for paths
 CONFIG_DIR = "config"
@@ -49,19 +52,64 @@ def copy_text_to_clipboard(text_to_copy: str):
     st.toast("结果已复制到剪贴板")
 
 
+_config_memo = {"signature": None, "config": None}
+_config_memo_lock = threading.Lock()
+
+
+def _load_config_cached() -> configparser.ConfigParser:
+    """解析INI配置文件, 文件修改时间与大小不变时复用上次的解析结果 (调用方不应修改返回值)。"""
+    try:
+        stat = os.stat(CONFIG_INI_PATH)
+        signature = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        signature = None
+    with _config_memo_lock:
+        if _config_memo["config"] is None or signature is None or signature != _config_memo["signature"]:
+            config = configparser.ConfigParser()
+            config.read(CONFIG_INI_PATH, encoding='utf-8')
+            _config_memo["signature"], _config_memo["config"] = signature, config
+        return _config_memo["config"]
+
+
 def load_config_section(section: str) -> configparser.SectionProxy:
     """
-    从INI配置文件中加载指定区域的配置。
+    从INI配置文件中加载指定区域的配置 (文件未修改时复用缓存的解析结果)。
 
     :param section: str, INI文件中的区域名称 (例如 "SYSTEM", "OPENAI").
-    :return: configparser.SectionProxy, 配置项代理对象.
+    :return: configparser.SectionProxy, 配置项代理对象 (只读使用).
     """
-    config = configparser.ConfigParser()
-    config.read(CONFIG_INI_PATH, encoding='utf-8')
+    config = _load_config_cached()
     if section not in config:
         raise ValueError(f"Section '{section}' not found in config file '{CONFIG_INI_PATH}'")
     return config[section]
 
+_file_hash_memo = {}
+
+
+def compute_file_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    分块计算文件内容的SHA-256哈希值。
+    同一文件 (路径、大小与修改时间均未变) 的哈希只计算一次。
+
+    :param file_path: str, 文件路径.
+    :param chunk_size: int, 每次读取的字节数.
+    :return: str, 十六进制哈希字符串.
+    """
+    file_stat = os.stat(file_path)
+    memo_key = (os.path.abspath(file_path), file_stat.st_size, file_stat.st_mtime_ns)
+    if memo_key in _file_hash_memo:
+        return _file_hash_memo[memo_key]
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    if len(_file_hash_memo) > 256:
+        _file_hash_memo.clear()
+    _file_hash_memo[memo_key] = digest.hexdigest()
+    return _file_hash_memo[memo_key]
+
+
 def setup_logger(name: str, log_filename: str = DEFAULT_LOG_FILE, level=logging.INFO) -> logging.Logger:
     """
     设置并返回一个日志记录器。
@@ -119,4 +167,92 @@ def extract_and_clean_think_tags(text_with_tags: str) -> tuple[str, str]:
     
     thoughts_text = "\n\n---\n\n".join(thoughts_list) # 用分隔符连接多个思考块
     
-    return cleaned_text.strip(), thoughts_text.strip()
\ No newline at end of file
+    return cleaned_text.strip(), thoughts_text.strip()
+
+class ThinkTagStreamParser:
+    """
+    流式输出的<think>标签增量解析器。
+
+    逐块输入模型输出, 将思考内容与正文分开累积 (使用列表, 避免长输出的反复字符串拼接),
+    能够处理被拆分在相邻块之间的标签。调用 finish 后的结果与 extract_and_clean_think_tags 一致。
+    """
+
+    OPEN_TAG = "<think>"
+    CLOSE_TAG = "</think>"
+
+    def __init__(self):
+        self.in_think = False
+        self.first_visible_at = None  # time.perf_counter() of the first visible answer character
+        self._pending = ""
+        self._open_tag = ""  # The opening tag as written, restored if it is never closed
+        self._answer_parts = []
+        self._thought_blocks = []
+
+    def _emit(self, text: str) -> str:
+        if not text:
+            return ""
+        if self.in_think:
+            self._thought_blocks[-1].append(text)
+            return ""
+        self._answer_parts.append(text)
+        if self.first_visible_at is None and text.strip():
+            self.first_visible_at = time.perf_counter()
+        return text
+
+    def feed(self, chunk: str) -> str:
+        """
+        输入一块模型输出。
+
+        :param chunk: str, 新收到的文本块.
+        :return: str, 本块中新增的可见正文 (不含思考内容).
+        """
+        buffer = self._pending + chunk
+        self._pending = ""
+        visible = []
+        while buffer:
+            tag = self.CLOSE_TAG if self.in_think else self.OPEN_TAG
+            index = buffer.lower().find(tag)
+            if index >= 0:
+                visible.append(self._emit(buffer[:index]))
+                if not self.in_think:
+                    self._open_tag = buffer[index : index + len(tag)]
+                buffer = buffer[index + len(tag):]
+                self.in_think = not self.in_think
+                if self.in_think:
+                    self._thought_blocks.append([])
+                continue
+            # Hold back a suffix that may be the start of a tag split across chunks
+            keep = next(
+                (k for k in range(min(len(tag) - 1, len(buffer)), 0, -1) if buffer.lower().endswith(tag[:k])),
+                0,
+            )
+            visible.append(self._emit(buffer[: len(buffer) - keep]))
+            self._pending = buffer[len(buffer) - keep:]
+            break
+        return "".join(visible)
+
+    def finish(self) -> str:
+        """
+        输出结束时调用, 释放暂存的不完整标签文本。
+        与 extract_and_clean_think_tags 相同, 未闭合的<think>不算思考内容: 标签及其后的文本归还正文。
+
+        :return: str, 新增的可见正文.
+        """
+        pending, self._pending = self._pending, ""
+        if self.in_think:
+            self._emit(pending)
+            self.in_think = False
+            pending = self._open_tag + "".join(self._thought_blocks.pop())
+        return self._emit(pending)
+
+    @property
+    def answer(self) -> str:
+        """:return: str, 目前为止的可见正文 (未去除首尾空白)."""
+        return "".join(self._answer_parts)
+
+    def get_results(self) -> tuple[str, str]:
+        """
+        :return: tuple[str, str], (去除思考内容后的正文, 思考内容), 格式同 extract_and_clean_think_tags.
+        """
+        thoughts = [("".join(block)).strip() for block in self._thought_blocks]
+        return self.answer.strip(), "\n\n---\n\n".join(thoughts).strip()
@@ -0,0 +1,149 @@
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts import text_fixing
+from scripts.text_chunking import split_speaker_turns
+
+
+def build_transcript(turns: int) -> str:
+    lines = []
+    for index in range(turns):
+        speaker = 1 + index % 2
+        # Short turns that look alike, so a fuzzy overlap match would drop real turns
+        text = "好的。" if index % 5 == 0 else f"第{index}段发言，我们讨论一下第{index}项议题的安排。"
+        lines.append(f"说话人{speaker}: {text}")
+    return "\n\n".join(lines)
+
+
+@pytest.fixture
+def echo_model(monkeypatch):
+    """模型原样返回收到的正文 (含语境与标题)。"""
+
+    async def fake_complete(body, num_ctx, use_cache, on_chunk=None, system=None):
+        if on_chunk:
+            on_chunk(body)
+        return body
+
+    monkeypatch.setattr(text_fixing, "acomplete_text", fake_complete)
+    text_fixing.clear_fix_memo()
+
+
+@pytest.fixture
+def body_only_model(monkeypatch):
+    """模型遵守指示, 只返回待修正部分 (原样)。"""
+
+    async def fake_complete(body, num_ctx, use_cache, on_chunk=None, system=None):
+        if text_fixing.BODY_HEADER in body:
+            body = body.split(text_fixing.BODY_HEADER, 1)[1]
+        if on_chunk:
+            on_chunk(body)
+        return body
+
+    monkeypatch.setattr(text_fixing, "acomplete_text", fake_complete)
+    text_fixing.clear_fix_memo()
+
+
+@pytest.mark.parametrize("model", ["echo_model", "body_only_model"])
+def test_unchanged_output_round_trips_every_turn(model, request):
+    request.getfixturevalue(model)
+    text = build_transcript(20)
+    fixed, _, chunk_stats = text_fixing.fix_text_chunked(
+        text, "请修正错别字", chunk_chars=200, max_concurrency=2, use_cache=False
+    )
+    assert len(chunk_stats) > 1
+    assert split_speaker_turns(fixed) == split_speaker_turns(text)
+
+
+def test_strip_overlap_keeps_similar_first_turn():
+    fixed = "说话人1: 好的。\n\n说话人2: 继续。"
+    assert text_fixing._strip_overlap(fixed, "说话人2: 好的。") == fixed
+
+
+def test_strip_overlap_removes_exact_echo():
+    fixed = "说话人2: 好的。\n\n说话人1: 继续。"
+    assert text_fixing._strip_overlap(fixed, "说话人2: 好的。") == "说话人1: 继续。"
+
+
+def test_reused_chunk_reports_original_fallback_mode(monkeypatch):
+    async def fake_complete(body, num_ctx, use_cache, on_chunk=None, system=None):
+        # Not an edit list, so edit mode falls back to a rewrite that returns the body
+        body = body.split(text_fixing.BODY_HEADER, 1)[-1]
+        if on_chunk:
+            on_chunk(body)
+        return body
+
+    monkeypatch.setattr(text_fixing, "acomplete_text", fake_complete)
+    text_fixing.clear_fix_memo()
+    text = build_transcript(4)
+    first_text, _, first_stats = text_fixing.fix_text_chunked(
+        text, "请修正错别字", chunk_chars=1000, fix_mode=text_fixing.FIX_MODE_EDITS
+    )
+    second_text, _, second_stats = text_fixing.fix_text_chunked(
+        text, "请修正错别字", chunk_chars=1000, fix_mode=text_fixing.FIX_MODE_EDITS
+    )
+    assert [item["mode"] for item in first_stats] == ["edits_fallback"]
+    assert [(item["mode"], item["reused"]) for item in second_stats] == [("edits_fallback", True)]
+    assert second_text == first_text == text
+
+
+def test_parse_edit_list_ignores_surrounding_text():
+    output = '修改如下:\n```json\n[["向目", "项目"], ["因该", "应该"]]\n```'
+    assert text_fixing.parse_edit_list(output) == [("向目", "项目"), ("因该", "应该")]
+
+
+def test_parse_edit_list_accepts_empty_list():
+    assert text_fixing.parse_edit_list("[]") == []
+
+
+@pytest.mark.parametrize(
+    "output",
+    [
+        "没有需要修改的地方。",
+        '[["向目", "项目"',
+        '{"向目": "项目"}',
+        '[["向目", "项目", "多余"]]',
+        '[["向目", 1]]',
+        '["向目", "项目"]',
+    ],
+)
+def test_parse_edit_list_rejects_malformed_output(output):
+    assert text_fixing.parse_edit_list(output) is None
+
+
+def test_apply_edits_exact_match():
+    text = "说话人1: 我们讨论一下向目的进度，大家因该都知道了。"
+    edits = [("向目", "项目"), ("因该", "应该")]
+    assert text_fixing.apply_edits(text, edits) == "说话人1: 我们讨论一下项目的进度，大家应该都知道了。"
+
+
+def test_apply_edits_prefers_occurrence_after_previous_edit():
+    text = "向目开始，向目结束。"
+    edits = [("开始", "开始了"), ("向目", "项目")]
+    assert text_fixing.apply_edits(text, edits) == "向目开始了，项目结束。"
+
+
+def test_apply_edits_fuzzy_match():
+    text = "说话人1: 我们下周三讨论一下向目的进度安排。"
+    # The model misquoted one character of the original
+    edits = [("我们下周三讨论一下向目得进度安排", "我们下周三讨论一下项目的进度安排")]
+    assert text_fixing.apply_edits(text, edits) == "说话人1: 我们下周三讨论一下项目的进度安排。"
+
+
+@pytest.mark.parametrize(
+    "edits",
+    [
+        [("完全不存在的一句话", "替换")],
+        [("", "项目")],
+        [("讨论一下", "讨论"), ("一下向目", "一下项目")],
+    ],
+)
+def test_apply_edits_rejects_unusable_edits(edits):
+    assert text_fixing.apply_edits("我们讨论一下向目的进度。", edits) is None
+
+
+def test_apply_edits_skips_unchanged_pairs():
+    text = "我们讨论一下向目的进度。"
+    assert text_fixing.apply_edits(text, [("我们", "我们")]) == text
@@ -0,0 +1,53 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.transcript_index import TranscriptIndex, tokenize
+
+
+def test_tokenize_cjk_unigrams_and_bigrams():
+    assert sorted(tokenize("预算表")) == sorted(["预", "算", "表", "预算", "算表"])
+
+
+def test_tokenize_does_not_bridge_across_punctuation():
+    terms = tokenize("预算，审批")
+    assert "算审" not in terms
+    assert {"预算", "审批"} <= set(terms)
+
+
+def test_tokenize_latin_words_and_numbers():
+    assert tokenize("Q3 KPI 120%") == ["q", "3", "kpi", "120"]
+
+
+def test_tokenize_drops_stopword_unigrams_and_filler_bigrams():
+    terms = tokenize("我们的预算是什么")
+    assert not {"的", "是", "我", "们", "我们", "什么"} & set(terms)
+    assert {"预", "算", "预算"} <= set(terms)
+
+
+def test_search_ranks_matching_segment_first():
+    index = TranscriptIndex(
+        [
+            "说话人1: 今天先过一下招聘进度。",
+            "说话人2: 市场部的预算还没有批下来。",
+            "说话人1: 下周把预算表发给财务。",
+        ]
+    )
+    results = index.search("预算表什么时候发")
+    assert results[0]["index"] == 2
+    assert 0 not in [result["index"] for result in results]
+
+
+def test_speaker_labels_are_not_indexed():
+    index = TranscriptIndex(["说话人1: 好的。", "说话人2: 继续。"])
+    assert index.search("说话人") == []
+
+
+def test_unrelated_question_matches_nothing():
+    index = TranscriptIndex(
+        [
+            "说话人1: 我们的预算是这个月底之前要定下来的。",
+            "说话人2: 好的，那我们就先这样，有问题再说。",
+        ]
+    )
+    assert index.search("火星探测是什么时候") == []
@@ -0,0 +1,59 @@
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from scripts.utils import ThinkTagStreamParser, extract_and_clean_think_tags
+
+
+def feed_all(chunks: list[str]) -> ThinkTagStreamParser:
+    parser = ThinkTagStreamParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.finish()
+    return parser
+
+
+def split_every(text: str, size: int) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+OUTPUTS = [
+    "没有思考内容的回答。",
+    "<think>先想一想</think>\n正式回答。",
+    "前言<think>第一段</think>中间<THINK>第二段</Think>结尾",
+    "<think>没有闭合的思考, 应当归还正文",
+    "回答<think>",
+    "比较 a < b 与 <thin 的写法",
+]
+
+
+@pytest.mark.parametrize("text", OUTPUTS)
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_stream_results_match_batch_extraction(text, size):
+    assert feed_all(split_every(text, size)).get_results() == extract_and_clean_think_tags(text)
+
+
+def test_feed_returns_only_visible_text():
+    parser = ThinkTagStreamParser()
+    visible = [parser.feed(chunk) for chunk in ["答<th", "ink>想", "</thi", "nk>案"]]
+    visible.append(parser.finish())
+    assert "".join(visible) == "答案"
+    assert parser.get_results() == ("答案", "想")
+
+
+def test_unclosed_tag_is_returned_to_answer_on_finish():
+    parser = ThinkTagStreamParser()
+    parser.feed("回答<Think>未完")
+    assert parser.answer == "回答"
+    parser.finish()
+    assert parser.get_results() == ("回答<Think>未完", "")
+
+
+def test_first_visible_at_ignores_thoughts_and_whitespace():
+    parser = ThinkTagStreamParser()
+    parser.feed("<think>思考</think>\n\n")
+    assert parser.first_visible_at is None
+    parser.feed("正文")
+    assert parser.first_visible_at is not None